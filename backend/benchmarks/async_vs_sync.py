@@ -0,0 +1,160 @@
+"""
+Benchmark de la capa de base de datos: rutas async vs. rutas síncronas.
+
+Compara requests/segundo de las rutas de lectura de la API (async def +
+AsyncSession) contra una versión síncrona equivalente (def + Session, que
+Starlette ejecuta en su threadpool de ~40 hilos). Ambas apps se ejercitan
+en proceso con httpx.AsyncClient y la misma concurrencia.
+
+La diferencia se nota sobre todo contra una base de datos remota (RDS), donde
+cada consulta espera en la red: usar --database-url con PostgreSQL. Con más
+peticiones simultáneas que hilos del threadpool, el modo síncrono puede quedar
+bloqueado esperando conexiones del pool hasta su timeout (30 s): esas
+peticiones se cuentan como errores.
+
+Uso:
+    python benchmarks/async_vs_sync.py --concurrency 200 --duration 10
+    python benchmarks/async_vs_sync.py --database-url postgresql://...
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark async vs. sync de las rutas de lectura")
+    parser.add_argument("--concurrency", type=int, default=200, help="Peticiones simultáneas")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duración de cada modo en segundos")
+    parser.add_argument("--rooms", type=int, default=50, help="Salas a insertar si la base está vacía")
+    parser.add_argument("--database-url", default=None,
+                        help="Base de datos a usar (por defecto un SQLite temporal)")
+    return parser.parse_args()
+
+
+def build_sync_app():
+    """App con las mismas rutas de lectura implementadas de forma síncrona."""
+    from typing import List
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+    from database.connection import get_sync_db
+    from database.models import Room, Reservation
+    from schemas import RoomResponse, ReservationResponse, ReservationRoomInfo
+
+    app = FastAPI()
+
+    @app.get("/api/rooms", response_model=List[RoomResponse])
+    def get_all_rooms(db: Session = Depends(get_sync_db)):
+        return db.query(Room).all()
+
+    @app.get("/api/users/{user_id}/reservations", response_model=List[ReservationResponse])
+    def get_user_reservations(user_id: int, db: Session = Depends(get_sync_db)):
+        rows = (
+            db.query(Reservation, Room)
+            .join(Room)
+            .filter(Reservation.user_id == user_id)
+            .order_by(Reservation.date.desc(), Reservation.start_time.desc())
+            .all()
+        )
+        return [
+            ReservationResponse(
+                id=reservation.id,
+                room=ReservationRoomInfo(id=room.id, name=room.name, libraryName=room.library_name),
+                date=reservation.date,
+                startTime=reservation.start_time,
+                endTime=reservation.end_time,
+                emailSent=True
+            )
+            for reservation, room in rows
+        ]
+
+    return app
+
+
+async def drive(app, paths, concurrency, duration):
+    """Ejecuta peticiones GET en bucle y devuelve (total, errores, segundos)."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    counters = {"ok": 0, "error": 0}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset):
+            i = offset
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    counters["ok" if response.status_code == 200 else "error"] += 1
+                except Exception:
+                    # p. ej. TimeoutError del pool cuando se agota
+                    counters["error"] += 1
+                i += 1
+
+        began = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - began
+
+    # Las conexiones del pool async quedan ligadas a este event loop
+    from database.connection import async_engine
+    await async_engine.dispose()
+
+    return counters["ok"], counters["error"], elapsed
+
+
+def main():
+    args = parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="biblioreservas-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    from datetime import date, time as dtime, timedelta
+    from database.connection import engine, SessionLocal
+    from database.models import Base, User, Room, Reservation
+    from main import app as async_app
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="Bench", email=f"bench-{time.time_ns()}@ejemplo.com")
+    db.add(user)
+    if db.query(Room).count() == 0:
+        db.add_all(
+            Room(name=f"Sala {i}", library_name="Biblioteca Bench", capacity=2 + i % 6)
+            for i in range(args.rooms)
+        )
+    db.commit()
+    rooms = db.query(Room.id).limit(20).all()
+    first_day = date.today() + timedelta(days=1)
+    db.add_all(
+        Reservation(user_id=user.id, room_id=room_id, date=first_day + timedelta(days=i),
+                    start_time=dtime(10, 0), end_time=dtime(11, 0))
+        for i, (room_id,) in enumerate(rooms)
+    )
+    db.commit()
+    paths = ["/api/rooms", f"/api/users/{user.id}/reservations"]
+    db.close()
+
+    results = {}
+    for mode, app in (("sync", build_sync_app()), ("async", async_app)):
+        ok, errors, elapsed = asyncio.run(drive(app, paths, args.concurrency, args.duration))
+        results[mode] = ok / elapsed
+        print(f"{mode:>5}: {ok} req en {elapsed:.2f} s -> {ok / elapsed:.1f} req/s ({errors} errores)")
+
+    print(f"async / sync: {results['async'] / results['sync']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
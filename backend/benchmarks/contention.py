@@ -0,0 +1,161 @@
+"""
+Benchmark de contención: N clientes compitiendo por la misma sala.
+
+Cada cliente (una tarea asyncio con su propia sesión) intenta reservar horarios de una
+única sala durante un tiempo fijo, llamando directamente a
+routers.reservations.create_reservation. Se reporta el throughput total y
+cuántos intentos terminaron en reserva, en conflicto (409) o en error.
+
+Con --cold-index se descarta el índice en memoria antes de cada intento, para
+simular workers independientes que solo se coordinan a través de la base de
+datos (constraint de exclusión / trigger + reintentos).
+
+Uso:
+    python benchmarks/contention.py --clients 50 --duration 10
+    python benchmarks/contention.py --database-url postgresql://... --cold-index
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import asyncio
+import time
+from datetime import date, time as dtime, timedelta
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de contención sobre una sala")
+    parser.add_argument("--clients", type=int, default=50, help="Clientes concurrentes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duración en segundos")
+    parser.add_argument("--days", type=int, default=3, help="Días distintos sobre los que se reserva")
+    parser.add_argument("--database-url", default=None,
+                        help="Base de datos a usar (por defecto un SQLite temporal)")
+    parser.add_argument("--cold-index", action="store_true",
+                        help="Invalidar el índice en memoria antes de cada intento")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="biblioreservas-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    # Sin cola ni SMTP: solo interesa el camino de escritura
+    os.environ["EMAIL_QUEUE_ENABLED"] = "false"
+    os.environ["SMTP_HOST"] = ""
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    from fastapi import HTTPException
+    from database.connection import engine, SessionLocal, AsyncSessionLocal, async_engine
+    from database.models import Base, User, Room, Reservation
+    from routers.reservations import create_reservation
+    from schemas import ReservationCreate
+    from utils.interval_index import reservation_index
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="Bench", email=f"bench-{time.time_ns()}@ejemplo.com")
+    room = Room(name="Sala Bench", library_name="Biblioteca Bench", capacity=4)
+    db.add_all([user, room])
+    db.commit()
+    user_id, room_id = user.id, room.id
+    db.close()
+
+    # Horarios de 30 a 120 minutos entre las 08:00 y las 20:00
+    first_day = date.today() + timedelta(days=1)
+    days = [first_day + timedelta(days=i) for i in range(args.days)]
+
+    def random_slot(rng):
+        start = rng.randrange(8 * 4, 19 * 4)
+        length = rng.choice([2, 4, 6, 8])
+        end = min(start + length, 20 * 4)
+        return dtime(start // 4, (start % 4) * 15), dtime(end // 4, (end % 4) * 15)
+
+    results = {"created": 0, "conflict": 0, "error": 0}
+    latencies = []
+
+    async def client(seed, deadline, start_event):
+        rng = random.Random(seed)
+        await start_event.wait()
+        async with AsyncSessionLocal() as session:
+            while time.perf_counter() < deadline:
+                start, end = random_slot(rng)
+                data = ReservationCreate(
+                    userId=user_id, roomId=room_id, date=rng.choice(days),
+                    startTime=start, endTime=end
+                )
+                if args.cold_index:
+                    reservation_index.invalidate(room_id, data.date)
+                began = time.perf_counter()
+                try:
+                    # Fuera de FastAPI el default del parámetro es el objeto Header:
+                    # sin idempotency_key=None cada intento tomaría la ruta idempotente
+                    await create_reservation(data, session, idempotency_key=None)
+                    results["created"] += 1
+                except HTTPException as e:
+                    results["conflict" if e.status_code == 409 else "error"] += 1
+                except Exception:
+                    results["error"] += 1
+                finally:
+                    await session.rollback()
+                latencies.append(time.perf_counter() - began)
+
+    async def run_clients():
+        start_event = asyncio.Event()
+        deadline = time.perf_counter() + args.duration
+        tasks = [asyncio.create_task(client(i, deadline, start_event)) for i in range(args.clients)]
+        start_event.set()
+        await asyncio.gather(*tasks)
+        await async_engine.dispose()
+
+    began = time.perf_counter()
+    asyncio.run(run_clients())
+    elapsed = time.perf_counter() - began
+
+    # Verificar que la base de datos no tenga solapamientos
+    db = SessionLocal()
+    rows = (
+        db.query(Reservation.date, Reservation.start_time, Reservation.end_time)
+        .filter(Reservation.room_id == room_id)
+        .order_by(Reservation.date, Reservation.start_time)
+        .all()
+    )
+    db.close()
+    overlaps = sum(
+        1 for prev, cur in zip(rows, rows[1:])
+        if prev.date == cur.date and cur.start_time < prev.end_time
+    )
+
+    total = sum(results.values())
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    print("=" * 60)
+    print(f"Contención sobre 1 sala - {engine.dialect.name}")
+    print("=" * 60)
+    print(f"Clientes:        {args.clients}")
+    print(f"Índice en frío:  {'sí' if args.cold_index else 'no'}")
+    print(f"Duración:        {elapsed:.2f} s")
+    print(f"Intentos:        {total} ({total / elapsed:.1f} req/s)")
+    print(f"  Creadas:       {results['created']}")
+    print(f"  Conflictos:    {results['conflict']}")
+    print(f"  Errores:       {results['error']}")
+    print(f"Latencia p50/p95/p99: {percentile(0.50):.2f} / {percentile(0.95):.2f} / {percentile(0.99):.2f} ms")
+    print(f"Solapamientos en la tabla: {overlaps}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
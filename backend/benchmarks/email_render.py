@@ -0,0 +1,106 @@
+"""
+Benchmark del renderizado de emails: renders/segundo por plantilla.
+
+Compara las plantillas precompiladas (utils/email_templates.py) contra la
+forma anterior de armar el mensaje: formatear todo el texto en cada envío,
+crear objetos MIMEMultipart/MIMEText y serializarlos con as_bytes(). Mide solo
+CPU (no hay envío SMTP), que es el costo por mensaje del worker.
+
+Uso:
+    python benchmarks/email_render.py --iterations 20000
+    python benchmarks/email_render.py --template reservation_reminder
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import date, time as dtime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from utils.email_service import render_reservation_email, format_reservation_fields
+from utils.email_templates import TEMPLATES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de renderizado de emails")
+    parser.add_argument("--iterations", type=int, default=20000, help="Mensajes a renderizar por modo")
+    parser.add_argument("--template", default="reservation_confirmation", choices=sorted(TEMPLATES))
+    return parser.parse_args()
+
+
+def legacy_sources(template_name: str):
+    """Fuentes de la plantilla como f-strings de str.format (una pasada por mensaje)."""
+    template = TEMPLATES[template_name]
+
+    def to_format(compiled):
+        parts = [compiled.static[0].decode("utf-8").replace("{", "{{").replace("}", "}}")]
+        for index, name in enumerate(compiled.fields, 1):
+            parts.append("{" + name + "}")
+            parts.append(compiled.static[index].decode("utf-8").replace("{", "{{").replace("}", "}}"))
+        return "".join(parts)
+
+    return to_format(template.subject), to_format(template.text), to_format(template.html)
+
+
+def render_legacy(sources, kwargs):
+    """Como antes: leer y formatear todo, objetos email.mime y serialización completa."""
+    subject, text, html = sources
+    fields = format_reservation_fields(
+        kwargs["user_name"], kwargs["room_name"], kwargs["library_name"],
+        kwargs["reservation_date"], kwargs["start_time"], kwargs["end_time"], kwargs["reservation_id"]
+    )
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject.format(**fields)
+    message["From"] = f"{kwargs['from_name']} <{kwargs['from_email']}>"
+    message["To"] = kwargs["user_email"]
+    message.attach(MIMEText(text.format(**fields), "plain"))
+    message.attach(MIMEText(html.format(**fields), "html"))
+    return message.as_bytes()
+
+
+def render_compiled(template_name, kwargs):
+    return render_reservation_email(**kwargs, template=template_name).data
+
+
+def measure(label, render, iterations):
+    render()  # calentar cachés
+    began = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    elapsed = time.perf_counter() - began
+    rate = iterations / elapsed
+    print(f"{label:>9}: {rate:>10.0f} renders/s ({elapsed / iterations * 1e6:.1f} µs/mensaje)")
+    return rate
+
+
+def main():
+    args = parse_args()
+
+    kwargs = {
+        "user_email": "ana.gonzalez@ejemplo.com",
+        "user_name": "Ana González",
+        "room_name": "Sala de Estudio 3",
+        "library_name": "Biblioteca Central",
+        "reservation_date": date(2025, 11, 20),
+        "start_time": dtime(14, 0),
+        "end_time": dtime(16, 0),
+        "reservation_id": 12345,
+        "from_email": "reservas@biblioreservas.cl",
+        "from_name": "BiblioReservas",
+    }
+    sources = legacy_sources(args.template)
+
+    print(f"Plantilla: {args.template}, {args.iterations} mensajes por modo")
+    legacy = measure("legacy", lambda: render_legacy(sources, kwargs), args.iterations)
+    compiled = measure("compiled", lambda: render_compiled(args.template, kwargs), args.iterations)
+    print(f"compiled / legacy: {compiled / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
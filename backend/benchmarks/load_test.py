@@ -0,0 +1,456 @@
+"""
+Prueba de carga HTTP de la API con una mezcla realista de peticiones.
+
+Ejecuta la app completa (middlewares, validación, serialización) y la carga
+con N clientes concurrentes en bucle cerrado durante un tiempo fijo por nivel
+de concurrencia. Cada petición se elige al azar según los pesos de --mix:
+
+    rooms         GET /api/rooms (catálogo, servido desde la caché)
+    availability  GET /api/rooms/availability?date=...
+    listing       GET /api/users/{id}/reservations (primera página)
+    create        POST /api/reservations; una fracción --conflict-rate choca
+                  con una reserva existente y debe responder 409
+
+Modos:
+    inprocess  httpx.AsyncClient sobre ASGITransport, sin red (por defecto)
+    uvicorn    servidor uvicorn en un hilo de este proceso y clientes por TCP
+
+La base de datos es un SQLite temporal o la de --database-url (p. ej. un
+PostgreSQL local), creada con las migraciones y poblada con usuarios, salas y
+reservas. SMTP y RabbitMQ no se usan: EMAIL_QUEUE_ENABLED=false y sin
+SMTP_HOST (los envíos fallan al instante en segundo plano), o con
+--email-queue outbox se escriben las filas del outbox sin relay.
+
+El resultado (throughput y p50/p95/p99 por endpoint y nivel) se guarda en
+JSON; con --compare se muestran las diferencias contra un resultado anterior.
+
+Uso:
+    python benchmarks/load_test.py --concurrency 10,50,100 --duration 15
+    python benchmarks/load_test.py --mix rooms=1,listing=1,create=2 --conflict-rate 0.3
+    python benchmarks/load_test.py --mode uvicorn --database-url postgresql://...
+    python benchmarks/load_test.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, time as dtime
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DEFAULT_MIX = "rooms=40,availability=10,listing=35,create=15"
+ENDPOINTS = ("rooms", "availability", "listing", "create")
+# Respuestas esperadas por endpoint; cualquier otra cuenta como error
+EXPECTED_STATUS = {
+    "rooms": {200},
+    "availability": {200},
+    "listing": {200},
+    "create": {201, 409},
+}
+# Horarios de una hora entre las 08:00 y las 20:00
+SLOTS_PER_DAY = 12
+HISTORY_DAYS = 30
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP de la API")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--concurrency", default="10,50,100",
+                        help="Niveles de concurrencia separados por coma")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos medidos por nivel")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos sin medir antes de cada nivel")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por endpoint (nombre=peso,...)")
+    parser.add_argument("--conflict-rate", type=float, default=0.2,
+                        help="Fracción de creaciones que chocan con una reserva existente")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--history", type=int, default=20, help="Reservas previas por usuario")
+    parser.add_argument("--email-queue", choices=["none", "outbox"], default="none",
+                        help="outbox: EMAIL_QUEUE_ENABLED=true (filas en el outbox, sin relay)")
+    parser.add_argument("--database-url", default=None,
+                        help="Base de datos a usar (por defecto un SQLite temporal)")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto del modo uvicorn")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de los generadores aleatorios")
+    parser.add_argument("--output", default="load_test_results.json", help="Archivo JSON de resultados")
+    parser.add_argument("--compare", default=None, help="Resultado anterior (JSON) para comparar")
+    return parser.parse_args()
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"❌ Endpoint desconocido en --mix: {name} (opciones: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise SystemExit("❌ --mix no tiene ningún peso positivo")
+    return mix
+
+
+def configure_environment(args):
+    """Variables de entorno que deben fijarse antes de importar la app."""
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="biblioreservas-load-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'load.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["EMAIL_QUEUE_ENABLED"] = "true" if args.email_queue == "outbox" else "false"
+    os.environ["SMTP_HOST"] = ""
+
+
+# ============ DATOS ============
+
+class Dataset:
+    """IDs y horarios sembrados, y generador de horarios libres para las creaciones."""
+
+    def __init__(self, user_ids, room_ids, booked, first_free_day):
+        self.user_ids = user_ids
+        self.room_ids = room_ids
+        self.seeded = len(booked)
+        # [(room_id, date, hora)] existentes desde hoy: reservarlos de nuevo da 409
+        self.booked = [slot for slot in booked if slot[1] >= date.today()]
+        self.first_free_day = first_free_day
+        self._next_free = 0
+        self._lock = threading.Lock()
+
+    def free_slot(self):
+        """Horario nunca usado: (room_id, date, hora). Único entre todos los clientes."""
+        with self._lock:
+            n = self._next_free
+            self._next_free += 1
+        room = self.room_ids[n % len(self.room_ids)]
+        n //= len(self.room_ids)
+        return room, self.first_free_day + timedelta(days=n // SLOTS_PER_DAY), 8 + n % SLOTS_PER_DAY
+
+
+def seed_database(args) -> Dataset:
+    from sqlalchemy import insert, select
+    from database.connection import engine
+    from database.migrations import upgrade
+    from database.models import Reservation, Room, User
+
+    upgrade(engine)
+    rng = random.Random(args.seed)
+    run_id = time.time_ns()
+    today = date.today()
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Usuario {i}", "email": f"load-{run_id}-{i}@ejemplo.com"}
+            for i in range(args.users)
+        ])
+        user_ids = connection.execute(
+            select(User.id).where(User.email.like(f"load-{run_id}-%")).order_by(User.id)
+        ).scalars().all()
+
+        connection.execute(insert(Room), [
+            {"name": f"Sala {run_id % 100000}-{i}", "library_name": f"Biblioteca {i % 5}", "capacity": 2 + i % 7}
+            for i in range(args.rooms)
+        ])
+        room_ids = connection.execute(
+            select(Room.id).where(Room.name.like(f"Sala {run_id % 100000}-%")).order_by(Room.id)
+        ).scalars().all()
+
+        # Historial de cada usuario, en horarios distintos dentro de +-HISTORY_DAYS días
+        capacity = len(room_ids) * (2 * HISTORY_DAYS + 1) * SLOTS_PER_DAY
+        total = min(args.users * args.history, capacity)
+        cells = rng.sample(range(capacity), total)
+        booked = []
+        rows = []
+        for index, cell in enumerate(cells):
+            room = room_ids[cell % len(room_ids)]
+            cell //= len(room_ids)
+            day = today + timedelta(days=cell // SLOTS_PER_DAY - HISTORY_DAYS)
+            hour = 8 + cell % SLOTS_PER_DAY
+            booked.append((room, day, hour))
+            rows.append({
+                "user_id": user_ids[index % len(user_ids)], "room_id": room, "date": day,
+                "start_time": dtime(hour, 0), "end_time": dtime(hour + 1, 0),
+            })
+        for start in range(0, len(rows), 1000):
+            connection.execute(insert(Reservation), rows[start:start + 1000])
+
+    # Las creaciones nuevas van después del historial (y de ejecuciones anteriores
+    # sobre la misma base, que usan otras salas)
+    return Dataset(user_ids, room_ids, booked, today + timedelta(days=HISTORY_DAYS + 1))
+
+
+# ============ CARGA ============
+
+def build_request(name: str, rng: random.Random, data: Dataset, conflict_rate: float):
+    """(método, path, cuerpo JSON) de una petición del endpoint."""
+    if name == "rooms":
+        return "GET", "/api/rooms", None
+    if name == "availability":
+        day = date.today() + timedelta(days=rng.randint(-HISTORY_DAYS, HISTORY_DAYS))
+        return "GET", f"/api/rooms/availability?date={day.isoformat()}", None
+    if name == "listing":
+        scope = "&scope=upcoming" if rng.random() < 0.5 else ""
+        return "GET", f"/api/users/{rng.choice(data.user_ids)}/reservations?limit=20{scope}", None
+
+    if data.booked and rng.random() < conflict_rate:
+        room, day, hour = rng.choice(data.booked)
+    else:
+        room, day, hour = data.free_slot()
+    return "POST", "/api/reservations", {
+        "userId": rng.choice(data.user_ids),
+        "roomId": room,
+        "date": day.isoformat(),
+        "startTime": f"{hour:02d}:00",
+        "endTime": f"{hour + 1:02d}:00",
+    }
+
+
+class LevelStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, status, elapsed: float):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][str(status)] += 1
+        if status not in EXPECTED_STATUS[name]:
+            self.errors[name] += 1
+
+
+async def run_level(client, concurrency, duration, warmup, mix, conflict_rate, data, seed) -> tuple:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    stats = LevelStats()
+    measuring = False
+    deadline = time.perf_counter() + warmup + duration
+
+    async def worker(index):
+        rng = random.Random(seed * 100003 + index)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = build_request(name, rng, data, conflict_rate)
+            began = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except Exception as e:
+                status = e.__class__.__name__
+            if measuring:
+                stats.record(name, status, time.perf_counter() - began)
+
+    async def start_measuring():
+        nonlocal measuring
+        await asyncio.sleep(warmup)
+        measuring = True
+
+    timer = asyncio.create_task(start_measuring())
+    began = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    await timer
+    return stats, time.perf_counter() - began - warmup
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Percentil por rango más cercano."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(concurrency: int, stats: LevelStats, elapsed: float) -> dict:
+    endpoints = {}
+    total = 0
+    total_errors = 0
+    for name, latencies in sorted(stats.latencies.items()):
+        latencies.sort()
+        total += len(latencies)
+        total_errors += stats.errors[name]
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": stats.errors[name],
+            "statuses": dict(stats.statuses[name]),
+            "rps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+        }
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests": total,
+        "errors": total_errors,
+        "rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+async def drive_inprocess(app, args, mix, data, levels) -> list:
+    import httpx
+    from database.connection import async_engine
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        for concurrency in levels:
+            stats, elapsed = await run_level(
+                client, concurrency, args.duration, args.warmup, mix, args.conflict_rate, data, args.seed
+            )
+            results.append(summarize(concurrency, stats, elapsed))
+            print_level(results[-1])
+
+    # Las conexiones del pool async quedan ligadas a este event loop
+    await async_engine.dispose()
+    return results
+
+
+async def drive_http(base_url, args, mix, data, levels) -> list:
+    import httpx
+
+    results = []
+    for concurrency in levels:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            stats, elapsed = await run_level(
+                client, concurrency, args.duration, args.warmup, mix, args.conflict_rate, data, args.seed
+            )
+        results.append(summarize(concurrency, stats, elapsed))
+        print_level(results[-1])
+    return results
+
+
+def run_uvicorn(app, args, mix, data, levels) -> list:
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    # Fuera del hilo principal uvicorn no instala manejadores de señales
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit(f"❌ No se pudo iniciar uvicorn en el puerto {args.port}")
+        time.sleep(0.05)
+
+    try:
+        return asyncio.run(drive_http(f"http://127.0.0.1:{args.port}", args, mix, data, levels))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+
+
+# ============ REPORTE ============
+
+def print_level(level: dict):
+    print(f"\n▶ concurrencia {level['concurrency']}: {level['rps']:.1f} req/s, "
+          f"{level['requests']} peticiones, {level['errors']} errores")
+    print(f"  {'endpoint':<13} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  estados")
+    for name, endpoint in level["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(endpoint["statuses"].items()))
+        print(f"  {name:<13} {endpoint['rps']:>9.1f} {endpoint['p50_ms']:>9.2f} "
+              f"{endpoint['p95_ms']:>9.2f} {endpoint['p99_ms']:>9.2f}  {statuses}")
+
+
+def _delta(new: float, old: float) -> str:
+    if not old:
+        return "    n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def compare(results: dict, baseline: dict):
+    """Diferencias de throughput y p95 por endpoint contra un resultado anterior."""
+    print("\n" + "=" * 60)
+    print(f"📊 Comparación con {baseline['meta'].get('commit') or 'resultado anterior'}")
+    print("=" * 60)
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in results["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        print(f"\n▶ concurrencia {level['concurrency']}: req/s {_delta(level['rps'], old['rps'])}")
+        for name, endpoint in level["endpoints"].items():
+            old_endpoint = old["endpoints"].get(name)
+            if old_endpoint is None:
+                continue
+            print(f"  {name:<13} req/s {_delta(endpoint['rps'], old_endpoint['rps'])}   "
+                  f"p95 {_delta(endpoint['p95_ms'], old_endpoint['p95_ms'])}   "
+                  f"p99 {_delta(endpoint['p99_ms'], old_endpoint['p99_ms'])}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    levels = [int(value) for value in args.concurrency.split(",")]
+    configure_environment(args)
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    data = seed_database(args)
+
+    from database.connection import engine
+    from main import app
+
+    print("=" * 60)
+    print(f"🚀 Prueba de carga ({args.mode}, {engine.dialect.name})")
+    print(f"   Mezcla: {', '.join(f'{name}={weight:g}' for name, weight in mix.items())}, "
+          f"conflictos {args.conflict_rate:.0%}")
+    print(f"   {len(data.user_ids)} usuarios, {len(data.room_ids)} salas, "
+          f"{data.seeded} reservas previas")
+    print("=" * 60)
+
+    if args.mode == "inprocess":
+        levels_result = asyncio.run(drive_inprocess(app, args, mix, data, levels))
+    else:
+        levels_result = run_uvicorn(app, args, mix, data, levels)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "mode": args.mode,
+            "mix": mix,
+            "conflict_rate": args.conflict_rate,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "users": len(data.user_ids),
+            "rooms": len(data.room_ids),
+            "email_queue": args.email_queue,
+        },
+        "levels": levels_result,
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(results, output, indent=2)
+    print(f"\n✅ Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous:
+            compare(results, json.load(previous))
+
+
+if __name__ == "__main__":
+    main()
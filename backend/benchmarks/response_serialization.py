@@ -0,0 +1,155 @@
+"""
+Microbenchmark de la serialización de respuestas y de la validación de entrada.
+
+Respuesta: una lista de N reservas (500 por defecto) como la de
+GET /api/users/{id}/reservations.
+
+    legacy  objetos ReservationResponse armados a mano que FastAPI vuelve a
+            validar contra el response_model, pasa por jsonable_encoder y
+            serializa con json.dumps (como las rutas antes de utils/responses.py)
+    fast    dicts con la forma del esquema serializados una sola vez con
+            FastJSONResponse (pydantic_core.to_json)
+
+Entrada: el cuerpo JSON de POST /api/reservations validado con la versión
+anterior de ReservationCreate (validadores @validator de pydantic v1, que
+corren por la capa de compatibilidad) y con la actual (field_validator).
+
+Uso:
+    python benchmarks/response_serialization.py --items 500 --iterations 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import date, time as dtime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel, Field
+
+from routers.reservations import _reservation_payload, _room_payload
+from schemas import ReservationCreate, ReservationResponse, ReservationRoomInfo
+from utils.responses import FastJSONResponse
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from pydantic import validator
+
+    class LegacyReservationCreate(BaseModel):
+        """ReservationCreate antes de migrar a field_validator/ConfigDict"""
+        user_id: int = Field(..., alias="userId", gt=0)
+        room_id: int = Field(..., alias="roomId", gt=0)
+        date: date
+        start_time: dtime = Field(..., alias="startTime")
+        end_time: dtime = Field(..., alias="endTime")
+
+        @validator('end_time')
+        def end_time_after_start_time(cls, v, values):
+            if 'start_time' in values and v <= values['start_time']:
+                raise ValueError('end_time debe ser posterior a start_time')
+            return v
+
+        @validator('date')
+        def date_not_in_past(cls, v):
+            if v < date.today():
+                raise ValueError('No se pueden hacer reservas en fechas pasadas')
+            return v
+
+        class Config:
+            populate_by_name = True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de respuestas")
+    parser.add_argument("--items", type=int, default=500, help="Reservas por respuesta")
+    parser.add_argument("--iterations", type=int, default=500, help="Respuestas a serializar por modo")
+    parser.add_argument("--validations", type=int, default=50000, help="Cuerpos a validar por modo")
+    return parser.parse_args()
+
+
+def sample_rows(items: int):
+    """Tuplas como las del SELECT del listado."""
+    first_day = date.today()
+    return [
+        (
+            1000 + i, first_day + timedelta(days=i // 8), dtime(8 + i % 8, 0), dtime(9 + i % 8, 0),
+            i % 20 + 1, f"Sala {i % 20 + 1}", "Biblioteca Central"
+        )
+        for i in range(items)
+    ]
+
+
+def measure(label, run, iterations, unit):
+    run()  # calentar cachés
+    began = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    elapsed = time.perf_counter() - began
+    rate = iterations / elapsed
+    print(f"{label:>9}: {rate:>10.0f} {unit}/s ({elapsed / iterations * 1e6:.1f} µs c/u)")
+    return rate
+
+
+def main():
+    args = parse_args()
+    rows = sample_rows(args.items)
+    field = create_response_field(name="Response", type_=List[ReservationResponse], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def legacy_response():
+        content = [
+            ReservationResponse(
+                id=reservation_id,
+                room=ReservationRoomInfo(id=room_id, name=room_name, libraryName=library_name),
+                date=reservation_date,
+                startTime=start_time,
+                endTime=end_time,
+                emailSent=True
+            )
+            for reservation_id, reservation_date, start_time, end_time, room_id, room_name, library_name in rows
+        ]
+        serialized = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(serialized).body
+
+    def fast_response():
+        rooms = {}
+        payload = []
+        for reservation_id, reservation_date, start_time, end_time, room_id, room_name, library_name in rows:
+            room = rooms.get(room_id)
+            if room is None:
+                room = rooms[room_id] = _room_payload(room_id, room_name, library_name)
+            payload.append(_reservation_payload(reservation_id, room, reservation_date, start_time, end_time))
+        return FastJSONResponse(payload).body
+
+    # Ambos caminos deben producir el mismo JSON
+    assert json.loads(legacy_response()) == json.loads(fast_response())
+
+    print(f"Respuesta: lista de {args.items} reservas, {args.iterations} respuestas por modo")
+    legacy = measure("legacy", legacy_response, args.iterations, "respuestas")
+    fast = measure("fast", fast_response, args.iterations, "respuestas")
+    print(f"fast / legacy: {fast / legacy:.1f}x")
+
+    body = json.dumps({
+        "userId": 1, "roomId": 2, "date": (date.today() + timedelta(days=7)).isoformat(),
+        "startTime": "14:00", "endTime": "16:00"
+    })
+    print(f"\nValidación de ReservationCreate, {args.validations} cuerpos por modo")
+    legacy = measure("legacy", lambda: LegacyReservationCreate.model_validate_json(body), args.validations, "cuerpos")
+    fast = measure("current", lambda: ReservationCreate.model_validate_json(body), args.validations, "cuerpos")
+    print(f"current / legacy: {fast / legacy:.1f}x")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
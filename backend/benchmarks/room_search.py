@@ -0,0 +1,122 @@
+"""
+Microbenchmark de la búsqueda de salas (GET /api/rooms con filtros).
+
+Sobre un catálogo sintético de N salas (2000 por defecto) compara:
+
+    scan   recorrer la lista de salas comparando subcadenas normalizadas y la
+           capacidad, ordenar y serializar las coincidencias (lo que haría la
+           ruta sin índice)
+    index  RoomSearchIndex: n-gramas y capacidad como mapas de bits, JSON de
+           cada sala ya serializado
+
+Uso:
+    python benchmarks/room_search.py --rooms 2000 --iterations 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic_core import to_json
+
+from utils.room_search import RoomSearchIndex, normalize
+
+LIBRARIES = [
+    "Biblioteca Central", "Biblioteca de Ingeniería", "Biblioteca Médica",
+    "Biblioteca de Humanidades", "Biblioteca de Ciencias", "Biblioteca de Derecho",
+    "Biblioteca de Arquitectura", "Biblioteca Económica",
+]
+KINDS = ["Sala de Estudio", "Sala Grupal", "Cubículo", "Auditorio", "Sala de Lectura", "Laboratorio"]
+
+QUERIES = [
+    {"query": "grupal"},
+    {"query": "sala ingenieria"},
+    {"query": "cub", "min_capacity": 2, "max_capacity": 4},
+    {"library": "Biblioteca Central", "sort": "name", "limit": 20},
+    {"min_capacity": 10, "sort": "-capacity", "limit": 20},
+    {"query": "lectura 1", "sort": "library"},
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de salas")
+    parser.add_argument("--rooms", type=int, default=2000, help="Salas en el catálogo")
+    parser.add_argument("--iterations", type=int, default=2000, help="Búsquedas por consulta y modo")
+    return parser.parse_args()
+
+
+def sample_rooms(count: int):
+    rng = random.Random(42)
+    return [
+        (room_id, f"{rng.choice(KINDS)} {room_id}", rng.choice(LIBRARIES), rng.choice([2, 4, 6, 8, 12, 20, 40]))
+        for room_id in range(1, count + 1)
+    ]
+
+
+def scan_search(rooms, query=None, library=None, min_capacity=None, max_capacity=None,
+                sort="id", limit=None, offset=0):
+    terms = normalize(query).split() if query else []
+    library = normalize(library) if library else None
+    matches = []
+    for room_id, name, library_name, capacity in rooms:
+        if min_capacity is not None and capacity < min_capacity:
+            continue
+        if max_capacity is not None and capacity > max_capacity:
+            continue
+        name_text, library_text = normalize(name), normalize(library_name)
+        if library is not None and library_text != library:
+            continue
+        if all(term in name_text or term in library_text for term in terms):
+            matches.append((room_id, name, library_name, capacity))
+
+    keys = {
+        "id": lambda room: room[0],
+        "name": lambda room: (normalize(room[1]), room[0]),
+        "capacity": lambda room: (room[3], room[0]),
+        "library": lambda room: (normalize(room[2]), normalize(room[1]), room[0]),
+    }
+    matches.sort(key=keys[sort.lstrip("-")], reverse=sort.startswith("-"))
+    end = None if limit is None else offset + limit
+    return to_json([
+        {"id": room_id, "name": name, "libraryName": library_name, "capacity": capacity}
+        for room_id, name, library_name, capacity in matches[offset:end]
+    ])
+
+
+def measure(run, iterations):
+    run()  # calentar cachés
+    began = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - began) / iterations * 1e6
+
+
+def main():
+    args = parse_args()
+    rooms = sample_rooms(args.rooms)
+    fragments = [
+        to_json({"id": room_id, "name": name, "libraryName": library_name, "capacity": capacity})
+        for room_id, name, library_name, capacity in rooms
+    ]
+
+    began = time.perf_counter()
+    index = RoomSearchIndex(rooms, fragments)
+    print(f"Índice de {args.rooms} salas construido en {(time.perf_counter() - began) * 1e3:.1f} ms\n")
+
+    print(f"{'consulta':<62} {'total':>6} {'scan µs':>9} {'index µs':>9}")
+    for params in QUERIES:
+        result = index.search(**params)
+        # Ambos caminos deben devolver lo mismo
+        assert result.body == scan_search(rooms, **params), params
+        scan = measure(lambda: scan_search(rooms, **params), max(1, args.iterations // 20))
+        indexed = measure(lambda: index.search(**params), args.iterations)
+        print(f"{str(params):<62} {result.total:>6} {scan:>9.1f} {indexed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
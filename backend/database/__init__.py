@@ -1,5 +1,13 @@
 # Database package
-from database.connection import Base, engine, get_db
-from database.models import User, Room, Reservation
+from database.connection import Base, engine, async_engine, get_db, get_sync_db
+from database.models import User, Room, Reservation, ReservationArchive, EmailOutbox, IdempotencyKey
+from database.overlap_guard import install_overlap_guard
+from database.retry import run_with_retry, is_overlap_error, is_retryable_error
+from database.replicas import replica_router, get_read_db, get_user_read_db
 
-__all__ = ["Base", "engine", "get_db", "User", "Room", "Reservation"]
+__all__ = [
+    "Base", "engine", "async_engine", "get_db", "get_sync_db",
+    "User", "Room", "Reservation", "ReservationArchive", "EmailOutbox", "IdempotencyKey",
+    "install_overlap_guard", "run_with_retry", "is_overlap_error", "is_retryable_error",
+    "replica_router", "get_read_db", "get_user_read_db"
+]
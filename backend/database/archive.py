@@ -0,0 +1,140 @@
+"""
+Archivado de reservas pasadas (separación de datos activos e históricos).
+
+La tabla `reservations` solo crece, pero las consultas calientes (conflictos,
+disponibilidad, próximas reservas) solo miran fechas desde hoy. Las reservas
+con fecha anterior a hoy menos RESERVATIONS_ARCHIVE_AFTER_DAYS días se mueven
+a `reservations_archive` (database/models.py), para que la tabla activa y sus
+índices queden del tamaño de la ventana de reservas vigente.
+
+El job mueve lotes de hasta RESERVATIONS_ARCHIVE_BATCH_SIZE filas, de la más
+antigua a la más nueva. Cada lote es una transacción propia: copia las filas
+al archivo y las borra de la tabla activa. Un job interrumpido deja los
+lotes ya confirmados archivados y el resto intacto, y al volver a
+ejecutarlo continúa donde quedó.
+
+Los listados consultan el archivo solo cuando se piden datos pasados
+(includes_archived): scope=past o un rango (from/to) que empieza antes del
+horizonte. Como el horizonte se mide desde hoy, una fecha archivada siempre
+queda antes del horizonte que calcula la API.
+
+Uso: python scripts/archive_reservations.py [--dry-run] [--batch-size N]
+"""
+
+import logging
+import os
+import time as _time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.engine import Connection, Engine
+
+from database.models import Reservation, ReservationArchive
+
+logger = logging.getLogger(__name__)
+
+RESERVATIONS_ARCHIVE_AFTER_DAYS = int(os.getenv("RESERVATIONS_ARCHIVE_AFTER_DAYS", "90"))
+RESERVATIONS_ARCHIVE_BATCH_SIZE = int(os.getenv("RESERVATIONS_ARCHIVE_BATCH_SIZE", "1000"))
+
+_COLUMNS = ("id", "user_id", "room_id", "date", "start_time", "end_time", "created_at")
+
+
+def archive_cutoff(today: Optional[date] = None) -> date:
+    """Primera fecha que se mantiene en la tabla activa; las anteriores se archivan."""
+    return (today or date.today()) - timedelta(days=RESERVATIONS_ARCHIVE_AFTER_DAYS)
+
+
+def includes_archived(scope: Optional[str], from_date: Optional[date], to_date: Optional[date] = None) -> bool:
+    """
+    Indica si un listado debe unir el archivo.
+
+    Solo cuando se piden datos pasados: un rango (from o to) que llega a
+    fechas anteriores al horizonte o, sin fechas, scope=past. El listado por
+    defecto (sin scope ni fechas) y scope=upcoming leen solo la tabla activa:
+    el historial archivado se pide explícitamente.
+    """
+    if scope == "upcoming":
+        return False
+    cutoff = archive_cutoff()
+    if from_date is not None:
+        return from_date < cutoff
+    if to_date is not None:
+        return to_date < cutoff or scope == "past"
+    return scope == "past"
+
+
+def pending_count(connection: Connection, cutoff: Optional[date] = None) -> int:
+    """Reservas de la tabla activa que el próximo job archivaría."""
+    cutoff = cutoff or archive_cutoff()
+    return connection.execute(
+        select(func.count()).select_from(Reservation).where(Reservation.date < cutoff)
+    ).scalar()
+
+
+def archive_batch(connection: Connection, cutoff: date, batch_size: int = RESERVATIONS_ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Mueve al archivo hasta batch_size reservas anteriores a cutoff, las más antiguas primero.
+
+    Se ejecuta dentro de la transacción de `connection`: la copia y el borrado
+    se confirman juntos.
+
+    Returns:
+        int: Reservas movidas (0 cuando no quedan)
+    """
+    # Los ids se leen primero: MySQL no admite borrar filtrando con una
+    # subconsulta sobre la misma tabla
+    ids = connection.execute(
+        select(Reservation.id)
+        .where(Reservation.date < cutoff)
+        .order_by(Reservation.date, Reservation.id)
+        .limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    connection.execute(
+        insert(ReservationArchive).from_select(
+            [*_COLUMNS, "archived_at"],
+            select(
+                *(getattr(Reservation, column) for column in _COLUMNS),
+                literal(datetime.utcnow(), ReservationArchive.archived_at.type)
+            ).where(Reservation.id.in_(ids))
+        )
+    )
+    connection.execute(delete(Reservation).where(Reservation.id.in_(ids)))
+    return len(ids)
+
+
+def archive_reservations(
+    engine: Engine,
+    cutoff: Optional[date] = None,
+    batch_size: int = RESERVATIONS_ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    pause: float = 0.0
+) -> int:
+    """
+    Archiva todas las reservas anteriores a cutoff, un lote por transacción.
+
+    Args:
+        cutoff: Por defecto archive_cutoff()
+        max_batches: Detenerse tras esta cantidad de lotes (el resto queda para la próxima ejecución)
+        pause: Segundos de espera entre lotes, para repartir la carga sobre la base de datos
+
+    Returns:
+        int: Total de reservas movidas
+    """
+    cutoff = cutoff or archive_cutoff()
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with engine.begin() as connection:
+            moved = archive_batch(connection, cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+        logger.info(f"Archived {moved} reservations (total {total})")
+        if pause:
+            _time.sleep(pause)
+    return total
@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date, Time, ForeignKey, UniqueConstraint
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from database.pool import pool_options, instrument_pool
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -10,21 +12,67 @@ load_dotenv()
 # Database URL configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./biblioreservas.db")
 
-# Create engine
+# Drivers asíncronos equivalentes a los drivers síncronos de DATABASE_URL
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Convierte una URL de SQLAlchemy síncrona a su equivalente asíncrona."""
+    scheme, separator, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+# Se puede sobreescribir si el driver asíncrono necesita otra URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Create engine (síncrono: scripts, seed y diagnóstico)
+# El pool se configura con DB_POOL_PROFILE / DB_POOL_* (ver database/pool.py)
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    **pool_options(DATABASE_URL)
 )
+instrument_pool("sync", engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine asíncrono usado por la API. Para SQLite en archivo, aiosqlite usa
+# NullPool por defecto (una conexión y un hilo nuevos por petición): el pool
+# explícito de pool_options aplica a todos los motores
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **pool_options(ASYNC_DATABASE_URL, is_async=True)
+)
+instrument_pool("primary", async_engine.sync_engine)
+
+# Sesiones asíncronas. expire_on_commit=False evita recargas implícitas (que
+# no están permitidas con AsyncSession) al leer atributos después del commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
 
 # Dependency to get DB session
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependencia síncrona, para código que todavía no es asíncrono
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
@@ -0,0 +1,270 @@
+"""
+Migraciones de esquema versionadas.
+
+`Base.metadata.create_all` crea las tablas que faltan pero nunca modifica las
+existentes, así que los índices agregados después no llegan a las bases de
+datos que ya están en uso. Cada migración tiene un número de versión; las
+aplicadas quedan registradas en la tabla `schema_migrations` y `upgrade()`
+ejecuta solo las pendientes, en orden.
+
+Las migraciones son idempotentes (comprueban lo que ya existe), por lo que
+se pueden aplicar tanto sobre una base de datos recién creada como sobre una
+antigua. Las que crean índices se ejecutan fuera de una transacción: en
+PostgreSQL usan CREATE INDEX CONCURRENTLY para no bloquear las escrituras
+sobre una tabla en producción.
+
+Uso: python scripts/migrate.py [--status] [--to VERSION]
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from database.connection import Base
+from database.models import EmailOutbox, IdempotencyKey, Reservation, ReservationArchive
+from database.overlap_guard import install_overlap_guard
+
+logger = logging.getLogger(__name__)
+
+# Tabla propia, fuera de Base: no es parte del modelo de la aplicación
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Clave del advisory lock de PostgreSQL: evita que dos despliegues migren a la vez
+_POSTGRES_LOCK_KEY = 7_341_016
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+    # False: se ejecuta en autocommit (CREATE INDEX CONCURRENTLY no admite transacciones)
+    transactional: bool = True
+
+
+def _model_index(table, name: str):
+    for index in table.indexes:
+        if index.name == name:
+            return index
+    raise KeyError(f"Índice {name} no definido en {table.name}")
+
+
+def ensure_index(connection: Connection, index) -> bool:
+    """
+    Crea un índice del modelo si no existe en la base de datos.
+
+    Returns:
+        bool: True si se creó
+    """
+    dialect = connection.dialect.name
+    quote = connection.dialect.identifier_preparer.quote
+    table = index.table.name
+    columns = ", ".join(quote(column.name) for column in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+
+    if dialect == "postgresql":
+        # Un CREATE INDEX CONCURRENTLY interrumpido deja un índice inválido
+        # que IF NOT EXISTS daría por bueno: se elimina y se vuelve a crear
+        valid = connection.execute(text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name"
+        ), {"name": index.name}).scalar()
+        if valid:
+            return False
+        if valid is False:
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {quote(index.name)}"))
+        connection.execute(text(
+            f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {quote(index.name)} "
+            f"ON {quote(table)} ({columns})"
+        ))
+        return True
+
+    existing = {item["name"] for item in inspect(connection).get_indexes(table)}
+    if index.name in existing:
+        return False
+    connection.execute(text(f"CREATE {unique}INDEX {quote(index.name)} ON {quote(table)} ({columns})"))
+    return True
+
+
+def analyze(connection: Connection, *tables: str):
+    """Actualiza las estadísticas del planificador tras crear índices."""
+    dialect = connection.dialect.name
+    quote = connection.dialect.identifier_preparer.quote
+    for table in tables:
+        if dialect == "mysql":
+            connection.execute(text(f"ANALYZE TABLE {quote(table)}"))
+        elif dialect in ("postgresql", "sqlite"):
+            connection.execute(text(f"ANALYZE {quote(table)}"))
+
+
+# ============ MIGRACIONES ============
+
+def _initial_schema(connection: Connection):
+    # Tablas que falten (incluidos sus índices) y la protección anti-solapamiento,
+    # que create_all no instala en tablas ya existentes
+    Base.metadata.create_all(bind=connection)
+    install_overlap_guard(connection)
+
+
+def _table_migration(table) -> Callable[[Connection], None]:
+    def apply(connection: Connection):
+        # checkfirst: la migración inicial ya la crea en bases de datos nuevas
+        table.create(bind=connection, checkfirst=True)
+    return apply
+
+
+def _index_migration(table, name: str) -> Callable[[Connection], None]:
+    def apply(connection: Connection):
+        if ensure_index(connection, _model_index(table, name)):
+            logger.info(f"Created index {name}")
+            analyze(connection, table.name)
+    return apply
+
+
+def _reservations_autoincrement(connection: Connection):
+    """
+    SQLite: reconstruye `reservations` con AUTOINCREMENT.
+
+    Sin AUTOINCREMENT, SQLite asigna el mayor id más uno y vuelve a usar los
+    ids de las filas borradas al final de la tabla; un id reutilizado chocaría
+    con la clave primaria de `reservations_archive` al archivarse. SQLite no
+    puede agregar AUTOINCREMENT a una tabla existente: se copia a una nueva.
+    PostgreSQL y MySQL no reutilizan ids.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    quote = connection.dialect.identifier_preparer.quote
+
+    table_sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'reservations'"
+    )).scalar()
+    if "AUTOINCREMENT" not in table_sql.upper():
+        connection.execute(text("ALTER TABLE reservations RENAME TO reservations_old"))
+        # Los índices y triggers conservan su nombre al renombrar la tabla:
+        # se eliminan para crearlos de nuevo sobre la tabla nueva
+        for kind, name in connection.execute(text(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE tbl_name = 'reservations_old' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        )).all():
+            connection.execute(text(f"DROP {kind.upper()} {quote(name)}"))
+        # Incluye los índices del modelo y los triggers anti-solapamiento (after_create)
+        Reservation.__table__.create(bind=connection)
+        columns = ", ".join(quote(column.name) for column in Reservation.__table__.columns)
+        connection.execute(text(f"INSERT INTO reservations ({columns}) SELECT {columns} FROM reservations_old"))
+        connection.execute(text("DROP TABLE reservations_old"))
+
+    # El contador sigue después del mayor id asignado, también de los ya archivados
+    top = max(
+        connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM reservations")).scalar(),
+        connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM reservations_archive")).scalar(),
+    )
+    if top:
+        updated = connection.execute(
+            text("UPDATE sqlite_sequence SET seq = MAX(seq, :top) WHERE name = 'reservations'"), {"top": top}
+        ).rowcount
+        if not updated:
+            connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('reservations', :top)"),
+                               {"top": top})
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_schema", _initial_schema),
+    # "Mis Reservas": filtro por usuario, rango de fechas y orden por fecha/hora
+    Migration(2, "reservations_user_date_start",
+              _index_migration(Reservation.__table__, "ix_reservations_user_date_start"),
+              transactional=False),
+    # Disponibilidad del día: date = ? devolviendo sala y horario sin leer la tabla
+    Migration(3, "reservations_date_room_times",
+              _index_migration(Reservation.__table__, "ix_reservations_date_room_times"),
+              transactional=False),
+    # Relay del outbox: filas pendientes en orden de inserción
+    Migration(4, "email_outbox_status_id",
+              _index_migration(EmailOutbox.__table__, "ix_email_outbox_status_id"),
+              transactional=False),
+    # Respuestas guardadas de POST /api/reservations con Idempotency-Key
+    Migration(5, "idempotency_keys", _table_migration(IdempotencyKey.__table__)),
+    # Reservas pasadas archivadas (scripts/archive_reservations.py)
+    Migration(6, "reservations_archive", _table_migration(ReservationArchive.__table__)),
+    # SQLite: ids de reservas sin reutilizar, para poder archivarlas por id
+    Migration(7, "reservations_autoincrement", _reservations_autoincrement),
+]
+
+
+# ============ EJECUCIÓN ============
+
+def applied_versions(connection: Connection) -> dict:
+    """Versiones aplicadas: {version: (name, applied_at)}."""
+    _metadata.create_all(bind=connection, checkfirst=True)
+    rows = connection.execute(
+        select(schema_migrations.c.version, schema_migrations.c.name, schema_migrations.c.applied_at)
+    ).all()
+    return {version: (name, applied_at) for version, name, applied_at in rows}
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def pending_migrations(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [
+        migration for migration in MIGRATIONS
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+
+def _apply(engine: Engine, migration: Migration):
+    if migration.transactional:
+        with engine.begin() as connection:
+            migration.apply(connection)
+            _record(connection, migration)
+    else:
+        with engine.connect() as raw:
+            connection = raw.execution_options(isolation_level="AUTOCOMMIT")
+            migration.apply(connection)
+            _record(connection, migration)
+
+
+def _record(connection: Connection, migration: Migration):
+    connection.execute(schema_migrations.insert().values(
+        version=migration.version,
+        name=migration.name,
+        applied_at=datetime.utcnow()
+    ))
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """
+    Aplica en orden las migraciones pendientes hasta `target` (todas por defecto).
+
+    Returns:
+        List[Migration]: Migraciones aplicadas en esta llamada
+    """
+    lock = None
+    if engine.dialect.name == "postgresql":
+        lock = engine.connect()
+        lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _POSTGRES_LOCK_KEY})
+
+    try:
+        # Se recalcula con el lock tomado: otro proceso pudo haber migrado antes
+        applied = []
+        for migration in pending_migrations(engine, target):
+            logger.info(f"Applying migration {migration.version}: {migration.name}")
+            _apply(engine, migration)
+            applied.append(migration)
+        return applied
+    finally:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _POSTGRES_LOCK_KEY})
+            lock.close()
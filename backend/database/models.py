@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, DateTime, UniqueConstraint, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database.connection import Base
@@ -52,11 +52,101 @@ class Reservation(Base):
     user = relationship("User", back_populates="reservations")
     room = relationship("Room", back_populates="reservations")
 
-    # Constraint único para evitar dobles reservas de la misma sala en el mismo horario
+    # Constraint único para evitar dobles reservas de la misma sala en el mismo horario.
+    # Su índice (room_id, date, start_time, end_time) también cubre las consultas
+    # de conflictos por sala y fecha (índice en memoria, reservas en lote)
     __table_args__ = (
         UniqueConstraint('room_id', 'date', 'start_time', 'end_time', 
                         name='uq_room_datetime'),
+        # Listado paginado de "Mis Reservas": filtro por usuario y orden por fecha/hora
+        Index("ix_reservations_user_date_start", "user_id", "date", "start_time"),
+        # Disponibilidad de un día: índice cubriente, no lee la tabla
+        Index("ix_reservations_date_room_times", "date", "room_id", "start_time", "end_time"),
+        # SQLite reutiliza el mayor id si se borra su fila: con AUTOINCREMENT un
+        # id archivado nunca vuelve a asignarse (el archivo lo usa como clave)
+        {"sqlite_autoincrement": True},
     )
 
     def __repr__(self):
         return f"<Reservation(id={self.id}, room_id={self.room_id}, date={self.date}, time={self.start_time}-{self.end_time})>"
+
+
+class ReservationArchive(Base):
+    """
+    Reservas pasadas movidas fuera de la tabla `reservations`.
+
+    Las filas conservan el id original. La tabla la llena el job de archivado
+    (database/archive.py, scripts/archive_reservations.py). No tiene
+    constraint único ni protección anti-solapamiento: una reserva pasada ya
+    no puede entrar en conflicto con otra.
+    """
+    __tablename__ = "reservations_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Historial de "Mis Reservas", mismo orden que en la tabla activa
+        Index("ix_reservations_archive_user_date_start", "user_id", "date", "start_time"),
+        # Disponibilidad de una fecha pasada
+        Index("ix_reservations_archive_date_room", "date", "room_id"),
+    )
+
+    def __repr__(self):
+        return f"<ReservationArchive(id={self.id}, room_id={self.room_id}, date={self.date})>"
+
+
+class EmailOutbox(Base):
+    """
+    Outbox transaccional de emails.
+
+    Cada fila se escribe en la misma transacción que la reserva que la
+    origina; el relay (utils/outbox_relay.py) las publica en la cola y las
+    marca como enviadas.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    task_type = Column(String(50), nullable=False, default="reservation_confirmation")
+    payload = Column(Text, nullable=False)  # JSON con los datos del email
+    status = Column(String(20), nullable=False, default="pending")  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    # El relay recorre las filas pendientes en orden de inserción
+    __table_args__ = (
+        Index("ix_email_outbox_status_id", "status", "id"),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, type='{self.task_type}', status='{self.status}')>"
+
+
+class IdempotencyKey(Base):
+    """
+    Respuesta guardada de una petición con Idempotency-Key.
+
+    Solo se usa con IDEMPOTENCY_BACKEND=database (ver utils/idempotency.py):
+    la clave primaria garantiza que, entre todos los workers, una sola
+    petición con la misma clave ejecute la operación.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(300), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 del cuerpo de la petición
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress | completed
+    status_code = Column(Integer, nullable=True)
+    body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key='{self.key}', status='{self.status}')>"
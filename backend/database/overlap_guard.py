@@ -0,0 +1,104 @@
+"""
+Protección contra reservas solapadas aplicada por la base de datos.
+
+- PostgreSQL: constraint de exclusión sobre (room_id, tsrange(date + start_time,
+  date + end_time)) usando la extensión btree_gist.
+- SQLite: triggers BEFORE INSERT/UPDATE que abortan si el nuevo horario se
+  solapa con otra reserva de la misma sala y fecha.
+
+El índice en memoria (utils/interval_index.py) rechaza rápido los conflictos
+evidentes, pero con varios workers dos peticiones pueden pasar ese chequeo a la
+vez. Esta capa es la que garantiza que solo una de ellas se guarde.
+"""
+
+import logging
+
+from sqlalchemy import event, text
+
+from database.models import Reservation
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_CONSTRAINT_NAME = "ex_reservations_room_overlap"
+OVERLAP_TRIGGER_MESSAGE = "reservation_overlap"
+
+_POSTGRES_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint WHERE conname = '{OVERLAP_CONSTRAINT_NAME}'
+        ) THEN
+            ALTER TABLE reservations
+                ADD CONSTRAINT {OVERLAP_CONSTRAINT_NAME}
+                EXCLUDE USING gist (
+                    room_id WITH =,
+                    tsrange(date + start_time, date + end_time, '[)') WITH &&
+                );
+        END IF;
+    END
+    $$
+    """,
+]
+
+_SQLITE_STATEMENTS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_reservations_no_overlap_insert
+    BEFORE INSERT ON reservations
+    FOR EACH ROW
+    WHEN EXISTS (
+        SELECT 1 FROM reservations
+        WHERE room_id = NEW.room_id
+          AND date = NEW.date
+          AND start_time < NEW.end_time
+          AND end_time > NEW.start_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, '{OVERLAP_TRIGGER_MESSAGE}');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_reservations_no_overlap_update
+    BEFORE UPDATE OF room_id, date, start_time, end_time ON reservations
+    FOR EACH ROW
+    WHEN EXISTS (
+        SELECT 1 FROM reservations
+        WHERE id != NEW.id
+          AND room_id = NEW.room_id
+          AND date = NEW.date
+          AND start_time < NEW.end_time
+          AND end_time > NEW.start_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, '{OVERLAP_TRIGGER_MESSAGE}');
+    END
+    """,
+]
+
+
+def install_overlap_guard(connection):
+    """
+    Instala el constraint/trigger anti-solapamiento si no existe.
+
+    Es idempotente, así que puede ejecutarse sobre bases de datos ya
+    existentes (por ejemplo desde scripts/seed.py).
+    """
+    dialect = connection.dialect.name
+
+    if dialect == "postgresql":
+        statements = _POSTGRES_STATEMENTS
+    elif dialect == "sqlite":
+        statements = _SQLITE_STATEMENTS
+    else:
+        logger.warning(f"Protección de solapamientos no disponible para {dialect}")
+        return False
+
+    for statement in statements:
+        connection.execute(text(statement))
+    return True
+
+
+@event.listens_for(Reservation.__table__, "after_create")
+def _install_after_create(target, connection, **kw):
+    install_overlap_guard(connection)
@@ -0,0 +1,191 @@
+"""
+Configuración e instrumentación del pool de conexiones.
+
+El tamaño del pool, el overflow, el timeout, el reciclado y el pre-ping se
+toman de un perfil de despliegue (DB_POOL_PROFILE) y cada valor puede
+sobreescribirse con su propia variable de entorno:
+
+    DB_POOL_PROFILE    development | production | worker (por defecto development)
+    DB_POOL_SIZE       conexiones que se mantienen abiertas
+    DB_MAX_OVERFLOW    conexiones extra permitidas sobre DB_POOL_SIZE
+    DB_POOL_TIMEOUT    segundos de espera máxima por una conexión libre
+    DB_POOL_RECYCLE    segundos tras los cuales se recicla una conexión (-1 = nunca)
+    DB_POOL_PRE_PING   true/false, verificar la conexión antes de usarla
+
+Los pools se crean con subclases instrumentadas de QueuePool que registran el
+tiempo de espera en cada checkout; junto con los eventos del pool (connect,
+checkout, checkin, invalidate) se exponen vía get_pool_stats().
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+POOL_PROFILES = {
+    # Valores por defecto de SQLAlchemy
+    "development": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False},
+    # RDS: más conexiones, fallar rápido si se agota y evitar conexiones muertas tras periodos inactivos
+    "production": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 5, "pool_recycle": 1800, "pool_pre_ping": True},
+    # Procesos en segundo plano (workers, relays, scripts largos)
+    "worker": {"pool_size": 2, "max_overflow": 2, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True},
+}
+
+_ENV_OVERRIDES = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda value: value.lower() == "true"),
+}
+
+# Límites (en segundos) del histograma de espera por conexión
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_pool_settings(profile: str = None) -> dict:
+    """Configuración del pool según el perfil y las variables de entorno."""
+    profile = profile or os.getenv("DB_POOL_PROFILE", "development")
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Perfil de pool desconocido: {profile}")
+
+    settings = dict(POOL_PROFILES[profile])
+    for key, (env_var, parse) in _ENV_OVERRIDES.items():
+        value = os.getenv(env_var)
+        if value:
+            settings[key] = parse(value)
+    return settings
+
+
+class PoolStats:
+    """Contadores de un pool, actualizados por los eventos y los checkouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+            self.wait_buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class _InstrumentedPoolMixin:
+    """Mide cuánto espera cada checkout por una conexión libre."""
+
+    _stats: PoolStats = None
+
+    def _do_get(self):
+        began = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self._stats is not None:
+                self._stats.record_wait(time.perf_counter() - began, timed_out=True)
+            raise
+        if self._stats is not None:
+            self._stats.record_wait(time.perf_counter() - began)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recrea el pool: conservar las estadísticas
+        pool = super().recreate()
+        pool._stats = self._stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_pools: Dict[str, object] = {}
+
+
+def pool_options(url: str, is_async: bool = False, profile: str = None) -> dict:
+    """
+    Argumentos de create_engine/create_async_engine para el pool.
+
+    Las bases SQLite en memoria usan el pool propio del dialecto (una sola
+    conexión compartida), por lo que no se configuran.
+    """
+    scheme, _, location = url.partition("://")
+    if scheme.startswith("sqlite") and (location == "" or ":memory:" in location):
+        return {}
+
+    options = get_pool_settings(profile)
+    options["poolclass"] = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    return options
+
+
+def instrument_pool(name: str, engine):
+    """Registra el pool de un engine para get_pool_stats()."""
+    pool = engine.pool
+    if not isinstance(pool, _InstrumentedPoolMixin):
+        return
+
+    stats = PoolStats()
+    pool._stats = stats
+    _pools[name] = engine
+
+    event.listen(pool, "connect", lambda *args: stats.increment("connects"))
+    event.listen(pool, "checkout", lambda *args: stats.increment("checkouts"))
+    event.listen(pool, "checkin", lambda *args: stats.increment("checkins"))
+    event.listen(pool, "invalidate", lambda *args: stats.increment("invalidations"))
+    event.listen(pool, "soft_invalidate", lambda *args: stats.increment("invalidations"))
+
+
+def get_pool_stats() -> dict:
+    """Estado y contadores de todos los pools registrados."""
+    result = {}
+    for name, engine in _pools.items():
+        pool = engine.pool
+        stats = pool._stats
+        result[name] = {
+            "size": pool.size(),
+            "checkedOut": pool.checkedout(),
+            "checkedIn": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "maxOverflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "connects": stats.connects,
+            "checkouts": stats.checkouts,
+            "checkins": stats.checkins,
+            "invalidations": stats.invalidations,
+            "timeouts": stats.timeouts,
+            "wait": {
+                "count": stats.wait_count,
+                "sumSeconds": round(stats.wait_sum, 6),
+                "maxSeconds": round(stats.wait_max, 6),
+                "buckets": {
+                    **{str(limit): count for limit, count in zip(WAIT_BUCKETS, stats.wait_buckets)},
+                    "+Inf": stats.wait_buckets[-1],
+                },
+            },
+        }
+    return result
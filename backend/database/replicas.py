@@ -0,0 +1,294 @@
+"""
+Ruteo de lecturas a réplicas de solo lectura.
+
+Con DATABASE_REPLICA_URLS (lista separada por comas, mismo formato que
+DATABASE_URL) las rutas de solo lectura (disponibilidad, "Mis Reservas") usan
+las dependencias get_read_db / get_user_read_db, que reparten las sesiones
+entre las réplicas por round-robin, y la caché del catálogo de salas recarga
+con replica_router.session(). Sin réplicas configuradas todas equivalen a
+get_db.
+
+- Salud: una tarea en segundo plano mide cada REPLICA_CHECK_INTERVAL segundos
+  el retraso de replicación de cada réplica. Las réplicas que no responden o
+  cuyo retraso supera REPLICA_MAX_LAG dejan de recibir lecturas hasta el
+  próximo chequeo exitoso. Si una réplica falla al abrir la conexión se marca
+  caída de inmediato y se prueba la siguiente; sin réplicas disponibles, la
+  lectura va a la primaria.
+- Lectura de lo propio: después de que un usuario escribe (p. ej. crea una
+  reserva), sus lecturas van a la primaria durante READ_YOUR_WRITES_WINDOW
+  segundos, para que vea su reserva aunque la réplica vaya atrasada. El
+  registro es por proceso: con varios workers, el límite de retraso
+  (REPLICA_MAX_LAG) acota lo que puede ver otro worker.
+
+Las escrituras siempre usan get_db (primaria), y también el estado inicial
+del stream de disponibilidad, que no puede perder lo confirmado antes de la
+suscripción. El estado de las réplicas se expone en /health/replicas y en
+/metrics (db_replica_lag_seconds, db_replica_up).
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time as _time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.connection import AsyncSessionLocal, to_async_url
+from database.pool import instrument_pool, pool_options
+from utils.metrics import registry, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", "2"))
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "10"))
+
+# Clave en Session.info con el nombre de la réplica de la sesión
+REPLICA_SESSION_KEY = "replica"
+
+db_replica_lag_seconds = registry.register(Gauge(
+    "db_replica_lag_seconds", "Retraso de replicación medido en el último chequeo", ("replica",)
+))
+db_replica_up = registry.register(Gauge(
+    "db_replica_up", "1 si la réplica recibe lecturas", ("replica",)
+))
+db_read_routing_total = registry.register(Counter(
+    "db_read_routing_total", "Sesiones de lectura por destino", ("target",)
+))
+
+# Retraso en segundos de la réplica a la que se conecta (None si la replicación está detenida)
+_LAG_QUERIES = {
+    # Sin WAL pendiente de aplicar no hay retraso, aunque la última transacción sea antigua
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    return REPLICA_SESSION_KEY in session.info
+
+
+class Replica:
+    """Una réplica con su engine y el resultado del último chequeo."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        async_url = to_async_url(url)
+        self.engine = create_async_engine(async_url, **pool_options(async_url, is_async=True))
+        instrument_pool(name, self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(
+            bind=self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+            info={REPLICA_SESSION_KEY: name}
+        )
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+
+    async def measure_lag(self) -> Optional[float]:
+        async with self.engine.connect() as connection:
+            dialect = connection.dialect.name
+            if dialect == "mysql":
+                # MySQL 8.0.22+ usa SHOW REPLICA STATUS; las versiones anteriores, SHOW SLAVE STATUS
+                try:
+                    row = (await connection.exec_driver_sql("SHOW REPLICA STATUS")).mappings().first()
+                    column = "Seconds_Behind_Source"
+                except Exception:
+                    row = (await connection.exec_driver_sql("SHOW SLAVE STATUS")).mappings().first()
+                    column = "Seconds_Behind_Master"
+                if row is None:
+                    return 0.0
+                value = row.get(column)
+                return None if value is None else float(value)
+
+            query = _LAG_QUERIES.get(dialect)
+            if query is None:
+                # SQLite u otros: comprobar solo que responde
+                await connection.execute(text("SELECT 1"))
+                return 0.0
+            value = (await connection.execute(text(query))).scalar()
+            return None if value is None else float(value)
+
+
+class ReplicaRouter:
+    """Elige dónde leer: una réplica sana por round-robin o la primaria."""
+
+    def __init__(
+        self,
+        urls: List[str] = DATABASE_REPLICA_URLS,
+        max_lag: float = REPLICA_MAX_LAG,
+        read_your_writes_window: float = READ_YOUR_WRITES_WINDOW,
+        primary: Callable[[], AsyncSession] = AsyncSessionLocal,
+        clock: Callable[[], float] = _time.monotonic
+    ):
+        self.replicas = [Replica(f"replica-{index}", url) for index, url in enumerate(urls, start=1)]
+        self._max_lag = max_lag
+        self._window = read_your_writes_window
+        self._primary = primary
+        self._clock = clock
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._pins: Dict[int, float] = {}
+        self._checker: Optional[asyncio.Task] = None
+        for replica in self.replicas:
+            db_replica_up.set(1, replica.name)
+
+    # ============ LECTURA DE LO PROPIO ============
+
+    def pin_user(self, user_id: int):
+        """Envía las lecturas del usuario a la primaria durante la ventana de lectura de lo propio."""
+        if not self.replicas:
+            return
+        now = self._clock()
+        with self._lock:
+            self._pins[user_id] = now + self._window
+            if len(self._pins) > 10000:
+                self._pins = {user: until for user, until in self._pins.items() if until > now}
+
+    def is_pinned(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._pins.get(user_id)
+        return until is not None and until > self._clock()
+
+    # ============ SESIONES ============
+
+    def _candidates(self) -> List[Replica]:
+        available = [replica for replica in self.replicas if replica.healthy]
+        if not available:
+            return []
+        start = next(self._counter) % len(available)
+        return available[start:] + available[:start]
+
+    @asynccontextmanager
+    async def session(self, user_id: Optional[int] = None) -> AsyncIterator[AsyncSession]:
+        """Sesión de lectura: réplica sana o primaria (usuario recién escrito, sin réplicas)."""
+        if not self.replicas:
+            target = "primary"
+        elif self.is_pinned(user_id):
+            target = "primary_pinned"
+        else:
+            for replica in self._candidates():
+                session = replica.sessionmaker()
+                try:
+                    # Conectar ya: si la réplica no responde se prueba la siguiente
+                    await session.connection()
+                except Exception as e:
+                    await session.close()
+                    self._mark_down(replica, e)
+                    continue
+                db_read_routing_total.inc("replica")
+                try:
+                    yield session
+                finally:
+                    await session.close()
+                return
+            target = "primary_fallback"
+
+        db_read_routing_total.inc(target)
+        async with self._primary() as session:
+            yield session
+
+    def _mark_down(self, replica: Replica, error: Exception):
+        if replica.healthy:
+            logger.warning(f"Replica {replica.name} marked down: {error}")
+        replica.healthy = False
+        replica.last_error = str(error)
+        db_replica_up.set(0, replica.name)
+
+    # ============ CHEQUEOS ============
+
+    async def check(self):
+        """Mide el retraso de todas las réplicas y actualiza su estado."""
+        await asyncio.gather(*(self._check_replica(replica) for replica in self.replicas))
+
+    async def _check_replica(self, replica: Replica):
+        try:
+            lag = await asyncio.wait_for(replica.measure_lag(), REPLICA_CHECK_TIMEOUT)
+        except Exception as e:
+            replica.last_check = self._clock()
+            self._mark_down(replica, e)
+            return
+
+        replica.last_check = self._clock()
+        replica.lag = lag
+        if lag is None:
+            self._mark_down(replica, RuntimeError("replication stopped"))
+            return
+        db_replica_lag_seconds.set(lag, replica.name)
+        if lag > self._max_lag:
+            self._mark_down(replica, RuntimeError(f"lag {lag:.1f}s > {self._max_lag}s"))
+            return
+
+        if not replica.healthy:
+            logger.info(f"Replica {replica.name} back up (lag {lag:.1f}s)")
+        replica.healthy = True
+        replica.last_error = None
+        db_replica_up.set(1, replica.name)
+
+    async def _run_checks(self, interval: float):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Replica check failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self, interval: float = REPLICA_CHECK_INTERVAL):
+        if self.replicas and (self._checker is None or self._checker.done()):
+            self._checker = asyncio.create_task(self._run_checks(interval), name="replica-checker")
+
+    async def stop(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            await asyncio.gather(self._checker, return_exceptions=True)
+            self._checker = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "maxLagSeconds": self._max_lag,
+            "readYourWritesWindowSeconds": self._window,
+            "pinnedUsers": sum(1 for until in list(self._pins.values()) if until > self._clock()),
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "lagSeconds": replica.lag,
+                    "lastError": replica.last_error,
+                    "secondsSinceCheck": None if replica.last_check is None
+                    else round(self._clock() - replica.last_check, 3),
+                }
+                for replica in self.replicas
+            ],
+        }
+
+
+# Router compartido por todas las peticiones del proceso
+replica_router = ReplicaRouter()
+
+
+async def get_read_db():
+    """Sesión para rutas de solo lectura (réplica si hay una disponible)."""
+    async with replica_router.session() as db:
+        yield db
+
+
+async def get_user_read_db(user_id: int):
+    """Como get_read_db, pero a la primaria si el usuario (parámetro de ruta user_id) escribió hace poco."""
+    async with replica_router.session(user_id) as db:
+        yield db
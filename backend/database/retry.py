@@ -0,0 +1,93 @@
+"""
+Reintentos acotados para transacciones de escritura.
+
+Las transacciones pueden fallar por causas transitorias (fallo de
+serialización o deadlock en PostgreSQL, base de datos bloqueada en SQLite).
+En esos casos se hace rollback y se vuelve a intentar con un backoff corto.
+Los solapamientos detectados por la base de datos (ver
+database/overlap_guard.py) no se reintentan: son conflictos reales.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.overlap_guard import OVERLAP_TRIGGER_MESSAGE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WRITE_MAX_ATTEMPTS = int(os.getenv("DB_WRITE_MAX_ATTEMPTS", "5"))
+WRITE_RETRY_BASE_DELAY = float(os.getenv("DB_WRITE_RETRY_BASE_DELAY", "0.01"))
+
+# SQLSTATE de PostgreSQL
+_SERIALIZATION_FAILURE = "40001"
+_DEADLOCK_DETECTED = "40P01"
+_EXCLUSION_VIOLATION = "23P01"
+
+
+def _sqlstate(exc: DBAPIError):
+    orig = exc.orig
+    # psycopg2 expone pgcode; con asyncpg el error original queda en __cause__
+    return (
+        getattr(orig, "pgcode", None)
+        or getattr(orig, "sqlstate", None)
+        or getattr(orig.__cause__, "sqlstate", None)
+    )
+
+
+def is_overlap_error(exc: Exception) -> bool:
+    """Indica si el error proviene del constraint/trigger anti-solapamiento."""
+    if not isinstance(exc, IntegrityError):
+        return False
+    return _sqlstate(exc) == _EXCLUSION_VIOLATION or OVERLAP_TRIGGER_MESSAGE in str(exc.orig)
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    """Indica si el error es transitorio y la transacción puede reintentarse."""
+    if not isinstance(exc, DBAPIError):
+        return False
+    if _sqlstate(exc) in (_SERIALIZATION_FAILURE, _DEADLOCK_DETECTED):
+        return True
+    return isinstance(exc, OperationalError) and "database is locked" in str(exc.orig)
+
+
+async def run_with_retry(
+    db: AsyncSession,
+    work: Callable[[AsyncSession], Awaitable[T]],
+    max_attempts: int = WRITE_MAX_ATTEMPTS,
+    base_delay: float = WRITE_RETRY_BASE_DELAY,
+) -> T:
+    """
+    Ejecuta `await work(db)` y hace commit, reintentando ante errores transitorios.
+
+    `work` se vuelve a llamar en cada intento, porque el rollback descarta
+    los objetos pendientes de la sesión. Cualquier otro error (incluidos los
+    de integridad) se propaga después del rollback.
+    """
+    attempt = 1
+    while True:
+        try:
+            result = await work(db)
+            await db.commit()
+            return result
+        except DBAPIError as e:
+            await db.rollback()
+            if attempt >= max_attempts or not is_retryable_error(e):
+                raise
+            delay = base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            logger.warning(
+                f"Transacción abortada ({e.orig.__class__.__name__}), "
+                f"reintento {attempt}/{max_attempts - 1} en {delay * 1000:.1f} ms"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+        except Exception:
+            await db.rollback()
+            raise
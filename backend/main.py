@@ -1,20 +1,46 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 
-from routers import rooms_router, reservations_router
+from routers import rooms_router, reservations_router, holds_router
+from database.connection import async_engine
+from database.pool import get_pool_stats
+from database.replicas import replica_router
+from utils.availability_hub import availability_hub
+from utils.email_dispatcher import email_dispatcher
+from utils.metrics import METRICS_ENABLED, CONTENT_TYPE, MetricsMiddleware, render_metrics
 
 # Cargar variables de entorno
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Envío de emails en segundo plano: se vacía la cola antes de apagar
+    await email_dispatcher.start()
+    # Barrido de retenciones vencidas para la disponibilidad en vivo
+    await availability_hub.start()
+    # Chequeo periódico del retraso de las réplicas de lectura
+    await replica_router.start()
+    yield
+    await replica_router.stop()
+    await availability_hub.stop()
+    await email_dispatcher.stop()
+    # Cerrar las conexiones del pool: con aiosqlite cada una mantiene vivo un
+    # hilo y el proceso no termina hasta que se cierran
+    await async_engine.dispose()
+
+
 # Crear instancia de FastAPI
 app = FastAPI(
     title="BiblioReservas API",
     description="API REST para el sistema de reservas de salas de biblioteca",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir peticiones desde el frontend Next.js
@@ -26,12 +52,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Headers que el frontend necesita leer (paginación, caché del catálogo
+    # y respuestas repetidas por Idempotency-Key)
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Idempotent-Replayed"],
 )
 
+# Latencia, estado y tiempo en base de datos de cada petición (GET /metrics).
+# Se agrega después de CORS para quedar por fuera y medir la petición completa
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 # Registrar routers
 app.include_router(rooms_router)
 app.include_router(reservations_router)
+app.include_router(holds_router)
 
 
 # Endpoint raíz para verificar que la API está funcionando
@@ -51,6 +86,36 @@ def health_check():
     return {"status": "healthy"}
 
 
+# Estado de los pools de conexiones (checkouts, espera, overflow, invalidaciones)
+@app.get("/health/pool")
+def pool_stats():
+    return get_pool_stats()
+
+
+# Estado de la cola de emails en segundo plano
+@app.get("/health/email")
+def email_dispatch_stats():
+    return email_dispatcher.stats()
+
+
+# Conexiones de disponibilidad en vivo (Server-Sent Events)
+@app.get("/health/availability-stream")
+def availability_stream_stats():
+    return availability_hub.stats()
+
+
+# Réplicas de lectura: estado, retraso y usuarios fijados a la primaria
+@app.get("/health/replicas")
+def replica_stats():
+    return replica_router.stats()
+
+
+# Métricas en formato de texto de Prometheus
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -1,5 +1,6 @@
 # Routers package
 from routers.rooms import router as rooms_router
 from routers.reservations import router as reservations_router
+from routers.holds import router as holds_router
 
-__all__ = ["rooms_router", "reservations_router"]
+__all__ = ["rooms_router", "reservations_router", "holds_router"]
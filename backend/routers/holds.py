@@ -0,0 +1,196 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+import logging
+
+from database import get_db
+from database.models import User, Room
+from routers.reservations import HELD_SLOT_DETAIL, _persist_reservation
+from schemas import HoldCreate, HoldResponse, ReservationCreate, ReservationResponse
+from utils.holds import Hold, HoldConflict, HoldLimitExceeded, HOLDS_MAX_PER_USER, slot_holds
+from utils.idempotency import IdempotencyInProgress, run_idempotent
+from utils.interval_index import reservation_index
+from utils.responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["holds"])
+
+HOLD_NOT_FOUND_DETAIL = "La retención no existe o ya expiró"
+
+
+def _hold_payload(hold: Hold) -> dict:
+    """HoldResponse como dict, con las claves de la respuesta"""
+    remaining = (hold.expires_at_utc - datetime.utcnow()).total_seconds()
+    return {
+        "id": hold.id,
+        "userId": hold.user_id,
+        "roomId": hold.room_id,
+        "date": hold.date,
+        "startTime": hold.start_time,
+        "endTime": hold.end_time,
+        "expiresAt": hold.expires_at_utc,
+        "expiresIn": max(0, int(remaining)),
+    }
+
+
+@router.post("/holds", response_model=HoldResponse, status_code=status.HTTP_201_CREATED)
+async def create_hold(hold_data: HoldCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Retener temporalmente un horario mientras el usuario completa la reserva.
+
+    Mientras la retención está activa (HOLD_TTL segundos, 5 minutos por
+    defecto) el horario figura como ocupado en la disponibilidad y las
+    reservas de otros usuarios que lo pisan se rechazan con 409. Se confirma
+    con POST /api/holds/{holdId}/confirm o se libera con DELETE.
+
+    Args:
+        hold_data: Datos del horario (userId, roomId, date, startTime, endTime)
+
+    Returns:
+        HoldResponse: Retención creada, con su vencimiento
+
+    Raises:
+        404: Si el usuario o sala no existen
+        409: Si el horario ya está reservado o retenido por otro usuario
+        429: Si el usuario ya tiene HOLDS_MAX_PER_USER retenciones activas
+    """
+    if await reservation_index.overlaps(
+        db,
+        hold_data.room_id,
+        hold_data.date,
+        hold_data.start_time,
+        hold_data.end_time
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya existe una reserva para esta sala en el horario seleccionado"
+        )
+
+    # Validar que el usuario existe
+    if not await db.get(User, hold_data.user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con ID {hold_data.user_id} no encontrado"
+        )
+
+    # Validar que la sala existe
+    if not await db.get(Room, hold_data.room_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sala con ID {hold_data.room_id} no encontrada"
+        )
+
+    try:
+        hold = slot_holds.create(
+            hold_data.user_id,
+            hold_data.room_id,
+            hold_data.date,
+            hold_data.start_time,
+            hold_data.end_time
+        )
+    except HoldConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=HELD_SLOT_DETAIL
+        )
+    except HoldLimitExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Se pueden retener como máximo {HOLDS_MAX_PER_USER} horarios a la vez"
+        )
+
+    return FastJSONResponse(_hold_payload(hold), status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/holds/{hold_id}", response_model=HoldResponse)
+async def get_hold(hold_id: str):
+    """
+    Obtener una retención activa (p. ej. para mostrar el tiempo restante).
+
+    Raises:
+        404: Si la retención no existe o ya expiró
+    """
+    hold = slot_holds.get(hold_id)
+    if hold is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=HOLD_NOT_FOUND_DETAIL)
+    return FastJSONResponse(_hold_payload(hold))
+
+
+@router.delete("/holds/{hold_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_hold(hold_id: str):
+    """
+    Liberar una retención (el usuario cerró el formulario o cambió de horario).
+
+    Raises:
+        404: Si la retención no existe o ya expiró
+    """
+    if not slot_holds.release(hold_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=HOLD_NOT_FOUND_DETAIL)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/holds/{hold_id}/confirm", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
+async def confirm_hold(hold_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Convertir una retención en reserva.
+
+    El horario ya se validó al crear la retención: solo se leen el usuario y
+    la sala (para el email) y se inserta la reserva en una única transacción.
+    Mientras tanto la retención sigue bloqueando el horario; se quita cuando
+    la reserva quedó guardada y vuelve a estar activa si algo falla.
+    Confirmar dos veces la misma retención devuelve la misma reserva (header
+    Idempotent-Replayed: true).
+
+    Returns:
+        ReservationResponse: Reserva creada
+
+    Raises:
+        404: Si la retención no existe o ya expiró
+        409: Si otra reserva ocupó el horario (p. ej. desde otro worker) o si
+             otra confirmación de la misma retención sigue en curso
+        500: Si hay un error en el servidor
+    """
+    try:
+        return await run_idempotent(f"holds:{hold_id}", hold_id, lambda: _confirm_hold(hold_id, db))
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La retención se está confirmando en otra petición; reintente más tarde"
+        )
+
+
+async def _confirm_hold(hold_id: str, db: AsyncSession) -> FastJSONResponse:
+    # Solo una petición puede tomar la retención; sigue bloqueando el horario
+    # hasta que la reserva se guarde
+    hold = slot_holds.take(hold_id)
+    if hold is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=HOLD_NOT_FOUND_DETAIL)
+
+    try:
+        user = await db.get(User, hold.user_id)
+        room = await db.get(Room, hold.room_id)
+        if not user or not room:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="El usuario o la sala de la retención ya no existen"
+            )
+
+        # Los datos ya se validaron al crear la retención
+        reservation_data = ReservationCreate.model_construct(
+            user_id=hold.user_id,
+            room_id=hold.room_id,
+            date=hold.date,
+            start_time=hold.start_time,
+            end_time=hold.end_time
+        )
+        response = await _persist_reservation(db, reservation_data, user, room)
+    except BaseException:
+        # Cualquier fallo (cancelación incluida) devuelve la retención tal como estaba
+        slot_holds.restore(hold)
+        raise
+
+    slot_holds.finish(hold)
+    logger.info(f"Retención {hold_id} confirmada como reserva")
+    return response
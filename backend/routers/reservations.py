@@ -1,30 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy import select, insert, and_, or_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Literal, Optional, Tuple
+from datetime import date, time, timedelta
+import json
 import logging
 import os
 
-from database import get_db
-from database.models import Reservation, User, Room
-from schemas import ReservationCreate, ReservationResponse, ReservationRoomInfo
-from utils.email_service import send_reservation_confirmation_email
-from utils.rabbitmq import publish_email_task, check_rabbitmq_connection
+from database import get_db, get_user_read_db, replica_router, run_with_retry, is_overlap_error
+from database.archive import includes_archived
+from database.models import Reservation, ReservationArchive, User, Room, EmailOutbox
+from schemas import (
+    ReservationCreate, ReservationResponse,
+    ReservationBatchCreate, ReservationBatchResponse, ReservationConflict
+)
+from utils.availability_hub import availability_hub
+from utils.email_dispatcher import email_dispatcher
+from utils.holds import slot_holds
+from utils.idempotency import (
+    IdempotencyInProgress, IdempotencyMismatch, request_fingerprint, run_idempotent
+)
+from utils.interval_index import reservation_index
+from utils.metrics import reservation_email_seconds
+from utils.pagination import ReservationCursor, InvalidCursor, encode_cursor, decode_cursor
+from utils.responses import FastJSONResponse
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Verificar si RabbitMQ está habilitado
+# Verificar si la cola de emails (outbox + RabbitMQ) está habilitada
 EMAIL_QUEUE_ENABLED = os.getenv("EMAIL_QUEUE_ENABLED", "false").lower() == "true"
 
+# Tamaño de página de "Mis Reservas"
+RESERVATIONS_PAGE_SIZE = int(os.getenv("RESERVATIONS_PAGE_SIZE", "50"))
+RESERVATIONS_MAX_PAGE_SIZE = int(os.getenv("RESERVATIONS_MAX_PAGE_SIZE", "200"))
+
+# Máximo de ocurrencias por reserva múltiple (un semestre, varios días por semana)
+RESERVATION_BATCH_MAX = int(os.getenv("RESERVATION_BATCH_MAX", "200"))
+
 router = APIRouter(prefix="/api", tags=["reservations"])
 
+HELD_SLOT_DETAIL = "El horario seleccionado está retenido temporalmente por otro usuario"
+
+
+def _build_email_task(user: User, room: Room, reservation: Reservation) -> dict:
+    """Datos del email de confirmación, tal como los consume render_email_task"""
+    return {
+        'user_email': user.email,
+        'user_name': user.name,
+        'room_name': room.name,
+        'library_name': room.library_name,
+        'reservation_date': reservation.date.isoformat(),
+        'start_time': reservation.start_time.isoformat(),
+        'end_time': reservation.end_time.isoformat(),
+        'reservation_id': reservation.id
+    }
+
 
 @router.post("/reservations", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
-def create_reservation(
+async def create_reservation(
     reservation_data: ReservationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
 ):
     """
     Crear una nueva reserva de sala.
@@ -34,10 +74,19 @@ def create_reservation(
     - La sala exista
     - No haya conflictos de horario para esa sala
     
-    Después de crear la reserva, envía un email de confirmación.
+    Después de crear la reserva, envía un email de confirmación. Con
+    EMAIL_QUEUE_ENABLED, la tarea de email se escribe en el outbox dentro de
+    la misma transacción que la reserva y el relay la publica en RabbitMQ.
+    Si no, se entrega al despachador en memoria, que la envía en segundo
+    plano: la respuesta nunca espera al servidor SMTP.
+    
+    Con el header Idempotency-Key, los reintentos con la misma clave reciben
+    la respuesta de la primera petición (header Idempotent-Replayed: true)
+    sin crear otra reserva ni enviar otro email (ver utils/idempotency.py).
     
     Args:
         reservation_data: Datos de la reserva (userId, roomId, date, startTime, endTime)
+        idempotency_key: Identificador de la operación, igual en cada reintento
         
     Returns:
         ReservationResponse: Datos de la reserva creada
@@ -45,12 +94,64 @@ def create_reservation(
     Raises:
         400: Si los datos son inválidos
         404: Si el usuario o sala no existen
-        409: Si hay un conflicto de horario
+        409: Si hay un conflicto de horario o la petición original con la
+             misma Idempotency-Key sigue en curso
+        422: Si la Idempotency-Key ya se usó con otros datos
         500: Si hay un error en el servidor
     """
+    if idempotency_key is None:
+        return await _create_reservation(reservation_data, db)
+    
+    try:
+        return await run_idempotent(
+            f"reservations:{idempotency_key}",
+            request_fingerprint(reservation_data),
+            lambda: _create_reservation(reservation_data, db)
+        )
+    except IdempotencyMismatch:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="La Idempotency-Key ya se usó con otros datos de reserva"
+        )
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Hay una petición con la misma Idempotency-Key en curso; reintente más tarde"
+        )
+
+
+async def _create_reservation(reservation_data: ReservationCreate, db: AsyncSession) -> FastJSONResponse:
+    """Crea la reserva y encola el email; ver create_reservation"""
+    
+    # Rechazar conflictos de horario con el índice en memoria, antes de
+    # hacer las validaciones y de abrir la transacción de escritura
+    if await reservation_index.overlaps(
+        db,
+        reservation_data.room_id,
+        reservation_data.date,
+        reservation_data.start_time,
+        reservation_data.end_time
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya existe una reserva para esta sala en el horario seleccionado"
+        )
+    
+    # Las retenciones del propio usuario no bloquean: puede reservar sin confirmarlas
+    if slot_holds.overlaps(
+        reservation_data.room_id,
+        reservation_data.date,
+        reservation_data.start_time,
+        reservation_data.end_time,
+        user_id=reservation_data.user_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=HELD_SLOT_DETAIL
+        )
     
     # Validar que el usuario existe
-    user = db.query(User).filter(User.id == reservation_data.user_id).first()
+    user = await db.get(User, reservation_data.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -58,180 +159,569 @@ def create_reservation(
         )
     
     # Validar que la sala existe
-    room = db.query(Room).filter(Room.id == reservation_data.room_id).first()
+    room = await db.get(Room, reservation_data.room_id)
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Sala con ID {reservation_data.room_id} no encontrada"
         )
     
-    # Crear la reserva
-    new_reservation = Reservation(
-        user_id=reservation_data.user_id,
-        room_id=reservation_data.room_id,
-        date=reservation_data.date,
-        start_time=reservation_data.start_time,
-        end_time=reservation_data.end_time
-    )
+    return await _persist_reservation(db, reservation_data, user, room)
+
+
+async def _persist_reservation(
+    db: AsyncSession,
+    reservation_data: ReservationCreate,
+    user: User,
+    room: Room
+) -> FastJSONResponse:
+    """
+    Inserta una reserva ya validada y encola su email de confirmación.
+    
+    Compartido por POST /api/reservations y por la confirmación de una
+    retención (routers/holds.py).
+    
+    Raises:
+        409: Si la base de datos rechaza el horario por solapamiento
+        500: Si hay un error en el servidor
+    """
+    # Crear la reserva. El constraint/trigger de la base de datos impide los
+    # solapamientos aunque otro worker haya pasado el chequeo del índice a la
+    # vez; los fallos transitorios (serialización, deadlock) se reintentan.
+    async def insert_reservation(session: AsyncSession) -> Reservation:
+        reservation = Reservation(
+            user_id=reservation_data.user_id,
+            room_id=reservation_data.room_id,
+            date=reservation_data.date,
+            start_time=reservation_data.start_time,
+            end_time=reservation_data.end_time
+        )
+        session.add(reservation)
+        
+        if EMAIL_QUEUE_ENABLED:
+            # La tarea de email se confirma junto con la reserva (outbox)
+            await session.flush()
+            session.add(EmailOutbox(
+                task_type="reservation_confirmation",
+                payload=json.dumps(_build_email_task(user, room, reservation))
+            ))
+        return reservation
     
     try:
-        db.add(new_reservation)
-        db.commit()
-        db.refresh(new_reservation)
+        new_reservation = await run_with_retry(db, insert_reservation)
+        
+        reservation_index.add(
+            new_reservation.room_id,
+            new_reservation.date,
+            new_reservation.start_time,
+            new_reservation.end_time
+        )
         
         logger.info(f"Reserva creada exitosamente: ID {new_reservation.id}")
         
     except IntegrityError as e:
-        db.rollback()
-        logger.error(f"Error de integridad al crear reserva: {str(e)}")
+        # Otro proceso pudo haber reservado el horario: recargar el bucket
+        reservation_index.invalidate(reservation_data.room_id, reservation_data.date)
+        if is_overlap_error(e):
+            logger.info(f"Reserva rechazada por solapamiento en sala {reservation_data.room_id}")
+        else:
+            logger.error(f"Error de integridad al crear reserva: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Ya existe una reserva para esta sala en el horario seleccionado"
         )
     except Exception as e:
-        db.rollback()
         logger.error(f"Error inesperado al crear reserva: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error al crear la reserva"
         )
     
-    # Enviar email de confirmación
-    email_sent = False
+    # Sus próximas lecturas van a la primaria, donde la reserva ya está
+    replica_router.pin_user(reservation_data.user_id)
+    # Las retenciones propias sobre ese horario ya cumplieron su función
+    slot_holds.release_overlapping(
+        reservation_data.user_id,
+        new_reservation.room_id,
+        new_reservation.date,
+        new_reservation.start_time,
+        new_reservation.end_time
+    )
+    availability_hub.publish_slot(
+        new_reservation.room_id,
+        new_reservation.date,
+        new_reservation.start_time,
+        new_reservation.end_time,
+        "reserved"
+    )
     
-    if EMAIL_QUEUE_ENABLED and check_rabbitmq_connection():
-        # Envío asíncrono con RabbitMQ
-        try:
-            email_data = {
-                'user_email': user.email,
-                'user_name': user.name,
-                'room_name': room.name,
-                'library_name': room.library_name,
-                'reservation_date': new_reservation.date.isoformat(),
-                'start_time': new_reservation.start_time.isoformat(),
-                'end_time': new_reservation.end_time.isoformat(),
-                'reservation_id': new_reservation.id
-            }
-            
-            if publish_email_task(email_data):
-                email_sent = True
-                logger.info(f"Email task enqueued in RabbitMQ for reservation #{new_reservation.id}")
-            else:
-                logger.warning("Failed to enqueue email task, falling back to direct send")
-                # Fallback: enviar directo si falla la cola
-                send_reservation_confirmation_email(
-                    user_email=user.email,
-                    user_name=user.name,
-                    room_name=room.name,
-                    library_name=room.library_name,
-                    reservation_date=new_reservation.date,
-                    start_time=new_reservation.start_time,
-                    end_time=new_reservation.end_time,
-                    reservation_id=new_reservation.id
-                )
-                email_sent = True
-        except Exception as e:
-            logger.error(f"Error with email queue, trying direct send: {str(e)}")
-            try:
-                # Fallback: enviar directo
-                send_reservation_confirmation_email(
-                    user_email=user.email,
-                    user_name=user.name,
-                    room_name=room.name,
-                    library_name=room.library_name,
-                    reservation_date=new_reservation.date,
-                    start_time=new_reservation.start_time,
-                    end_time=new_reservation.end_time,
-                    reservation_id=new_reservation.id
-                )
-                email_sent = True
-            except:
-                email_sent = False
+    # Enviar email de confirmación
+    if EMAIL_QUEUE_ENABLED:
+        # Ya quedó en el outbox: el relay lo entregará al menos una vez
+        email_sent = True
     else:
-        # Envío síncrono tradicional (sin RabbitMQ)
-        try:
-            send_reservation_confirmation_email(
-                user_email=user.email,
-                user_name=user.name,
-                room_name=room.name,
-                library_name=room.library_name,
-                reservation_date=new_reservation.date,
-                start_time=new_reservation.start_time,
-                end_time=new_reservation.end_time,
-                reservation_id=new_reservation.id
+        # Envío en segundo plano por SMTP; False si la cola está llena. Con
+        # EMAIL_DISPATCH_OVERFLOW=block esta espera se suma a la respuesta
+        with reservation_email_seconds.time("/api/reservations", "dispatcher"):
+            email_sent = await email_dispatcher.submit(
+                _build_email_task(user, room, new_reservation)
             )
-            email_sent = True
-            logger.info(f"Email de confirmación enviado directamente a {user.email}")
-        except Exception as e:
-            # Si falla el email, la reserva igual queda guardada
-            logger.error(f"Error al enviar email de confirmación: {str(e)}")
-            email_sent = False
-    
-    # Preparar respuesta
-    response = ReservationResponse(
-        id=new_reservation.id,
-        room=ReservationRoomInfo(
-            id=room.id,
-            name=room.name,
-            libraryName=room.library_name
+    
+    # Preparar respuesta (ya con la forma de ReservationResponse)
+    return FastJSONResponse(
+        _reservation_payload(
+            new_reservation.id,
+            _room_payload(room.id, room.name, room.library_name),
+            new_reservation.date,
+            new_reservation.start_time,
+            new_reservation.end_time,
+            email_sent=email_sent,
+            email_status="queued" if email_sent else "not_sent"
         ),
-        date=new_reservation.date,
-        startTime=new_reservation.start_time,
-        endTime=new_reservation.end_time,
-        emailSent=email_sent
+        status_code=status.HTTP_201_CREATED
     )
+
+
+def _room_payload(room_id: int, name: str, library_name: str) -> dict:
+    """ReservationRoomInfo como dict, con las claves de la respuesta"""
+    return {"id": room_id, "name": name, "libraryName": library_name}
+
+
+def _reservation_payload(
+    reservation_id: int,
+    room: dict,
+    reservation_date: date,
+    start_time: time,
+    end_time: time,
+    email_sent: bool = True,
+    email_status: Optional[str] = None
+) -> dict:
+    """
+    ReservationResponse como dict, para serializarlo una sola vez con
+    FastJSONResponse sin volver a validarlo contra el response_model.
+    Las claves y el orden deben coincidir con el esquema.
+    """
+    return {
+        "id": reservation_id,
+        "room": room,
+        "date": reservation_date,
+        "startTime": start_time,
+        "endTime": end_time,
+        "emailSent": email_sent,
+        "emailStatus": email_status,
+    }
+
+
+def _expand_batch(batch: ReservationBatchCreate) -> List[Tuple[date, time, time]]:
+    """
+    Ocurrencias (fecha, inicio, fin) del pedido, ordenadas y sin repetir.
     
-    return response
+    Una recurrencia se deja de expandir al pasar RESERVATION_BATCH_MAX
+    ocurrencias: el resultado alcanza para rechazar el pedido sin recorrer
+    cada día hasta un `until` lejano.
+    """
+    if batch.slots:
+        occurrences = {(slot.date, slot.start_time, slot.end_time) for slot in batch.slots}
+    else:
+        rule = batch.recurrence
+        weekdays = set(rule.weekdays)
+        occurrences = set()
+        for offset in range((rule.until - rule.start_date).days + 1):
+            day = rule.start_date + timedelta(days=offset)
+            if day.weekday() in weekdays:
+                occurrences.add((day, rule.start_time, rule.end_time))
+                if len(occurrences) > RESERVATION_BATCH_MAX:
+                    break
+    return sorted(occurrences)
 
 
-@router.get("/users/{user_id}/reservations", response_model=List[ReservationResponse])
-def get_user_reservations(user_id: int, db: Session = Depends(get_db)):
+def _partition_occurrences(occurrences, existing_rows, held_rows=()):
+    """
+    Separa las ocurrencias que se pueden reservar de las que tienen conflicto.
+    
+    existing_rows son las reservas (date, start_time, end_time) de la sala en
+    las fechas pedidas y held_rows las retenciones activas de otros usuarios.
+    Las ocurrencias aceptadas también se comparan entre sí, por si el pedido
+    trae horarios solapados.
     """
-    Obtener todas las reservas activas de un usuario.
+    busy: Dict[date, List[Tuple[time, time]]] = defaultdict(list)
+    for day, start, end in existing_rows:
+        busy[day].append((start, end))
+    held: Dict[date, List[Tuple[time, time]]] = defaultdict(list)
+    for day, start, end in held_rows:
+        held[day].append((start, end))
+    
+    accepted = []
+    requested: Dict[date, List[Tuple[time, time]]] = defaultdict(list)
+    conflicts = []
+    for day, start, end in occurrences:
+        if any(start < other_end and other_start < end for other_start, other_end in busy[day]):
+            conflicts.append(ReservationConflict(date=day, startTime=start, endTime=end, reason="overlap"))
+        elif any(start < other_end and other_start < end for other_start, other_end in held[day]):
+            conflicts.append(ReservationConflict(date=day, startTime=start, endTime=end, reason="held"))
+        elif any(start < other_end and other_start < end for other_start, other_end in requested[day]):
+            conflicts.append(ReservationConflict(date=day, startTime=start, endTime=end, reason="overlap_in_request"))
+        else:
+            requested[day].append((start, end))
+            accepted.append((day, start, end))
+    return accepted, conflicts
+
+
+def _build_batch_email_task(user: User, room: Room, reservations) -> dict:
+    """Datos del email de resumen de una reserva múltiple (plantilla reservation_batch_summary)"""
+    return {
+        'template': 'reservation_batch_summary',
+        'user_email': user.email,
+        'user_name': user.name,
+        'room_name': room.name,
+        'library_name': room.library_name,
+        'reservation_ids': [reservation.id for reservation in reservations],
+        'occurrences': [
+            [
+                reservation.date.isoformat(),
+                reservation.start_time.isoformat(),
+                reservation.end_time.isoformat(),
+                reservation.id
+            ]
+            for reservation in reservations
+        ]
+    }
+
+
+@router.post("/reservations/batch", response_model=ReservationBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_reservation_batch(
+    batch: ReservationBatchCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Crear varias reservas de una sala en un solo pedido.
+    
+    Acepta una lista explícita de ocurrencias (slots) o una regla de
+    recurrencia semanal (recurrence: días de la semana, desde startDate hasta
+    until). Todas las ocurrencias se validan contra las reservas existentes
+    con una sola consulta y las que no tienen conflicto se insertan juntas en
+    una sola transacción. Se envía un único email de resumen.
     
     Args:
-        user_id: ID del usuario
+        batch: userId, roomId, slots o recurrence, y atomic
         
     Returns:
-        List[ReservationResponse]: Lista de reservas del usuario con información de la sala
+        ReservationBatchResponse: Reservas creadas y ocurrencias con conflicto
         
     Raises:
-        404: Si el usuario no existe
+        400: Si el pedido genera más de RESERVATION_BATCH_MAX ocurrencias o ninguna
+        404: Si el usuario o sala no existen
+        409: Si ninguna ocurrencia se pudo reservar, o si atomic=true y alguna
+             tiene conflicto (detail.conflicts lista las ocurrencias)
     """
+    occurrences = _expand_batch(batch)
+    if not occurrences:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La recurrencia no genera ninguna fecha"
+        )
+    if len(occurrences) > RESERVATION_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se pueden crear como máximo {RESERVATION_BATCH_MAX} reservas por pedido"
+        )
     
     # Validar que el usuario existe
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, batch.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Usuario con ID {user_id} no encontrado"
+            detail=f"Usuario con ID {batch.user_id} no encontrado"
+        )
+    
+    # Validar que la sala existe
+    room = await db.get(Room, batch.room_id)
+    if not room:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sala con ID {batch.room_id} no encontrada"
+        )
+    
+    # Todas las reservas de la sala en las fechas pedidas, en una consulta
+    dates = sorted({day for day, _, _ in occurrences})
+    existing_rows = (await db.execute(
+        select(Reservation.date, Reservation.start_time, Reservation.end_time)
+        .where(Reservation.room_id == batch.room_id, Reservation.date.in_(dates))
+    )).all()
+    
+    held_rows = slot_holds.held_rows(batch.room_id, dates, user_id=batch.user_id)
+    
+    accepted, conflicts = _partition_occurrences(occurrences, existing_rows, held_rows)
+    if conflicts and (batch.atomic or not accepted):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Hay ocurrencias que chocan con reservas existentes o retenidas",
+                "conflicts": [conflict.model_dump(mode="json", by_alias=True) for conflict in conflicts]
+            }
         )
     
-    # Obtener reservas del usuario con join a Room
-    reservations = (
-        db.query(Reservation)
-        .filter(Reservation.user_id == user_id)
-        .join(Room)
-        .order_by(Reservation.date.desc(), Reservation.start_time.desc())
-        .all()
+    # Insertar todas las ocurrencias aceptadas con un solo INSERT multi-fila,
+    # en una transacción. Con RETURNING (PostgreSQL, SQLite) los IDs vuelven
+    # en la misma sentencia; si no (MySQL), se leen con una consulta
+    created_columns = (Reservation.id, Reservation.date, Reservation.start_time, Reservation.end_time)
+    
+    async def insert_batch(session: AsyncSession) -> list:
+        statement = insert(Reservation).values([
+            {
+                "user_id": batch.user_id,
+                "room_id": batch.room_id,
+                "date": day,
+                "start_time": start,
+                "end_time": end
+            }
+            for day, start, end in accepted
+        ])
+        if session.bind.dialect.insert_returning:
+            created = (await session.execute(statement.returning(*created_columns))).all()
+        else:
+            await session.execute(statement)
+            wanted = set(accepted)
+            created = [
+                row for row in (await session.execute(
+                    select(*created_columns).where(
+                        Reservation.user_id == batch.user_id,
+                        Reservation.room_id == batch.room_id,
+                        Reservation.date.in_({day for day, _, _ in accepted})
+                    )
+                )).all()
+                if (row.date, row.start_time, row.end_time) in wanted
+            ]
+        created = sorted(created, key=lambda row: (row.date, row.start_time))
+        
+        if EMAIL_QUEUE_ENABLED:
+            session.add(EmailOutbox(
+                task_type="reservation_batch_summary",
+                payload=json.dumps(_build_batch_email_task(user, room, created))
+            ))
+        return created
+    
+    try:
+        new_reservations = await run_with_retry(db, insert_batch)
+    except IntegrityError as e:
+        # Otro pedido reservó alguno de los horarios mientras tanto
+        for day in dates:
+            reservation_index.invalidate(batch.room_id, day)
+        logger.info(f"Reserva múltiple rechazada por solapamiento concurrente en sala {batch.room_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Otra reserva ocupó alguno de los horarios seleccionados. Intenta nuevamente"
+        )
+    except Exception as e:
+        logger.error(f"Error inesperado al crear reserva múltiple: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al crear las reservas"
+        )
+    
+    replica_router.pin_user(batch.user_id)
+    for reservation in new_reservations:
+        reservation_index.add(batch.room_id, reservation.date, reservation.start_time, reservation.end_time)
+        slot_holds.release_overlapping(
+            batch.user_id, batch.room_id, reservation.date, reservation.start_time, reservation.end_time
+        )
+        availability_hub.publish_slot(
+            batch.room_id, reservation.date, reservation.start_time, reservation.end_time, "reserved"
+        )
+    
+    logger.info(f"Reserva múltiple creada: {len(new_reservations)} reservas en sala {batch.room_id}")
+    
+    # Un solo email de resumen para todo el pedido
+    if EMAIL_QUEUE_ENABLED:
+        email_sent = True
+    else:
+        with reservation_email_seconds.time("/api/reservations/batch", "dispatcher"):
+            email_sent = await email_dispatcher.submit(
+                _build_batch_email_task(user, room, new_reservations)
+            )
+    
+    # Forma de ReservationBatchResponse; to_json serializa los
+    # ReservationConflict con sus alias sin volver a validarlos
+    room_info = _room_payload(room.id, room.name, room.library_name)
+    email_status = "queued" if email_sent else "not_sent"
+    return FastJSONResponse(
+        {
+            "created": [
+                _reservation_payload(
+                    reservation.id, room_info, reservation.date, reservation.start_time, reservation.end_time,
+                    email_sent=email_sent, email_status=email_status
+                )
+                for reservation in new_reservations
+            ],
+            "conflicts": conflicts,
+            "emailSent": email_sent,
+            "emailStatus": email_status,
+        },
+        status_code=status.HTTP_201_CREATED
     )
+
+
+@router.get("/users/{user_id}/reservations", response_model=List[ReservationResponse])
+async def get_user_reservations(
+    user_id: int,
+    scope: Optional[Literal["upcoming", "past"]] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(RESERVATIONS_PAGE_SIZE, ge=1, le=RESERVATIONS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_user_read_db)
+):
+    """
+    Obtener las reservas de un usuario, paginadas.
+    
+    La paginación es por clave (date, start_time, id): si hay más resultados,
+    la respuesta incluye el header X-Next-Cursor, que se envía como `cursor`
+    para pedir la página siguiente. El costo de cada página no depende de
+    cuántas reservas tenga el usuario.
+    
+    Args:
+        user_id: ID del usuario
+        scope: upcoming (desde hoy, la más próxima primero) o past (antes de
+            hoy, la más reciente primero). Sin scope: las de la tabla activa,
+            más recientes primero; las archivadas (anteriores al horizonte de
+            archivado) se piden con scope=past o con `from`/`to` anteriores
+            al horizonte
+        from: Fecha mínima (inclusive)
+        to: Fecha máxima (inclusive)
+        limit: Cantidad máxima de reservas por página
+        cursor: Cursor devuelto en X-Next-Cursor
+        
+    Returns:
+        List[ReservationResponse]: Lista de reservas del usuario con información de la sala
+        
+    Raises:
+        400: Si el cursor es inválido
+        404: Si el usuario no existe
+    """
+    
+    # Próximas: la más cercana primero; el resto, la más reciente primero
+    ascending = scope == "upcoming"
+    
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+    
+    # Una fila extra indica si hay otra página
+    filters = (user_id, scope, from_date, to_date, after, ascending)
+    query = _user_reservations_query(Reservation, *filters).limit(limit + 1)
+    if includes_archived(scope, from_date, to_date):
+        # Se piden fechas archivadas: se une el historial. Cada parte
+        # usa su propio índice (user_id, date, start_time) y su propio límite
+        archived = _user_reservations_query(ReservationArchive, *filters).limit(limit + 1)
+        merged = union_all(select(query.subquery()), select(archived.subquery())).subquery()
+        query = select(merged).order_by(*_listing_order(merged.c, ascending)).limit(limit + 1)
     
-    # Formatear respuesta
-    response = []
-    for reservation in reservations:
-        response.append(
-            ReservationResponse(
-                id=reservation.id,
-                room=ReservationRoomInfo(
-                    id=reservation.room.id,
-                    name=reservation.room.name,
-                    libraryName=reservation.room.library_name
-                ),
-                date=reservation.date,
-                startTime=reservation.start_time,
-                endTime=reservation.end_time,
-                emailSent=True  # Ya fue enviado al crear
+    rows = (await db.execute(query)).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        reservation_id, reservation_date, start_time = rows[-1][:3]
+        headers["X-Next-Cursor"] = encode_cursor(
+            ReservationCursor(reservation_date, start_time, reservation_id)
+        )
+    
+    if not rows and cursor is None:
+        # Sin resultados: distinguir "sin reservas" de "usuario inexistente".
+        # Solo en este caso se consulta la tabla de usuarios
+        if await db.scalar(select(User.id).where(User.id == user_id)) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuario con ID {user_id} no encontrado"
             )
+    
+    # Formatear respuesta directamente desde las tuplas y serializarla una
+    # sola vez. Las salas se repiten entre reservas: un dict por sala
+    rooms = {}
+    payload = []
+    for reservation_id, reservation_date, start_time, end_time, room_id, room_name, library_name in rows:
+        room = rooms.get(room_id)
+        if room is None:
+            room = rooms[room_id] = _room_payload(room_id, room_name, library_name)
+        # emailSent: ya fue enviado al crear
+        payload.append(_reservation_payload(reservation_id, room, reservation_date, start_time, end_time))
+    return FastJSONResponse(payload, headers=headers)
+
+
+def _user_reservations_query(
+    model,
+    user_id: int,
+    scope: Optional[str],
+    from_date: Optional[date],
+    to_date: Optional[date],
+    after: Optional[ReservationCursor],
+    ascending: bool
+):
+    """Reservas del usuario en `model` (Reservation o ReservationArchive), filtradas y ordenadas.
+    
+    Solo las columnas de la respuesta, sin hidratar objetos ORM: una sola
+    consulta por página, sin lazy loads de la sala.
+    """
+    query = (
+        select(
+            model.id.label("id"),
+            model.date.label("date"),
+            model.start_time.label("start_time"),
+            model.end_time.label("end_time"),
+            Room.id.label("room_id"),
+            Room.name.label("room_name"),
+            Room.library_name.label("library_name")
         )
+        .join(Room, model.room_id == Room.id)
+        .where(model.user_id == user_id)
+    )
     
-    return response
+    today = date.today()
+    if scope == "upcoming":
+        query = query.where(model.date >= today)
+    elif scope == "past":
+        query = query.where(model.date < today)
+    if from_date is not None:
+        query = query.where(model.date >= from_date)
+    if to_date is not None:
+        query = query.where(model.date <= to_date)
+    if after is not None:
+        query = query.where(_after_cursor(model, after, ascending))
+    return query.order_by(*_listing_order(model, ascending))
+
+
+def _listing_order(columns, ascending: bool):
+    """Orden (date, start_time, id) sobre un modelo o las columnas de una subconsulta."""
+    if ascending:
+        return columns.date, columns.start_time, columns.id
+    return columns.date.desc(), columns.start_time.desc(), columns.id.desc()
+
+
+def _after_cursor(columns, after: ReservationCursor, ascending: bool):
+    """Condición "después del cursor" en el orden (date, start_time, id).
+    
+    Se expande en lugar de comparar tuplas para que el rango sobre la fecha
+    use el índice (user_id, date, start_time) en todos los motores.
+    """
+    if ascending:
+        return and_(
+            columns.date >= after.date,
+            or_(
+                columns.date > after.date,
+                columns.start_time > after.start_time,
+                and_(columns.start_time == after.start_time, columns.id > after.id)
+            )
+        )
+    return and_(
+        columns.date <= after.date,
+        or_(
+            columns.date < after.date,
+            columns.start_time < after.start_time,
+            and_(columns.start_time == after.start_time, columns.id < after.id)
+        )
+    )
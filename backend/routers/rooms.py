@@ -1,21 +1,247 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+import os
+from datetime import date, time
+from itertools import chain
 
-from database import get_db
-from database.models import Room
-from schemas import RoomResponse
+from database import get_db, get_read_db
+from database.archive import archive_cutoff
+from database.models import Room, Reservation, ReservationArchive
+from schemas import RoomResponse, RoomAvailability
+from utils.availability import (
+    END_OF_DAY, build_busy_masks, free_window_times, range_mask
+)
+from utils.availability_hub import HubFull, availability_hub, sse_frame
+from utils.holds import slot_holds
+from utils.room_search import SORT_KEYS
+from utils.rooms_cache import rooms_catalog, etag_matches
+from utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api", tags=["rooms"])
 
+# Tamaño máximo de página de la búsqueda de salas
+ROOMS_MAX_PAGE_SIZE = int(os.getenv("ROOMS_MAX_PAGE_SIZE", "200"))
+
 
 @router.get("/rooms", response_model=List[RoomResponse])
-def get_all_rooms(db: Session = Depends(get_db)):
+async def get_all_rooms(
+    request: Request,
+    q: Optional[str] = Query(None, max_length=100),
+    library: Optional[str] = Query(None, max_length=255),
+    min_capacity: Optional[int] = Query(None, alias="minCapacity", ge=0),
+    max_capacity: Optional[int] = Query(None, alias="maxCapacity", ge=0),
+    sort: Literal[SORT_KEYS] = "id",
+    limit: Optional[int] = Query(None, ge=1, le=ROOMS_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Obtener las salas disponibles para reservar, con búsqueda opcional.
+
+    Sin parámetros se devuelve el catálogo completo desde una caché en
+    memoria ya serializada, con un ETag fuerte: si el cliente envía
+    If-None-Match con el ETag vigente se responde 304 Not Modified. La base
+    de datos (una réplica, si hay) solo se consulta cuando la caché tiene que
+    recargarse: la ruta no toma una sesión por petición.
+
+    Con algún parámetro, las salas se filtran con el índice en memoria de
+    utils/room_search.py (construido junto con la caché) y se devuelven solo
+    las de la página pedida; el header X-Total-Count indica cuántas salas
+    cumplen los filtros.
+
+    Args:
+        q: Palabras a buscar (subcadena, sin distinguir mayúsculas ni tildes)
+           en el nombre de la sala o de la biblioteca
+        library: Nombre exacto de la biblioteca
+        minCapacity / maxCapacity: Rango de capacidad (inclusive)
+        sort: id, name, -name, capacity, -capacity o library
+        limit / offset: Paginación
+
+    Returns:
+        List[RoomResponse]: Salas que cumplen los filtros
+
+    Raises:
+        400: Si maxCapacity es menor que minCapacity
+    """
+    catalog = await rooms_catalog.get()
+
+    if not (q or library or min_capacity is not None or max_capacity is not None
+            or sort != "id" or limit is not None or offset):
+        headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), catalog.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=catalog.body, media_type="application/json", headers=headers)
+
+    if min_capacity is not None and max_capacity is not None and max_capacity < min_capacity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'maxCapacity' debe ser mayor o igual que 'minCapacity'"
+        )
+
+    result = catalog.search.search(q, library, min_capacity, max_capacity, sort, limit, offset)
+    return Response(
+        content=result.body,
+        media_type="application/json",
+        headers={"X-Total-Count": str(result.total), "Cache-Control": "no-cache"}
+    )
+
+
+@router.get("/rooms/availability", response_model=List[RoomAvailability])
+async def get_rooms_availability(
+    date: date,
+    from_time: Optional[time] = Query(None, alias="from"),
+    to_time: Optional[time] = Query(None, alias="to"),
+    min_capacity: Optional[int] = Query(None, alias="minCapacity", gt=0),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Obtener todas las salas disponibles para reservar.
-    
+    Obtener los huecos libres de cada sala en una fecha.
+
+    Carga todas las reservas del día en una sola consulta y arma un mapa de
+    bits de 96 franjas de 15 minutos por sala; los huecos libres se calculan
+    con operaciones de bits. Los horarios con una retención activa
+    (POST /api/holds) cuentan como ocupados.
+
+    Args:
+        date: Fecha a consultar
+        from: Hora de inicio de la ventana (por defecto 00:00)
+        to: Hora de fin de la ventana (por defecto fin del día)
+        minCapacity: Capacidad mínima de la sala
+
     Returns:
-        List[RoomResponse]: Lista de todas las salas con su información
+        List[RoomAvailability]: Salas con sus huecos libres dentro de la ventana
+
+    Raises:
+        400: Si la ventana horaria es inválida
     """
-    rooms = db.query(Room).all()
-    return rooms
+    if from_time is not None and to_time is not None and to_time <= from_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' debe ser posterior a 'from'"
+        )
+
+    rooms_query = select(Room.id, Room.name, Room.library_name, Room.capacity)
+    if min_capacity is not None:
+        rooms_query = rooms_query.where(Room.capacity >= min_capacity)
+    rooms = (await db.execute(rooms_query.order_by(Room.id))).all()
+
+    # La respuesta ya tiene la forma de RoomAvailability: se serializa directo
+    # sin volver a validarla contra el response_model
+    return FastJSONResponse(content=await _availability_payload(db, rooms, date, from_time, to_time))
+
+
+async def _availability_payload(
+    db: AsyncSession,
+    rooms,
+    date: date,
+    from_time: Optional[time] = None,
+    to_time: Optional[time] = None
+) -> list:
+    """Huecos libres de las salas (id, name, library_name, capacity) con la forma de RoomAvailability"""
+    window = range_mask(from_time or time(0, 0), to_time or END_OF_DAY)
+
+    day_reservations = (
+        select(Reservation.room_id, Reservation.start_time, Reservation.end_time)
+        .where(Reservation.date == date)
+    )
+    if date < archive_cutoff():
+        # Fecha ya archivada (o a medio archivar si el job está en curso)
+        day_reservations = union_all(
+            day_reservations,
+            select(ReservationArchive.room_id, ReservationArchive.start_time, ReservationArchive.end_time)
+            .where(ReservationArchive.date == date)
+        )
+
+    # Una sola consulta con todas las reservas del día, más los horarios
+    # retenidos temporalmente mientras otros usuarios completan su reserva
+    busy_by_room = build_busy_masks(chain(
+        (await db.execute(day_reservations)).all(),
+        slot_holds.held_intervals(date)
+    ))
+
+    # Muchas salas comparten el mismo patrón de ocupación: los huecos de cada
+    # máscara libre se calculan y formatean una sola vez por petición
+    windows_by_mask = {}
+    response = []
+    for room_id, name, library_name, capacity in rooms:
+        free = window & ~busy_by_room.get(room_id, 0)
+        windows = windows_by_mask.get(free)
+        if windows is None:
+            windows = [
+                {"startTime": start.isoformat(), "endTime": end.isoformat()}
+                for start, end in free_window_times(free, from_time, to_time)
+            ]
+            windows_by_mask[free] = windows
+        response.append({
+            "id": room_id,
+            "name": name,
+            "libraryName": library_name,
+            "capacity": capacity,
+            "available": free == window,
+            "freeWindows": windows
+        })
+    return response
+
+
+@router.get("/rooms/availability/stream", response_class=StreamingResponse)
+async def stream_rooms_availability(
+    date: date,
+    library: str = Query(..., min_length=1),
+    # Primaria: el estado inicial debe incluir todo lo confirmado antes de la
+    # suscripción, que ya no se publicará (una réplica atrasada lo perdería)
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Disponibilidad en vivo de las salas de una biblioteca en una fecha (Server-Sent Events).
+
+    El primer evento ("snapshot") trae la disponibilidad completa del día, con
+    la misma forma que GET /api/rooms/availability. Después llegan eventos
+    "slot" con cada cambio: { roomId, date, startTime, endTime, state }, donde
+    state es reserved, held o free. Ante un evento "resync" el cliente debe
+    volver a conectarse (EventSource lo hace solo) para recibir un estado
+    completo nuevo.
+
+    Args:
+        date: Fecha a seguir
+        library: Nombre de la biblioteca
+
+    Raises:
+        404: Si la biblioteca no tiene salas
+        503: Si este worker alcanzó el máximo de conexiones abiertas
+    """
+    rooms = (await db.execute(
+        select(Room.id, Room.name, Room.library_name, Room.capacity)
+        .where(Room.library_name == library)
+        .order_by(Room.id)
+    )).all()
+    if not rooms:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No hay salas en la biblioteca {library}"
+        )
+
+    # Suscribir antes de leer el estado inicial: un cambio que ocurra
+    # mientras tanto llega igual como evento (aplicarlo dos veces no cambia nada)
+    try:
+        subscription = availability_hub.subscribe(library, date, (room.id for room in rooms))
+    except HubFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas conexiones de disponibilidad en vivo; reintente más tarde"
+        )
+
+    try:
+        snapshot = sse_frame("snapshot", await _availability_payload(db, rooms, date))
+    except BaseException:
+        availability_hub.unsubscribe(subscription)
+        raise
+
+    # La sesión de base de datos se cierra al volver de la ruta: la conexión
+    # abierta solo espera eventos en memoria
+    return StreamingResponse(
+        availability_hub.stream(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,13 +2,21 @@
 from schemas.schemas import (
     UserBase, UserCreate, UserResponse,
     RoomBase, RoomCreate, RoomResponse,
+    AvailabilityWindow, RoomAvailability,
     ReservationCreate, ReservationResponse, ReservationRoomInfo,
+    ReservationSlot, RecurrenceRule, ReservationBatchCreate,
+    ReservationConflict, ReservationBatchResponse,
+    HoldCreate, HoldResponse,
     ErrorResponse
 )
 
 __all__ = [
     "UserBase", "UserCreate", "UserResponse",
     "RoomBase", "RoomCreate", "RoomResponse",
+    "AvailabilityWindow", "RoomAvailability",
     "ReservationCreate", "ReservationResponse", "ReservationRoomInfo",
+    "ReservationSlot", "RecurrenceRule", "ReservationBatchCreate",
+    "ReservationConflict", "ReservationBatchResponse",
+    "HoldCreate", "HoldResponse",
     "ErrorResponse"
 ]
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, ValidationInfo, field_validator
 from datetime import date, time, datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 # ============ USER SCHEMAS ============
@@ -18,8 +18,7 @@ class UserResponse(UserBase):
     id: int
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============ ROOM SCHEMAS ============
@@ -37,13 +36,45 @@ class RoomCreate(RoomBase):
 class RoomResponse(RoomBase):
     id: int
 
-    class Config:
-        from_attributes = True
-        populate_by_name = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+
+class AvailabilityWindow(BaseModel):
+    """Hueco libre dentro de la ventana consultada"""
+    start_time: time = Field(..., alias="startTime")
+    end_time: time = Field(..., alias="endTime")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class RoomAvailability(BaseModel):
+    """Disponibilidad de una sala en una fecha"""
+    id: int
+    name: str
+    library_name: str = Field(..., alias="libraryName")
+    capacity: int
+    available: bool  # True si toda la ventana consultada está libre
+    free_windows: List[AvailabilityWindow] = Field(default_factory=list, alias="freeWindows")
+
+    model_config = ConfigDict(populate_by_name=True)
 
 
 # ============ RESERVATION SCHEMAS ============
 
+# Validadores comunes a los esquemas con fecha y horario de reserva
+
+def _end_time_after_start_time(v: time, info: ValidationInfo) -> time:
+    if 'start_time' in info.data and v <= info.data['start_time']:
+        raise ValueError('end_time debe ser posterior a start_time')
+    return v
+
+
+def _not_in_past(v: date) -> date:
+    if v < date.today():
+        raise ValueError('No se pueden hacer reservas en fechas pasadas')
+    return v
+
+
 class ReservationCreate(BaseModel):
     user_id: int = Field(..., alias="userId", gt=0)
     room_id: int = Field(..., alias="roomId", gt=0)
@@ -51,20 +82,89 @@ class ReservationCreate(BaseModel):
     start_time: time = Field(..., alias="startTime")
     end_time: time = Field(..., alias="endTime")
 
-    @validator('end_time')
-    def end_time_after_start_time(cls, v, values):
-        if 'start_time' in values and v <= values['start_time']:
-            raise ValueError('end_time debe ser posterior a start_time')
+    end_time_after_start_time = field_validator('end_time')(_end_time_after_start_time)
+    date_not_in_past = field_validator('date')(_not_in_past)
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ReservationSlot(BaseModel):
+    """Una ocurrencia (fecha y horario) de una reserva múltiple"""
+    date: date
+    start_time: time = Field(..., alias="startTime")
+    end_time: time = Field(..., alias="endTime")
+
+    end_time_after_start_time = field_validator('end_time')(_end_time_after_start_time)
+    date_not_in_past = field_validator('date')(_not_in_past)
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class RecurrenceRule(BaseModel):
+    """Regla de recurrencia semanal: los días indicados, desde startDate hasta until (inclusive)"""
+    frequency: Literal["weekly"] = "weekly"
+    # 0 = lunes ... 6 = domingo
+    weekdays: List[int] = Field(..., min_length=1)
+    start_date: date = Field(..., alias="startDate")
+    until: date
+    start_time: time = Field(..., alias="startTime")
+    end_time: time = Field(..., alias="endTime")
+
+    @field_validator('weekdays')
+    @classmethod
+    def valid_weekdays(cls, v: List[int]) -> List[int]:
+        if any(not 0 <= day <= 6 for day in v):
+            raise ValueError('weekdays debe contener valores entre 0 (lunes) y 6 (domingo)')
         return v
 
-    @validator('date')
-    def date_not_in_past(cls, v):
-        if v < date.today():
-            raise ValueError('No se pueden hacer reservas en fechas pasadas')
+    end_time_after_start_time = field_validator('end_time')(_end_time_after_start_time)
+    start_date_not_in_past = field_validator('start_date')(_not_in_past)
+
+    @field_validator('until')
+    @classmethod
+    def until_after_start_date(cls, v: date, info: ValidationInfo) -> date:
+        if 'start_date' in info.data and v < info.data['start_date']:
+            raise ValueError('until debe ser igual o posterior a startDate')
+        return v
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ReservationBatchCreate(BaseModel):
+    """
+    Reserva múltiple de una sala: una lista explícita de ocurrencias (slots)
+    o una regla de recurrencia (recurrence), no ambas.
+
+    Con atomic=true, si alguna ocurrencia tiene conflicto no se crea ninguna.
+    """
+    user_id: int = Field(..., alias="userId", gt=0)
+    room_id: int = Field(..., alias="roomId", gt=0)
+    slots: Optional[List[ReservationSlot]] = None
+    # validate_default: la validación corre aunque no se envíe recurrence
+    recurrence: Optional[RecurrenceRule] = Field(default=None, validate_default=True)
+    atomic: bool = False
+
+    @field_validator('recurrence')
+    @classmethod
+    def slots_or_recurrence(cls, v: Optional[RecurrenceRule], info: ValidationInfo) -> Optional[RecurrenceRule]:
+        has_slots = bool(info.data.get('slots'))
+        if has_slots == (v is not None):
+            raise ValueError('Se debe indicar slots o recurrence (uno de los dos)')
         return v
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ReservationConflict(BaseModel):
+    """Ocurrencia que no se pudo reservar"""
+    date: date
+    start_time: time = Field(..., alias="startTime")
+    end_time: time = Field(..., alias="endTime")
+    # overlap: choca con una reserva existente; overlap_in_request: con otra ocurrencia del mismo pedido;
+    # held: con un horario retenido temporalmente por otro usuario
+    reason: str
+
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class ReservationRoomInfo(BaseModel):
@@ -73,9 +173,7 @@ class ReservationRoomInfo(BaseModel):
     name: str
     library_name: str = Field(..., alias="libraryName")
 
-    class Config:
-        from_attributes = True
-        populate_by_name = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 
 class ReservationResponse(BaseModel):
@@ -85,10 +183,39 @@ class ReservationResponse(BaseModel):
     start_time: time = Field(..., alias="startTime")
     end_time: time = Field(..., alias="endTime")
     email_sent: bool = Field(default=True, alias="emailSent")
+    # queued: entregado a la cola (outbox o envío en segundo plano); not_sent: rechazado
+    email_status: Optional[str] = Field(default=None, alias="emailStatus")
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+
+class ReservationBatchResponse(BaseModel):
+    created: List[ReservationResponse]
+    conflicts: List[ReservationConflict]
+    email_sent: bool = Field(default=True, alias="emailSent")
+    email_status: Optional[str] = Field(default=None, alias="emailStatus")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+# ============ HOLD SCHEMAS ============
+
+class HoldCreate(ReservationCreate):
+    """Retención temporal de un horario: mismos datos y validaciones que una reserva"""
+    pass
+
+
+class HoldResponse(BaseModel):
+    id: str
+    user_id: int = Field(..., alias="userId")
+    room_id: int = Field(..., alias="roomId")
+    date: date
+    start_time: time = Field(..., alias="startTime")
+    end_time: time = Field(..., alias="endTime")
+    expires_at: datetime = Field(..., alias="expiresAt")  # UTC
+    expires_in: int = Field(..., alias="expiresIn")  # segundos
 
-    class Config:
-        from_attributes = True
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 # ============ ERROR SCHEMAS ============
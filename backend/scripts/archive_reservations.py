@@ -0,0 +1,69 @@
+"""
+Script para archivar las reservas pasadas (database/archive.py).
+
+Mueve a `reservations_archive` las reservas con fecha anterior a hoy menos
+RESERVATIONS_ARCHIVE_AFTER_DAYS días, en lotes de RESERVATIONS_ARCHIVE_BATCH_SIZE
+filas, cada uno en su propia transacción. Se puede interrumpir y volver a
+ejecutar: continúa con las que falten. Pensado para correr a diario (cron).
+
+Uso:
+    python scripts/archive_reservations.py                 # archivar todo lo pendiente
+    python scripts/archive_reservations.py --dry-run       # solo contar
+    python scripts/archive_reservations.py --max-batches 10 --pause 0.5
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Añadir directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.archive import (
+    RESERVATIONS_ARCHIVE_AFTER_DAYS, RESERVATIONS_ARCHIVE_BATCH_SIZE,
+    archive_cutoff, archive_reservations, pending_count
+)
+from database.connection import engine
+from database.migrations import analyze, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivar reservas pasadas")
+    parser.add_argument("--dry-run", action="store_true", help="Contar las reservas a archivar sin moverlas")
+    parser.add_argument("--batch-size", type=int, default=RESERVATIONS_ARCHIVE_BATCH_SIZE,
+                        help="Reservas por transacción")
+    parser.add_argument("--max-batches", type=int, default=None, help="Detenerse tras N lotes")
+    parser.add_argument("--pause", type=float, default=0.0, help="Segundos de espera entre lotes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        # La tabla de archivo llega con la migración 6
+        upgrade(engine)
+
+        cutoff = archive_cutoff()
+        with engine.connect() as connection:
+            pending = pending_count(connection, cutoff)
+        print(f"Horizonte: {RESERVATIONS_ARCHIVE_AFTER_DAYS} días (se archivan las reservas anteriores al {cutoff})")
+        print(f"Pendientes: {pending}")
+        if args.dry_run or not pending:
+            return
+
+        moved = archive_reservations(
+            engine, cutoff, batch_size=args.batch_size, max_batches=args.max_batches, pause=args.pause
+        )
+        if moved:
+            # Estadísticas al día para el planificador tras el cambio de tamaño
+            with engine.begin() as connection:
+                analyze(connection, "reservations", "reservations_archive")
+        print(f"✅ {moved} reservas archivadas")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from dotenv import load_dotenv
 from database.connection import engine, SessionLocal
-from database.models import User, Room, Reservation
+from database.archive import RESERVATIONS_ARCHIVE_AFTER_DAYS, archive_cutoff, pending_count
+from database.models import User, Room, Reservation, ReservationArchive
+from sqlalchemy import inspect
 from utils.rabbitmq import check_rabbitmq_connection
 import smtplib
 
@@ -60,12 +62,29 @@ def check_database():
         user_count = db.query(User).count()
         room_count = db.query(Room).count()
         reservation_count = db.query(Reservation).count()
+        # La tabla de archivo existe desde la migración 6
+        archived_count = None
+        if inspect(connection).has_table(ReservationArchive.__tablename__):
+            archived_count = db.query(ReservationArchive).count()
         db.close()
         
         print(f"\n📊 Registros:")
         print(f"   • Usuarios: {user_count}")
         print(f"   • Salas: {room_count}")
-        print(f"   • Reservas: {reservation_count}")
+        print(f"   • Reservas activas: {reservation_count}")
+        if archived_count is None:
+            print("   • Reservas archivadas: tabla no creada (python scripts/migrate.py)")
+        else:
+            print(f"   • Reservas archivadas: {archived_count}")
+        
+        # Reservas que ya deberían estar en el archivo
+        pending = pending_count(connection)
+        print(f"\n🗃️  Archivado (horizonte {RESERVATIONS_ARCHIVE_AFTER_DAYS} días, antes del {archive_cutoff()}):")
+        if pending:
+            print(f"   ⚠️  {pending} reservas pendientes de archivar")
+            print("   💡 python scripts/archive_reservations.py")
+        else:
+            print("   ✅ Sin reservas pendientes")
         
         connection.close()
         return True
@@ -99,7 +118,8 @@ def check_rabbitmq():
         if check_rabbitmq_connection():
             print("✅ Conexión exitosa")
             print(f"Cola: {os.getenv('EMAIL_QUEUE_NAME', 'email_notifications')}")
-            print("\n⚠️  Recuerda iniciar el worker:")
+            print("\n⚠️  Recuerda iniciar el relay del outbox y el worker:")
+            print("   python utils/outbox_relay.py")
             print("   python utils/email_worker.py")
             return True
         else:
@@ -232,7 +252,8 @@ def main():
         print("\n🚀 Puedes iniciar el sistema:")
         print("   Terminal 1: python main.py")
         if results['rabbitmq']:
-            print("   Terminal 2: python utils/email_worker.py")
+            print("   Terminal 2: python utils/outbox_relay.py")
+            print("   Terminal 3: python utils/email_worker.py")
     else:
         print("\n⚠️  Hay problemas de configuración")
         print("   Revisa los detalles arriba y el archivo AWS_RABBITMQ_CONFIG.md")
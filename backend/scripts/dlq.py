@@ -0,0 +1,134 @@
+"""
+Script para inspeccionar y reprocesar la DLQ de emails.
+
+Los mensajes llegan a la DLQ cuando agotan EMAIL_MAX_ATTEMPTS intentos o
+cuando son inválidos (ver utils/email_worker.py).
+
+Uso:
+    python scripts/dlq.py stats               # mensajes en la cola, reintentos y DLQ
+    python scripts/dlq.py list --limit 20     # ver mensajes sin sacarlos de la DLQ
+    python scripts/dlq.py replay --limit 100  # devolverlos a la cola principal
+    python scripts/dlq.py purge               # descartar todos los mensajes de la DLQ
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Añadir directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pika
+from dotenv import load_dotenv
+
+from utils.rabbitmq import (
+    get_rabbitmq_connection,
+    declare_email_topology,
+    retry_queue_name,
+    dead_letter_queue_name
+)
+
+load_dotenv()
+
+QUEUE_NAME = os.getenv("EMAIL_QUEUE_NAME", "email_notifications")
+MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+
+
+def show_stats(channel):
+    queues = [QUEUE_NAME]
+    queues += [retry_queue_name(QUEUE_NAME, attempt) for attempt in range(1, MAX_ATTEMPTS)]
+    queues.append(dead_letter_queue_name(QUEUE_NAME))
+
+    for queue in queues:
+        result = channel.queue_declare(queue=queue, passive=True)
+        print(f"  {queue:<40} {result.method.message_count:>8}")
+
+
+def list_messages(channel, limit: int):
+    dlq = dead_letter_queue_name(QUEUE_NAME)
+    shown = 0
+
+    # Los mensajes leídos sin ACK vuelven a la DLQ al cerrar la conexión
+    while shown < limit:
+        method, properties, body = channel.basic_get(queue=dlq, auto_ack=False)
+        if method is None:
+            break
+        shown += 1
+
+        headers = properties.headers or {}
+        try:
+            reservation_id = json.loads(body).get("reservation_id")
+        except Exception:
+            reservation_id = None
+
+        print(f"\n#{shown} reserva: {reservation_id}")
+        print(f"   Intentos: {headers.get('x-attempts')}")
+        print(f"   Falló: {headers.get('x-failed-at')}")
+        print(f"   Error: {headers.get('x-last-error')}")
+
+    if shown == 0:
+        print("✅ La DLQ está vacía")
+
+
+def replay_messages(channel, limit: int):
+    dlq = dead_letter_queue_name(QUEUE_NAME)
+    channel.confirm_delivery()
+    replayed = 0
+
+    while replayed < limit:
+        method, properties, body = channel.basic_get(queue=dlq, auto_ack=False)
+        if method is None:
+            break
+
+        # Vuelve a la cola principal con los intentos en cero
+        channel.basic_publish(
+            exchange='',
+            routing_key=QUEUE_NAME,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type=properties.content_type or 'application/json'
+            )
+        )
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+
+    print(f"✅ {replayed} mensajes devueltos a '{QUEUE_NAME}'")
+
+
+def purge_messages(channel):
+    dlq = dead_letter_queue_name(QUEUE_NAME)
+    result = channel.queue_purge(dlq)
+    print(f"✅ {result.method.message_count} mensajes eliminados de '{dlq}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspeccionar y reprocesar la DLQ de emails")
+    parser.add_argument("command", choices=["stats", "list", "replay", "purge"])
+    parser.add_argument("--limit", type=int, default=20, help="Cantidad máxima de mensajes (list/replay)")
+    args = parser.parse_args()
+
+    try:
+        connection = get_rabbitmq_connection()
+        channel = connection.channel()
+        declare_email_topology(channel, QUEUE_NAME, MAX_ATTEMPTS)
+
+        if args.command == "stats":
+            show_stats(channel)
+        elif args.command == "list":
+            list_messages(channel, args.limit)
+        elif args.command == "replay":
+            replay_messages(channel, args.limit)
+        else:
+            purge_messages(channel)
+
+        connection.close()
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Script que muestra el plan de ejecución (EXPLAIN) de las consultas más
+frecuentes de la API e indica si usan los índices esperados.
+
+Consultas revisadas:
+- Conflictos por sala y fecha (índice en memoria y reservas en lote)
+- Disponibilidad de todas las salas en una fecha
+- Listado paginado de "Mis Reservas" (próximas y pasadas)
+- Filas pendientes del outbox de emails
+
+Soporta SQLite (EXPLAIN QUERY PLAN), PostgreSQL y MySQL (EXPLAIN). Con tablas
+pequeñas PostgreSQL puede preferir un Seq Scan aunque el índice exista: usar
+--no-seqscan para comprobar que el índice es utilizable.
+
+Uso:
+    python scripts/explain_queries.py
+    python scripts/explain_queries.py --no-seqscan --database-url postgresql://...
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import date, timedelta
+from typing import List, NamedTuple, Set, Tuple
+
+# Añadir directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from database.models import EmailOutbox, Reservation, Room
+
+# Tablas en las que un recorrido completo indica un índice faltante
+_HOT_TABLES = {"reservations", "email_outbox"}
+
+# Igualdad sobre sala y fecha: sirve el índice del constraint único (SQLite no
+# conserva su nombre) o el de disponibilidad, que empieza por (date, room_id)
+_ROOM_DATE_INDEXES = ("uq_room_datetime", "sqlite_autoindex_reservations_1", "ix_reservations_date_room_times")
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN de una consulta de SQLAlchemy, con sus parámetros ya procesados."""
+    inherit_cache = False
+
+    def __init__(self, statement, prefix: str):
+        self.statement = statement
+        self.prefix = prefix
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    return f"{element.prefix} {compiler.process(element.statement, **kw)}"
+
+
+class HotQuery(NamedTuple):
+    name: str
+    statement: object
+    expected: Tuple[str, ...]  # índices que debería usar (el primero es el nombre del modelo)
+
+
+class PlanReport(NamedTuple):
+    lines: List[str]
+    indexes: Set[str]
+    scanned: Set[str]  # tablas recorridas completas
+
+
+def hot_queries(user_id: int, room_id: int) -> List[HotQuery]:
+    today = date.today()
+    listing = (
+        select(
+            Reservation.id, Reservation.date, Reservation.start_time, Reservation.end_time,
+            Room.id, Room.name, Room.library_name
+        )
+        .join(Room, Reservation.room_id == Room.id)
+        .where(Reservation.user_id == user_id)
+    )
+
+    return [
+        HotQuery(
+            "conflictos (sala + fecha)",
+            select(Reservation.start_time, Reservation.end_time)
+            .where(Reservation.room_id == room_id, Reservation.date == today),
+            _ROOM_DATE_INDEXES
+        ),
+        HotQuery(
+            "reservas en lote (sala + fechas)",
+            select(Reservation.date, Reservation.start_time, Reservation.end_time)
+            .where(Reservation.room_id == room_id,
+                   Reservation.date.in_([today + timedelta(weeks=week) for week in range(4)])),
+            _ROOM_DATE_INDEXES
+        ),
+        HotQuery(
+            "disponibilidad del día",
+            select(Reservation.room_id, Reservation.start_time, Reservation.end_time)
+            .where(Reservation.date == today),
+            ("ix_reservations_date_room_times",)
+        ),
+        HotQuery(
+            "mis reservas (próximas)",
+            listing.where(Reservation.date >= today)
+            .order_by(Reservation.date, Reservation.start_time, Reservation.id)
+            .limit(51),
+            ("ix_reservations_user_date_start",)
+        ),
+        HotQuery(
+            "mis reservas (pasadas)",
+            listing.where(Reservation.date < today)
+            .order_by(Reservation.date.desc(), Reservation.start_time.desc(), Reservation.id.desc())
+            .limit(51),
+            ("ix_reservations_user_date_start",)
+        ),
+        HotQuery(
+            "outbox pendiente",
+            select(EmailOutbox.id).where(EmailOutbox.status == "pending").order_by(EmailOutbox.id).limit(100),
+            ("ix_email_outbox_status_id",)
+        ),
+    ]
+
+
+def explain(connection, statement) -> PlanReport:
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        rows = connection.execute(Explain(statement, "EXPLAIN QUERY PLAN")).all()
+        lines = [row[-1] for row in rows]
+        indexes = set()
+        scanned = set()
+        for line in lines:
+            indexes.update(re.findall(r"USING (?:COVERING )?INDEX (\w+)", line))
+            match = re.match(r"SCAN (\w+)$", line)
+            if match:
+                scanned.add(match.group(1))
+        return PlanReport(lines, indexes, scanned)
+
+    if dialect == "postgresql":
+        lines = [row[0] for row in connection.execute(Explain(statement, "EXPLAIN")).all()]
+        plan = "\n".join(lines)
+        indexes = set(re.findall(r"Index (?:Only )?Scan (?:Backward )?using (\w+)", plan))
+        indexes.update(re.findall(r"Bitmap Index Scan on (\w+)", plan))
+        scanned = set(re.findall(r"Seq Scan on (\w+)", plan))
+        return PlanReport(lines, indexes, scanned)
+
+    if dialect == "mysql":
+        result = connection.execute(Explain(statement, "EXPLAIN"))
+        rows = [dict(row._mapping) for row in result]
+        lines = [
+            f"{row.get('table')}: type={row.get('type')} key={row.get('key')} extra={row.get('Extra')}"
+            for row in rows
+        ]
+        indexes = {row["key"] for row in rows if row.get("key")}
+        scanned = {row["table"] for row in rows if row.get("type") == "ALL"}
+        return PlanReport(lines, indexes, scanned)
+
+    raise ValueError(f"EXPLAIN no soportado para {dialect}")
+
+
+def sample_ids(connection) -> tuple:
+    """Usuario y sala con reservas, para que el plan refleje datos reales."""
+    row = connection.execute(select(Reservation.user_id, Reservation.room_id).limit(1)).first()
+    if row is not None:
+        return row
+    room_id = connection.execute(select(Room.id).limit(1)).scalar()
+    return 1, room_id or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN de las consultas frecuentes")
+    parser.add_argument("--database-url", default=None,
+                        help="URL de la base de datos (por defecto DATABASE_URL)")
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--room-id", type=int, default=None)
+    parser.add_argument("--no-seqscan", action="store_true",
+                        help="PostgreSQL: desalentar Seq Scan para verificar que el índice es utilizable")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from database.connection import engine
+
+    problems = 0
+    with engine.connect() as connection:
+        if args.no_seqscan and connection.dialect.name == "postgresql":
+            connection.execute(text("SET enable_seqscan = off"))
+
+        user_id, room_id = sample_ids(connection)
+        user_id = args.user_id or user_id
+        room_id = args.room_id or room_id
+
+        print("=" * 60)
+        print(f"🔍 EXPLAIN ({connection.dialect.name}) - usuario {user_id}, sala {room_id}")
+        print("=" * 60)
+
+        for query in hot_queries(user_id, room_id):
+            report = explain(connection, query.statement)
+            hot_scans = report.scanned & _HOT_TABLES
+
+            print(f"\n▶ {query.name}")
+            for line in report.lines:
+                print(f"    {line}")
+
+            if hot_scans:
+                problems += 1
+                print(f"  ⚠️  Recorre la tabla completa: {', '.join(sorted(hot_scans))}")
+            elif report.indexes & set(query.expected):
+                print(f"  ✅ Usa {query.expected[0]}")
+            elif report.indexes:
+                print(f"  ⚠️  Usa {', '.join(sorted(report.indexes))} (se esperaba {query.expected[0]})")
+            else:
+                problems += 1
+                print(f"  ⚠️  No usa índices (se esperaba {query.expected[0]})")
+
+    print("\n" + "=" * 60)
+    if problems:
+        print(f"❌ {problems} consultas sin índice. ¿Faltan migraciones? python scripts/migrate.py")
+        sys.exit(1)
+    print("✅ Todas las consultas usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Script para aplicar las migraciones de esquema (database/migrations.py).
+
+Aplica en orden las migraciones pendientes sobre DATABASE_URL. Es seguro
+ejecutarlo en cada despliegue: si no hay pendientes no hace nada.
+
+Uso:
+    python scripts/migrate.py             # aplicar todas las pendientes
+    python scripts/migrate.py --status    # versiones aplicadas y pendientes
+    python scripts/migrate.py --to 2      # aplicar hasta la versión 2
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Añadir directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.connection import engine
+from database.migrations import MIGRATIONS, applied_versions, upgrade
+
+
+def show_status():
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            applied_at = applied[migration.version][1]
+            print(f"  ✅ {migration.version:>3}  {migration.name:<40} {applied_at:%Y-%m-%d %H:%M:%S}")
+        else:
+            print(f"  ⏳ {migration.version:>3}  {migration.name:<40} pendiente")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplicar migraciones de esquema")
+    parser.add_argument("--status", action="store_true", help="Mostrar el estado sin aplicar nada")
+    parser.add_argument("--to", type=int, default=None, help="Versión máxima a aplicar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        if args.status:
+            show_status()
+            return
+
+        applied = upgrade(engine, target=args.to)
+        if applied:
+            for migration in applied:
+                print(f"✅ {migration.version}: {migration.name}")
+        else:
+            print("✅ El esquema está al día")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
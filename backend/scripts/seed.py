@@ -2,7 +2,7 @@
 Script de inicialización (seed) de la base de datos.
 
 Este script:
-1. Crea las tablas necesarias si no existen
+1. Aplica las migraciones de esquema (crea las tablas e índices que falten)
 2. Inserta un usuario de prueba
 3. Inserta varias salas de ejemplo
 4. Muestra los IDs generados por consola
@@ -17,7 +17,8 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database.connection import engine, SessionLocal
-from database.models import Base, User, Room
+from database.models import User, Room
+from database.migrations import upgrade
 from datetime import datetime
 
 
@@ -28,10 +29,11 @@ def seed_database():
     print("INICIANDO SEED DE BASE DE DATOS")
     print("=" * 60)
     
-    # Crear todas las tablas
-    print("\n[1/3] Creando tablas...")
-    Base.metadata.create_all(bind=engine)
-    print("✓ Tablas creadas exitosamente")
+    # Crear las tablas y aplicar las migraciones pendientes: a diferencia de
+    # create_all, también agrega índices y protecciones a tablas existentes
+    print("\n[1/3] Aplicando migraciones...")
+    applied = upgrade(engine)
+    print(f"✓ Esquema al día ({len(applied)} migraciones aplicadas)")
     
     # Crear sesión de base de datos
     db = SessionLocal()
@@ -0,0 +1,18 @@
+@echo off
+REM Script para iniciar el relay del outbox de emails
+
+echo ============================================================
+echo Email Outbox Relay
+echo ============================================================
+echo.
+echo Este proceso publica en RabbitMQ las tareas de email que la
+echo API guarda en la tabla email_outbox. Debe estar corriendo
+echo junto con el backend y el email worker.
+echo.
+echo Presiona Ctrl+C para detener el relay
+echo ============================================================
+echo.
+
+cd /d "%~dp0"
+
+python utils/outbox_relay.py
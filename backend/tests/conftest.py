@@ -0,0 +1,96 @@
+"""
+Configuración de pytest: base de datos SQLite temporal con el esquema al día.
+
+DATABASE_URL se fija antes de importar la aplicación, porque los engines se
+crean al importar database.connection.
+
+Fixtures:
+    run: ejecuta una corrutina en su propio event loop
+    client: ejecuta peticiones contra la aplicación (httpx.AsyncClient con ASGITransport)
+    make_user / make_room: crean un usuario o una sala y devuelven su ID
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_database_dir = tempfile.mkdtemp(prefix="biblioreservas-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+from database.connection import SessionLocal, async_engine, engine  # noqa: E402
+from database.migrations import upgrade  # noqa: E402
+from database.models import Room, User  # noqa: E402
+
+upgrade(engine)
+
+_ids = itertools.count(1)
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            # Cada asyncio.run tiene su propio event loop: no reutilizar conexiones
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def run():
+    return _run
+
+
+@pytest.fixture
+def client(run):
+    """
+    Cliente de la API: client(lambda c: c.get(...)) ejecuta la corrutina con
+    un httpx.AsyncClient y devuelve su resultado.
+    """
+    import httpx
+    from main import app
+
+    def call(requests):
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await requests(http)
+        return run(main())
+    return call
+
+
+@pytest.fixture
+def make_user():
+    def create(name: str = "Usuario Prueba") -> int:
+        db = SessionLocal()
+        try:
+            user = User(name=name, email=f"usuario{next(_ids)}@example.com")
+            db.add(user)
+            db.commit()
+            return user.id
+        finally:
+            db.close()
+    return create
+
+
+@pytest.fixture
+def make_room():
+    def create(capacity: int = 4) -> int:
+        db = SessionLocal()
+        try:
+            room = Room(name=f"Sala Prueba {next(_ids)}", library_name="Biblioteca Central", capacity=capacity)
+            db.add(room)
+            db.commit()
+            return room.id
+        finally:
+            db.close()
+    return create
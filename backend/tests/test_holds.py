@@ -0,0 +1,96 @@
+"""
+Retenciones temporales de horarios (utils/holds.py y routers/holds.py).
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+
+from utils.holds import HoldConflict, HoldLimitExceeded, SlotHoldRegistry
+
+DAY = date.today() + timedelta(days=20)
+
+
+def test_rejected_hold_keeps_existing_holds():
+    holds = SlotHoldRegistry(max_per_user=2)
+    first = holds.create(1, 1, DAY, time(9, 0), time(10, 0))
+    second = holds.create(1, 1, DAY, time(11, 0), time(12, 0))
+
+    # Sobre el límite: la nueva se rechaza sin tocar las que ya tenía,
+    # aunque se solape con una de ellas
+    with pytest.raises(HoldLimitExceeded):
+        holds.create(1, 2, DAY, time(9, 0), time(10, 0))
+    assert holds.get(first.id) is first and holds.get(second.id) is second
+
+    # Reemplazar una propia no suma: el cambio de horario se acepta
+    moved = holds.create(1, 1, DAY, time(9, 30), time(10, 30))
+    assert holds.get(first.id) is None
+    assert holds.get(moved.id) is moved and holds.get(second.id) is second
+
+
+def test_rejected_replacement_keeps_replaced_hold():
+    holds = SlotHoldRegistry(max_per_user=3)
+    kept = [holds.create(1, 1, DAY, time(hour, 0), time(hour + 1, 0)) for hour in (9, 11, 13)]
+    # Límite más bajo que las retenciones que ya tiene (p. ej. HOLDS_MAX_PER_USER reducido)
+    holds._max_per_user = 1
+
+    with pytest.raises(HoldLimitExceeded):
+        holds.create(1, 1, DAY, time(9, 30), time(10, 30))
+    assert all(holds.get(hold.id) is hold for hold in kept)
+
+
+def test_hold_blocks_other_users_until_confirmed(client, make_user, make_room):
+    owner, other, room_id = make_user(), make_user(), make_room()
+    day = (date.today() + timedelta(days=21)).isoformat()
+
+    def slot(user_id: int, start: str = "10:00", end: str = "11:00") -> dict:
+        return {"userId": user_id, "roomId": room_id, "date": day, "startTime": start, "endTime": end}
+
+    async def requests(http):
+        responses = {}
+        hold = await http.post("/api/holds", json=slot(owner))
+        assert hold.status_code == 201, hold.text
+        hold_id = hold.json()["id"]
+        responses["other_reservation"] = await http.post("/api/reservations", json=slot(other, "10:30", "11:30"))
+        responses["other_hold"] = await http.post("/api/holds", json=slot(other, "09:30", "10:30"))
+        responses["availability"] = await http.get("/api/rooms/availability", params={"date": day})
+        responses["confirm"] = await http.post(f"/api/holds/{hold_id}/confirm")
+        responses["replay"] = await http.post(f"/api/holds/{hold_id}/confirm")
+        responses["get"] = await http.get(f"/api/holds/{hold_id}")
+        responses["mine"] = await http.get(f"/api/users/{owner}/reservations")
+        return responses
+
+    responses = client(requests)
+    assert responses["other_reservation"].status_code == 409
+    assert responses["other_hold"].status_code == 409
+    room = next(item for item in responses["availability"].json() if item["id"] == room_id)
+    assert {"startTime": "10:00:00", "endTime": "11:00:00"} not in room["freeWindows"]
+    assert room["available"] is False
+
+    confirm, replay = responses["confirm"], responses["replay"]
+    assert confirm.status_code == 201, confirm.text
+    # Confirmar de nuevo repite la misma reserva sin crear otra
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == confirm.json()
+    assert responses["get"].status_code == 404
+    assert [reservation["id"] for reservation in responses["mine"].json()] == [confirm.json()["id"]]
+
+
+def test_hold_being_confirmed_keeps_blocking():
+    holds = SlotHoldRegistry(ttl=60)
+    hold = holds.create(1, 1, DAY, time(10, 0), time(11, 0))
+
+    taken = holds.take(hold.id)
+    assert taken is hold
+    # Una segunda confirmación no la toma, y nadie la libera ni la reemplaza
+    assert holds.take(hold.id) is None
+    assert holds.release(hold.id) is False
+    assert holds.overlaps(1, DAY, time(10, 30), time(11, 30), user_id=2)
+    with pytest.raises(HoldConflict):
+        holds.create(1, 1, DAY, time(10, 30), time(11, 30))
+
+    # La confirmación falló: vuelve a estar activa y se puede liberar
+    holds.restore(taken)
+    assert holds.release(hold.id) is True
+    assert not holds.overlaps(1, DAY, time(10, 30), time(11, 30), user_id=2)
@@ -0,0 +1,133 @@
+"""
+Idempotency-Key en POST /api/reservations (utils/idempotency.py).
+
+Un reintento con la misma clave repite la respuesta guardada sin crear otra
+reserva; una clave en curso no se puede tomar hasta que vence su lease, y una
+petición cuyo lease venció ya no puede completar ni liberar la clave.
+"""
+
+import asyncio
+import time as _time
+from datetime import date, timedelta
+
+import pytest
+
+from database.connection import SessionLocal
+from database.models import Reservation
+from utils.idempotency import (
+    DatabaseIdempotencyStore, IdempotencyInProgress, MemoryIdempotencyStore, StoredResponse,
+    REPLAYED_HEADER, run_idempotent
+)
+from utils.responses import FastJSONResponse
+
+LEASE = 1.0
+
+
+def test_retry_replays_response_without_new_reservation(client, make_user, make_room):
+    user_id, room_id = make_user(), make_room()
+    body = {
+        "userId": user_id, "roomId": room_id,
+        "date": (date.today() + timedelta(days=12)).isoformat(),
+        "startTime": "10:00", "endTime": "11:00"
+    }
+    headers = {"Idempotency-Key": f"test-replay-{user_id}"}
+
+    async def requests(http):
+        first = await http.post("/api/reservations", json=body, headers=headers)
+        retry = await http.post("/api/reservations", json=body, headers=headers)
+        other = await http.post("/api/reservations", json={**body, "startTime": "12:00", "endTime": "13:00"},
+                                headers=headers)
+        return first, retry, other
+
+    first, retry, other = client(requests)
+    assert first.status_code == 201, first.text
+    assert REPLAYED_HEADER not in first.headers
+    assert retry.status_code == 201
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+    # La misma clave con otro cuerpo no es un reintento
+    assert other.status_code == 422, other.text
+
+    db = SessionLocal()
+    try:
+        assert db.query(Reservation).filter_by(room_id=room_id).count() == 1
+    finally:
+        db.close()
+
+
+def test_failed_request_releases_key(run):
+    store = MemoryIdempotencyStore(wait_timeout=0.05, lease=LEASE)
+    calls = []
+
+    async def conflict():
+        calls.append("conflict")
+        return FastJSONResponse({"detail": "conflicto"}, status_code=409)
+
+    async def created():
+        calls.append("created")
+        return FastJSONResponse({"id": 1}, status_code=201)
+
+    async def main():
+        first = await run_idempotent("test-release", "fp", conflict, store=store)
+        second = await run_idempotent("test-release", "fp", created, store=store)
+        replay = await run_idempotent("test-release", "fp", created, store=store)
+        return first, second, replay
+
+    first, second, replay = run(main())
+    assert (first.status_code, second.status_code, replay.status_code) == (409, 201, 201)
+    assert replay.headers[REPLAYED_HEADER] == "true"
+    assert calls == ["conflict", "created"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _memory_store():
+    clock = FakeClock()
+
+    async def expire():
+        clock.now += LEASE
+
+    return MemoryIdempotencyStore(wait_timeout=0.05, lease=LEASE, clock=clock), expire
+
+
+def _database_store():
+    async def expire():
+        # El lease de la base se mide con el reloj real, en segundos enteros
+        await asyncio.sleep(LEASE + 0.1)
+
+    return DatabaseIdempotencyStore(wait_timeout=0.05, lease=LEASE), expire
+
+
+@pytest.mark.parametrize("make_store", [_memory_store, _database_store], ids=["memory", "database"])
+def test_lease_conflict_and_takeover(run, make_store):
+    store, expire = make_store()
+    key = f"test-lease-{make_store.__name__}-{_time.time()}"
+    stored = StoredResponse(201, b'{"id": 1}')
+
+    async def main():
+        first = await store.claim(key, "fp")
+        # En curso: otra petición con la misma clave no la puede tomar
+        with pytest.raises(IdempotencyInProgress):
+            await store.claim(key, "fp")
+
+        # El worker que la tomó no terminó: vencido el lease, un reintento la toma
+        await expire()
+        second = await store.claim(key, "fp")
+        assert not isinstance(second, StoredResponse)
+
+        # La petición original ya no puede completar ni liberar la clave ajena
+        await store.complete(key, first, StoredResponse(201, b'{"id": 0}'))
+        await store.release(key, first)
+        with pytest.raises(IdempotencyInProgress):
+            await store.claim(key, "fp")
+
+        await store.complete(key, second, stored)
+        return await store.claim(key, "fp")
+
+    assert run(main()) == stored
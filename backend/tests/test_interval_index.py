@@ -0,0 +1,77 @@
+"""
+Índice de intervalos en memoria (utils/interval_index.py).
+
+El índice responde desde el bucket ya cargado hasta que vence el TTL: una
+reserva creada por otro proceso no se ve antes, y sí después de recargar.
+"""
+
+from datetime import date, time, timedelta
+
+from database.connection import AsyncSessionLocal, SessionLocal
+from database.models import Reservation
+from utils.interval_index import ReservationIntervalIndex
+
+TTL = 30.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _reserve(user_id: int, room_id: int, day: date, start: time, end: time):
+    """Reserva escrita directamente en la base, como la haría otro worker."""
+    db = SessionLocal()
+    try:
+        db.add(Reservation(user_id=user_id, room_id=room_id, date=day, start_time=start, end_time=end))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _overlaps(index: ReservationIntervalIndex, room_id: int, day: date, start: time, end: time) -> bool:
+    async with AsyncSessionLocal() as db:
+        return await index.overlaps(db, room_id, day, start, end)
+
+
+def test_bucket_is_stale_until_ttl_expires(run, make_user, make_room):
+    user_id, room_id = make_user(), make_room()
+    day = date.today() + timedelta(days=5)
+    clock = FakeClock()
+    index = ReservationIntervalIndex(ttl=TTL, clock=clock)
+
+    assert run(_overlaps(index, room_id, day, time(10, 0), time(11, 0))) is False
+
+    _reserve(user_id, room_id, day, time(10, 0), time(11, 0))
+    clock.now += TTL - 1
+    # Bucket todavía vigente: la reserva de "otro proceso" aún no se ve
+    assert run(_overlaps(index, room_id, day, time(10, 30), time(11, 30))) is False
+
+    clock.now += 1
+    assert run(_overlaps(index, room_id, day, time(10, 30), time(11, 30))) is True
+    # Intervalos semiabiertos: terminar cuando empieza la otra no es solapamiento
+    assert run(_overlaps(index, room_id, day, time(11, 0), time(12, 0))) is False
+    assert run(_overlaps(index, room_id, day, time(9, 0), time(10, 0))) is False
+
+
+def test_add_and_invalidate(run, make_user, make_room):
+    user_id, room_id = make_user(), make_room()
+    day = date.today() + timedelta(days=6)
+    index = ReservationIntervalIndex(ttl=TTL, clock=FakeClock())
+
+    assert run(_overlaps(index, room_id, day, time(9, 0), time(10, 0))) is False
+    # add actualiza el bucket cargado sin volver a la base
+    index.add(room_id, day, time(9, 0), time(12, 0))
+    index.add(room_id, day, time(9, 30), time(10, 0))
+    # La reserva larga que empieza antes sigue cubriendo las 11:00
+    assert run(_overlaps(index, room_id, day, time(11, 0), time(11, 30))) is True
+
+    # invalidate descarta el bucket: la recarga refleja solo la base
+    index.invalidate(room_id, day)
+    assert run(_overlaps(index, room_id, day, time(11, 0), time(11, 30))) is False
+    _reserve(user_id, room_id, day, time(11, 0), time(11, 30))
+    index.invalidate()
+    assert run(_overlaps(index, room_id, day, time(11, 15), time(11, 45))) is True
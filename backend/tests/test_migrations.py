@@ -0,0 +1,107 @@
+"""
+Migraciones versionadas (database/migrations.py) sobre una base existente.
+
+Se parte del esquema original (users, rooms y reservations creadas con
+create_all, sin schema_migrations) con datos, y se comprueba que upgrade()
+lo lleva a la última versión sin perder filas y que volver a ejecutarlo no
+hace nada.
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.migrations import MIGRATIONS, current_version, upgrade
+from database.models import Reservation
+
+# Esquema de la primera versión, tal como lo creaba Base.metadata.create_all
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, "
+    "email VARCHAR(255) NOT NULL, created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE TABLE rooms (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, "
+    "library_name VARCHAR(255) NOT NULL, capacity INTEGER NOT NULL, PRIMARY KEY (id))",
+    "CREATE INDEX ix_rooms_id ON rooms (id)",
+    "CREATE TABLE reservations (id INTEGER NOT NULL, user_id INTEGER NOT NULL, room_id INTEGER NOT NULL, "
+    "date DATE NOT NULL, start_time TIME NOT NULL, end_time TIME NOT NULL, created_at DATETIME, "
+    "PRIMARY KEY (id), "
+    "CONSTRAINT uq_room_datetime UNIQUE (room_id, date, start_time, end_time), "
+    "FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE, "
+    "FOREIGN KEY(room_id) REFERENCES rooms (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_reservations_id ON reservations (id)",
+    "CREATE INDEX ix_reservations_date ON reservations (date)",
+]
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    day = (date.today() + timedelta(days=3)).isoformat()
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO users (id, name, email) VALUES (1, 'Ana', 'ana@example.com')"))
+        connection.execute(text(
+            "INSERT INTO rooms (id, name, library_name, capacity) VALUES (1, 'Sala 1', 'Biblioteca Central', 4)"
+        ))
+        for reservation_id, start, end in ((1, "09:00:00.000000", "10:00:00.000000"),
+                                           (2, "10:00:00.000000", "11:00:00.000000")):
+            connection.execute(text(
+                "INSERT INTO reservations (id, user_id, room_id, date, start_time, end_time) "
+                "VALUES (:id, 1, 1, :date, :start, :end)"
+            ), {"id": reservation_id, "date": day, "start": start, "end": end})
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_existing_database(baseline_engine):
+    applied = upgrade(baseline_engine)
+    assert [migration.version for migration in applied] == [migration.version for migration in MIGRATIONS]
+    assert current_version(baseline_engine) == MIGRATIONS[-1].version
+
+    inspector = inspect(baseline_engine)
+    tables = set(inspector.get_table_names())
+    assert {"email_outbox", "idempotency_keys", "reservations_archive", "schema_migrations"} <= tables
+    indexes = {index["name"] for index in inspector.get_indexes("reservations")}
+    assert {"ix_reservations_user_date_start", "ix_reservations_date_room_times"} <= indexes
+    assert "ix_email_outbox_status_id" in {index["name"] for index in inspector.get_indexes("email_outbox")}
+
+    day = date.today() + timedelta(days=3)
+    with Session(baseline_engine) as db:
+        # Las reservas existentes se conservan tras reconstruir la tabla
+        rows = db.query(Reservation.id, Reservation.start_time).order_by(Reservation.id).all()
+        assert rows == [(1, time(9, 0)), (2, time(10, 0))]
+
+        # La protección anti-solapamiento quedó instalada en la tabla existente
+        db.add(Reservation(user_id=1, room_id=1, date=day, start_time=time(9, 30), end_time=time(10, 30)))
+        with pytest.raises(IntegrityError):
+            db.commit()
+        db.rollback()
+
+        # Los ids borrados no se reutilizan (AUTOINCREMENT)
+        db.query(Reservation).filter(Reservation.id == 2).delete()
+        db.commit()
+        reservation = Reservation(user_id=1, room_id=1, date=day, start_time=time(12, 0), end_time=time(13, 0))
+        db.add(reservation)
+        db.commit()
+        assert reservation.id == 3
+
+    # Volver a ejecutar no aplica nada
+    assert upgrade(baseline_engine) == []
+
+
+def test_upgrade_to_target_version(baseline_engine):
+    applied = upgrade(baseline_engine, target=2)
+    assert [migration.version for migration in applied] == [1, 2]
+    assert current_version(baseline_engine) == 2
+    # create_all no agrega índices a tablas existentes: el de la versión 3 aún falta
+    indexes = {index["name"] for index in inspect(baseline_engine).get_indexes("reservations")}
+    assert "ix_reservations_user_date_start" in indexes
+    assert "ix_reservations_date_room_times" not in indexes
+
+    applied = upgrade(baseline_engine)
+    assert [migration.version for migration in applied] == [migration.version for migration in MIGRATIONS[2:]]
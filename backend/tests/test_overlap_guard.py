@@ -0,0 +1,95 @@
+"""
+Exclusión de solapamientos en la base de datos (database/overlap_guard.py)
+y reintentos de escritura (database/retry.py).
+
+El trigger rechaza una reserva que pisa otra de la misma sala aunque el
+índice en memoria no la haya visto; la API lo traduce en 409.
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from database import is_overlap_error, run_with_retry
+from database.connection import AsyncSessionLocal, SessionLocal
+from database.models import Reservation
+from database.overlap_guard import OVERLAP_TRIGGER_MESSAGE
+
+
+def _insert(user_id: int, room_id: int, day: date, start: time, end: time):
+    db = SessionLocal()
+    try:
+        db.add(Reservation(user_id=user_id, room_id=room_id, date=day, start_time=start, end_time=end))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_database_rejects_overlapping_insert(make_user, make_room):
+    user_id, room_id, other_room_id = make_user(), make_room(), make_room()
+    day = date.today() + timedelta(days=10)
+    _insert(user_id, room_id, day, time(10, 0), time(11, 0))
+
+    with pytest.raises(IntegrityError) as excinfo:
+        _insert(user_id, room_id, day, time(10, 30), time(11, 30))
+    assert is_overlap_error(excinfo.value)
+
+    # Contiguas, en otra sala o en otro día no se solapan
+    _insert(user_id, room_id, day, time(11, 0), time(12, 0))
+    _insert(user_id, other_room_id, day, time(10, 30), time(11, 30))
+    _insert(user_id, room_id, day + timedelta(days=1), time(10, 30), time(11, 30))
+
+
+def test_overlap_missed_by_index_returns_409(client, make_user, make_room):
+    user_id, room_id = make_user(), make_room()
+    day = (date.today() + timedelta(days=11)).isoformat()
+
+    def payload(start: str, end: str) -> dict:
+        return {"userId": user_id, "roomId": room_id, "date": day, "startTime": start, "endTime": end}
+
+    async def requests(http):
+        # Carga el bucket del índice con la sala libre
+        first = await http.post("/api/reservations", json=payload("08:00", "09:00"))
+        # Otro worker reserva las 10:00: el índice de este proceso no lo ve
+        _insert(user_id, room_id, date.fromisoformat(day), time(10, 0), time(11, 0))
+        second = await http.post("/api/reservations", json=payload("10:30", "11:30"))
+        # Tras el rechazo el bucket se recarga y el índice ya responde 409
+        third = await http.post("/api/reservations", json=payload("10:15", "10:45"))
+        return first, second, third
+
+    first, second, third = client(requests)
+    assert first.status_code == 201, first.text
+    assert second.status_code == 409, second.text
+    assert third.status_code == 409, third.text
+
+    db = SessionLocal()
+    try:
+        assert db.query(Reservation).filter_by(room_id=room_id).count() == 2
+    finally:
+        db.close()
+
+
+def test_run_with_retry_retries_transient_errors_only(run):
+    calls = []
+
+    async def locked_once(session):
+        calls.append("locked")
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return "ok"
+
+    async def overlap(session):
+        # Conflicto real: se propaga sin reintentar
+        calls.append("overlap")
+        raise IntegrityError("INSERT", {}, Exception(OVERLAP_TRIGGER_MESSAGE))
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            result = await run_with_retry(db, locked_once, base_delay=0)
+            with pytest.raises(IntegrityError):
+                await run_with_retry(db, overlap, base_delay=0)
+        return result
+
+    assert run(main()) == "ok"
+    assert calls == ["locked", "locked", "overlap"]
@@ -0,0 +1,75 @@
+"""
+"Mis Reservas" con historial archivado (database/archive.py).
+
+Las reservas anteriores al horizonte viven en reservations_archive: el
+listado las incluye cuando se piden datos pasados (scope=past, from o to
+anteriores al horizonte) y el listado por defecto lee solo la tabla activa.
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+
+from database.archive import archive_cutoff, archive_reservations
+from database.connection import SessionLocal, engine
+from database.models import Reservation, ReservationArchive, Room, User
+
+ARCHIVED_OFFSETS = (-200, -150, -120)
+ACTIVE_OFFSETS = (-10, 3)
+
+
+@pytest.fixture(scope="module")
+def user_id():
+    """Usuario con tres reservas ya archivadas y dos en la tabla activa."""
+    today = date.today()
+    db = SessionLocal()
+    try:
+        user = User(name="Usuario Archivo", email="archivo@example.com")
+        room = Room(name="Sala Archivo", library_name="Biblioteca Central", capacity=4)
+        db.add_all([user, room])
+        db.flush()
+        for offset in ARCHIVED_OFFSETS + ACTIVE_OFFSETS:
+            db.add(Reservation(
+                user_id=user.id, room_id=room.id, date=today + timedelta(days=offset),
+                start_time=time(10, 0), end_time=time(11, 0)
+            ))
+        db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+
+    assert archive_reservations(engine) == len(ARCHIVED_OFFSETS)
+    db = SessionLocal()
+    try:
+        assert db.query(ReservationArchive).filter_by(user_id=user_id).count() == len(ARCHIVED_OFFSETS)
+        assert db.query(Reservation).filter_by(user_id=user_id).count() == len(ACTIVE_OFFSETS)
+    finally:
+        db.close()
+    return user_id
+
+
+def _offsets(client, user_id, **params):
+    async def fetch(http):
+        response = await http.get(f"/api/users/{user_id}/reservations", params={**params, "limit": 50})
+        assert response.status_code == 200, response.text
+        return response.json()
+    today = date.today()
+    return [(date.fromisoformat(reservation["date"]) - today).days for reservation in client(fetch)]
+
+
+def test_to_before_cutoff_reads_archive(client, user_id):
+    to_date = archive_cutoff() - timedelta(days=1)
+    assert _offsets(client, user_id, to=to_date.isoformat()) == [-120, -150, -200]
+
+
+def test_from_before_cutoff_unions_archive(client, user_id):
+    from_date = date.today() - timedelta(days=160)
+    assert _offsets(client, user_id, **{"from": from_date.isoformat()}) == [3, -10, -120, -150]
+
+
+def test_past_scope_unions_archive(client, user_id):
+    assert _offsets(client, user_id, scope="past") == [-10, -120, -150, -200]
+
+
+def test_default_listing_reads_active_table_only(client, user_id):
+    assert _offsets(client, user_id) == [3, -10]
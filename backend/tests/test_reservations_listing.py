@@ -0,0 +1,81 @@
+"""
+GET /api/users/{user_id}/reservations debe resolverse con una sola consulta
+por página, sin importar cuántas reservas o salas distintas tenga el usuario.
+
+Si vuelve a aparecer un N+1 (por ejemplo, cargar la sala de cada reserva por
+separado), assert_max_queries falla con la lista de sentencias ejecutadas.
+"""
+
+from datetime import date, time, timedelta
+
+import httpx
+import pytest
+
+from database.connection import SessionLocal
+from database.models import Reservation, Room, User
+from main import app
+from utils.query_counter import assert_max_queries
+
+PAGE_SIZE = 3
+
+
+@pytest.fixture(scope="module")
+def user_id():
+    """Usuario con reservas pasadas y futuras en varias salas."""
+    today = date.today()
+    db = SessionLocal()
+    try:
+        user = User(name="Usuario Listado", email="listado@example.com")
+        rooms = [Room(name=f"Sala {i}", library_name="Biblioteca Central", capacity=4) for i in range(1, 4)]
+        db.add(user)
+        db.add_all(rooms)
+        db.flush()
+        for offset in (-20, -10, -3, 1, 2, 5, 8, 13):
+            room = rooms[offset % len(rooms)]
+            db.add(Reservation(
+                user_id=user.id, room_id=room.id, date=today + timedelta(days=offset),
+                start_time=time(10, 0), end_time=time(11, 0)
+            ))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+async def _fetch_pages(user_id: int, **params):
+    """Recorre todas las páginas verificando que cada una cuesta una sola consulta."""
+    reservations = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        cursor = None
+        while True:
+            query = {**params, "limit": PAGE_SIZE}
+            if cursor is not None:
+                query["cursor"] = cursor
+            with assert_max_queries(1, f"GET /api/users/{{id}}/reservations {query}"):
+                response = await client.get(f"/api/users/{user_id}/reservations", params=query)
+            assert response.status_code == 200, response.text
+            reservations.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return reservations
+
+
+def test_listing_all_is_one_query_per_page(run, user_id):
+    reservations = run(_fetch_pages(user_id))
+    assert len(reservations) == 8
+    dates = [reservation["date"] for reservation in reservations]
+    assert dates == sorted(dates, reverse=True)
+    assert all(reservation["room"]["name"].startswith("Sala ") for reservation in reservations)
+
+
+def test_listing_upcoming_is_one_query_per_page(run, user_id):
+    reservations = run(_fetch_pages(user_id, scope="upcoming"))
+    assert len(reservations) == 5
+    dates = [reservation["date"] for reservation in reservations]
+    assert dates == sorted(dates)
+
+
+def test_listing_past_is_one_query_per_page(run, user_id):
+    reservations = run(_fetch_pages(user_id, scope="past"))
+    assert len(reservations) == 3
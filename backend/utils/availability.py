@@ -0,0 +1,96 @@
+"""
+Mapas de bits de disponibilidad por sala y día.
+
+Un día se divide en 96 franjas de 15 minutos. La ocupación de una sala en una
+fecha se representa como un entero de Python donde el bit i indica que la
+franja i está ocupada. Combinar reservas, recortar a una ventana horaria y
+extraer los huecos libres se hace con operaciones de bits, sin recorrer franja
+por franja.
+"""
+
+from datetime import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+# Fin del día: la franja 96 no es representable como datetime.time
+END_OF_DAY = time(23, 59)
+
+
+def time_to_slot(value: time, round_up: bool = False) -> int:
+    """Convierte una hora en índice de franja (redondeando hacia abajo o arriba)."""
+    minutes = value.hour * 60 + value.minute
+    if round_up:
+        if value.second or value.microsecond:
+            minutes += 1
+        return min(SLOTS_PER_DAY, -(-minutes // SLOT_MINUTES))
+    return minutes // SLOT_MINUTES
+
+
+_SLOT_TIMES = tuple(
+    time(slot * SLOT_MINUTES // 60, slot * SLOT_MINUTES % 60) for slot in range(SLOTS_PER_DAY)
+) + (END_OF_DAY,)
+
+
+def slot_to_time(slot: int) -> time:
+    """Convierte un índice de franja en la hora en que empieza."""
+    return _SLOT_TIMES[min(slot, SLOTS_PER_DAY)]
+
+
+@lru_cache(maxsize=4096)
+def range_mask(start: time, end: time) -> int:
+    """Máscara con las franjas que toca el intervalo [start, end)."""
+    first = time_to_slot(start)
+    last = time_to_slot(end, round_up=True)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def build_busy_masks(rows: Iterable[Tuple[int, time, time]]) -> Dict[int, int]:
+    """Agrupa filas (room_id, start_time, end_time) en una máscara de ocupación por sala."""
+    busy: Dict[int, int] = {}
+    for room_id, start, end in rows:
+        busy[room_id] = busy.get(room_id, 0) | range_mask(start, end)
+    return busy
+
+
+def free_runs(mask: int) -> List[Tuple[int, int]]:
+    """
+    Devuelve los tramos de bits a 1 como pares (franja_inicio, franja_fin).
+
+    Cada iteración aísla el bit más bajo del tramo (mask & -mask) y le suma
+    ese bit a la máscara: el acarreo recorre el tramo completo y deja un único
+    bit justo después de su final. El costo es proporcional a la cantidad de
+    tramos, no a la cantidad de franjas.
+    """
+    runs = []
+    while mask:
+        lowest = mask & -mask
+        start = lowest.bit_length() - 1
+        carried = mask + lowest
+        end = (carried & -carried).bit_length() - 1
+        runs.append((start, end))
+        mask &= carried
+    return runs
+
+
+def free_windows(busy: int, window: int) -> List[Tuple[int, int]]:
+    """Tramos libres de una sala dentro de la máscara de ventana."""
+    return free_runs(window & ~busy)
+
+
+def free_window_times(free: int, from_time: time = None, to_time: time = None) -> List[Tuple[time, time]]:
+    """Tramos libres como horas, recortados a la ventana [from_time, to_time]."""
+    windows = []
+    for start, end in free_runs(free):
+        start_time, end_time = _SLOT_TIMES[start], _SLOT_TIMES[end]
+        if from_time is not None and start_time < from_time:
+            start_time = from_time
+        if to_time is not None and end_time > to_time:
+            end_time = to_time
+        windows.append((start_time, end_time))
+    return windows
@@ -0,0 +1,237 @@
+"""
+Disponibilidad en vivo: difusión de cambios de horarios por Server-Sent Events.
+
+La página de búsqueda se suscribe a una biblioteca y una fecha
+(GET /api/rooms/availability/stream) y recibe primero el estado completo y
+después solo los cambios, a medida que ocurren en este proceso:
+
+    reserved  Se creó una reserva en ese horario
+    held      Otro usuario retuvo el horario (POST /api/holds)
+    free      Se liberó o venció una retención
+
+Cada conexión es una única corrutina que espera en su propia cola: no hay
+consultas periódicas a la base de datos por cliente. Al publicar, el evento
+se codifica una sola vez y se encola (sin esperar) en la cola de cada
+suscriptor de esa biblioteca y fecha. Si un cliente lento llena su cola
+(AVAILABILITY_STREAM_QUEUE_SIZE eventos) se le envía "resync" y se cierra su
+conexión: EventSource reconecta solo y recibe un estado completo nuevo.
+
+El hub vive en cada worker: con varios workers, un cliente solo ve en vivo
+los cambios hechos a través de su mismo proceso. El estado inicial siempre
+sale de la base de datos.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import date, time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from utils.holds import Hold, slot_holds
+from utils.metrics import registry, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_STREAM_MAX_SUBSCRIBERS = int(os.getenv("AVAILABILITY_STREAM_MAX_SUBSCRIBERS", "5000"))
+AVAILABILITY_STREAM_QUEUE_SIZE = int(os.getenv("AVAILABILITY_STREAM_QUEUE_SIZE", "100"))
+AVAILABILITY_STREAM_HEARTBEAT = float(os.getenv("AVAILABILITY_STREAM_HEARTBEAT", "15"))
+# Cada cuánto se barren las retenciones vencidas para notificarlas
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "1"))
+
+Topic = Tuple[str, date]
+
+availability_stream_subscribers = registry.register(Gauge(
+    "availability_stream_subscribers", "Conexiones abiertas de disponibilidad en vivo"
+))
+availability_stream_events_total = registry.register(Counter(
+    "availability_stream_events_total", "Eventos de disponibilidad publicados por estado", ("state",)
+))
+availability_stream_resyncs_total = registry.register(Counter(
+    "availability_stream_resyncs_total", "Suscriptores desconectados por llenar su cola"
+))
+
+# Marca en la cola de un suscriptor que se quedó atrás
+_RESYNC = None
+
+
+def sse_frame(event: str, data) -> bytes:
+    """Codifica un evento en formato text/event-stream."""
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class HubFull(Exception):
+    """Se alcanzó AVAILABILITY_STREAM_MAX_SUBSCRIBERS."""
+
+
+class Subscription:
+    """Una conexión suscrita a (biblioteca, fecha)."""
+
+    __slots__ = ("topic", "queue")
+
+    def __init__(self, topic: Topic, queue_size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+
+class AvailabilityHub:
+    """Reparte los cambios de disponibilidad entre las conexiones suscritas."""
+
+    def __init__(self, max_subscribers: int = AVAILABILITY_STREAM_MAX_SUBSCRIBERS,
+                 queue_size: int = AVAILABILITY_STREAM_QUEUE_SIZE):
+        self._max_subscribers = max_subscribers
+        self._queue_size = queue_size
+        self._topics: Dict[Topic, Set[Subscription]] = {}
+        self._count = 0
+        # Sala -> biblioteca, de las bibliotecas con alguna suscripción
+        self._room_library: Dict[int, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self.published = 0
+        self.resyncs = 0
+
+    # ============ SUSCRIPCIONES ============
+
+    def subscribe(self, library_name: str, day: date, room_ids: Iterable[int]) -> Subscription:
+        """
+        Suscribe una conexión a los cambios de las salas de la biblioteca en esa fecha.
+
+        Raises:
+            HubFull: Si ya hay AVAILABILITY_STREAM_MAX_SUBSCRIBERS conexiones
+        """
+        if self._count >= self._max_subscribers:
+            raise HubFull()
+        self._loop = asyncio.get_running_loop()
+
+        for room_id in room_ids:
+            self._room_library[room_id] = library_name
+        subscription = Subscription((library_name, day), self._queue_size)
+        self._topics.setdefault(subscription.topic, set()).add(subscription)
+        self._count += 1
+        availability_stream_subscribers.set(self._count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._topics.get(subscription.topic)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._topics[subscription.topic]
+        self._count -= 1
+        availability_stream_subscribers.set(self._count)
+
+    # ============ PUBLICACIÓN ============
+
+    def publish_slot(self, room_id: int, day: date, start: time, end: time, state: str):
+        """Difunde el nuevo estado de un horario de una sala. No bloquea."""
+        library_name = self._room_library.get(room_id)
+        if library_name is None:
+            # Nadie se suscribió nunca a la biblioteca de esta sala
+            return
+
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is not None and running is not loop:
+            # Publicado desde otro hilo: las colas solo se tocan desde su event loop
+            loop.call_soon_threadsafe(self.publish_slot, room_id, day, start, end, state)
+            return
+
+        subscribers = self._topics.get((library_name, day))
+        if not subscribers:
+            return
+
+        frame = sse_frame("slot", {
+            "roomId": room_id,
+            "date": day.isoformat(),
+            "startTime": start.isoformat(),
+            "endTime": end.isoformat(),
+            "state": state,
+        })
+        self.published += 1
+        availability_stream_events_total.inc(state)
+
+        for subscription in subscribers:
+            queue = subscription.queue
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Cliente lento: se descartan sus eventos y se le pide resincronizar
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+                self.resyncs += 1
+                availability_stream_resyncs_total.inc()
+
+    def _on_hold(self, event: str, hold: Hold):
+        if event == "converted":
+            # La reserva que la reemplaza ya se publica como "reserved"
+            return
+        self.publish_slot(
+            hold.room_id, hold.date, hold.start_time, hold.end_time,
+            "held" if event == "held" else "free"
+        )
+
+    # ============ CONEXIONES ============
+
+    async def stream(self, subscription: Subscription, snapshot: bytes,
+                     heartbeat: float = AVAILABILITY_STREAM_HEARTBEAT):
+        """
+        Cuerpo de la respuesta text/event-stream de una suscripción.
+
+        Envía el estado inicial, luego los eventos de la cola y un comentario
+        cada `heartbeat` segundos para que proxies y balanceadores no cierren
+        la conexión inactiva. Al desconectarse el cliente, Starlette cancela
+        el generador y la suscripción se da de baja.
+        """
+        try:
+            yield b"retry: 3000\n" + snapshot
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if frame is _RESYNC:
+                    yield sse_frame("resync", {})
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    # ============ CICLO DE VIDA ============
+
+    async def start(self, sweep_interval: float = HOLD_SWEEP_INTERVAL):
+        """Barre periódicamente las retenciones vencidas para avisar a tiempo que se liberaron."""
+        self._loop = asyncio.get_running_loop()
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_holds(sweep_interval), name="hold-sweeper")
+
+    async def _sweep_holds(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            slot_holds.sweep()
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "topics": len(self._topics),
+            "maxSubscribers": self._max_subscribers,
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+# Hub compartido por todas las conexiones del proceso
+availability_hub = AvailabilityHub()
+slot_holds.add_listener(availability_hub._on_hold)
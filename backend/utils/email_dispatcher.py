@@ -0,0 +1,205 @@
+"""
+Cola en memoria, acotada, para enviar emails en segundo plano desde la API.
+
+Cuando la cola de RabbitMQ no está habilitada, create_reservation entrega el
+email a este despachador y responde sin esperar al servidor SMTP. Un número
+fijo de tareas asyncio (EMAIL_DISPATCH_CONCURRENCY) consume la cola y envía
+con el pool de conexiones de utils/smtp_pool.py.
+
+Si la cola está llena se aplica EMAIL_DISPATCH_OVERFLOW:
+
+    reject       No se encola el email nuevo (por defecto)
+    drop_oldest  Se descarta el email más antiguo de la cola para hacer lugar
+    block        Se espera hasta EMAIL_DISPATCH_BLOCK_TIMEOUT segundos a que
+                 haya lugar (backpressure sobre la petición) y luego se rechaza
+
+Al apagar la API, stop() espera hasta EMAIL_DISPATCH_DRAIN_TIMEOUT segundos a
+que se vacíe la cola. Los emails que no alcanzan a enviarse se pierden: esta
+cola no es persistente (para entrega garantizada usar EMAIL_QUEUE_ENABLED).
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+
+from utils.email_service import render_email_task
+from utils.metrics import email_queue_publish_total
+
+logger = logging.getLogger(__name__)
+
+EMAIL_DISPATCH_QUEUE_SIZE = int(os.getenv("EMAIL_DISPATCH_QUEUE_SIZE", "1000"))
+EMAIL_DISPATCH_CONCURRENCY = int(os.getenv("EMAIL_DISPATCH_CONCURRENCY", "4"))
+EMAIL_DISPATCH_OVERFLOW = os.getenv("EMAIL_DISPATCH_OVERFLOW", "reject")
+EMAIL_DISPATCH_BLOCK_TIMEOUT = float(os.getenv("EMAIL_DISPATCH_BLOCK_TIMEOUT", "0.1"))
+EMAIL_DISPATCH_DRAIN_TIMEOUT = float(os.getenv("EMAIL_DISPATCH_DRAIN_TIMEOUT", "10"))
+
+OVERFLOW_POLICIES = ("reject", "drop_oldest", "block")
+
+SendFunction = Callable[[dict], Awaitable[None]]
+
+
+class EmailDispatcher:
+    """
+    Despachador de emails con cola acotada y concurrencia limitada.
+
+    Los emails son tareas con el mismo formato que las del outbox y
+    RabbitMQ (ver render_email_task).
+    """
+
+    def __init__(
+        self,
+        send: Optional[SendFunction] = None,
+        max_size: int = EMAIL_DISPATCH_QUEUE_SIZE,
+        concurrency: int = EMAIL_DISPATCH_CONCURRENCY,
+        overflow: str = EMAIL_DISPATCH_OVERFLOW,
+        block_timeout: float = EMAIL_DISPATCH_BLOCK_TIMEOUT
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow desconocida: {overflow}")
+
+        self._send = send or self._send_smtp
+        self._max_size = max_size
+        self._concurrency = concurrency
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._smtp_pool = None
+        self._closing = False
+        self._in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """Crea la cola y las tareas de envío en el event loop actual."""
+        loop = asyncio.get_running_loop()
+        if self.running and self._loop is loop:
+            return
+        self._loop = loop
+        self._smtp_pool = None
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self._max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"email-dispatch-{i}")
+            for i in range(self._concurrency)
+        ]
+
+    async def submit(self, email: dict) -> bool:
+        """
+        Encola un email para enviarlo en segundo plano.
+
+        Returns:
+            bool: True si el email quedó encolado, False si se rechazó
+        """
+        if self._closing:
+            self.rejected += 1
+            email_queue_publish_total.inc("dispatcher", "rejected")
+            return False
+        if not self.running or self._loop is not asyncio.get_running_loop():
+            # Sin lifespan (p. ej. tests o benchmarks, con un event loop por
+            # petición): arrancar bajo demanda en el loop actual
+            await self.start()
+
+        try:
+            self._queue.put_nowait(email)
+            email_queue_publish_total.inc("dispatcher", "success")
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self._overflow == "drop_oldest":
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self._queue.put_nowait(email)
+            self.dropped += 1
+            email_queue_publish_total.inc("dispatcher", "dropped_oldest")
+            logger.warning("Email dispatch queue full: dropped oldest email")
+            return True
+
+        if self._overflow == "block":
+            try:
+                await asyncio.wait_for(self._queue.put(email), self._block_timeout)
+                email_queue_publish_total.inc("dispatcher", "success")
+                return True
+            except asyncio.TimeoutError:
+                pass
+
+        self.rejected += 1
+        email_queue_publish_total.inc("dispatcher", "rejected")
+        logger.warning("Email dispatch queue full: email rejected")
+        return False
+
+    async def _worker(self):
+        while True:
+            email = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._send(email)
+                self.sent += 1
+                logger.info(f"Email de confirmación enviado a {email.get('user_email')}")
+            except Exception as e:
+                # La reserva ya está guardada: solo se registra el fallo
+                self.failed += 1
+                logger.error(f"Error al enviar email de confirmación: {str(e)}")
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    async def _send_smtp(self, email: dict):
+        if self._smtp_pool is None:
+            # Import diferido: get_smtp_settings falla si no hay configuración
+            from utils.smtp_pool import SMTPConnectionPool
+            self._smtp_pool = SMTPConnectionPool()
+
+        settings = self._smtp_pool.settings
+        message = render_email_task(email, settings["from_email"], settings["from_name"])
+        await self._smtp_pool.send(message)
+
+    async def stop(self, timeout: float = EMAIL_DISPATCH_DRAIN_TIMEOUT):
+        """Deja de aceptar emails, espera a que se vacíe la cola y detiene las tareas."""
+        if not self.running:
+            return
+        self._closing = True
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Email dispatch queue not drained after {timeout}s: "
+                f"{self._queue.qsize() + self._in_flight} emails lost"
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._smtp_pool is not None:
+            await self._smtp_pool.close()
+            self._smtp_pool = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "overflowPolicy": self._overflow,
+            "maxSize": self._max_size,
+            "concurrency": self._concurrency,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "inFlight": self._in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+        }
+
+
+# Despachador compartido por todas las peticiones del proceso
+email_dispatcher = EmailDispatcher()
@@ -1,16 +1,224 @@
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import date, time
+from datetime import date, datetime, time
+from functools import lru_cache
+from html import escape
+from typing import Iterable, Tuple
 import os
 from dotenv import load_dotenv
 import logging
 
+from utils.email_templates import RenderedEmail, get_template
+from utils.metrics import email_smtp_send_total
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def get_smtp_settings() -> dict:
+    """
+    Lee la configuración SMTP desde variables de entorno (una sola vez por
+    proceso; si está incompleta no se guarda y se vuelve a leer).
+    
+    Raises:
+        Exception: Si la configuración está incompleta
+    """
+    settings = {
+        "host": os.getenv("SMTP_HOST"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "username": os.getenv("SMTP_USERNAME"),
+        "password": os.getenv("SMTP_PASSWORD"),
+        "from_email": os.getenv("SMTP_FROM_EMAIL"),
+        "from_name": os.getenv("SMTP_FROM_NAME", "BiblioReservas"),
+    }
+    
+    # Validar que existan las variables de entorno
+    if not all([settings["host"], settings["username"], settings["password"], settings["from_email"]]):
+        logger.warning("Configuración SMTP incompleta. Email no enviado.")
+        raise Exception("Configuración SMTP no disponible")
+    
+    return settings
+
+
+def format_reservation_fields(
+    user_name: str,
+    room_name: str,
+    library_name: str,
+    reservation_date: date,
+    start_time: time,
+    end_time: time,
+    reservation_id: int
+) -> dict:
+    """Campos de las plantillas de reserva, con la fecha y el horario formateados."""
+    return {
+        "user_name": user_name,
+        "room_name": room_name,
+        "library_name": library_name,
+        "date": reservation_date.strftime("%d/%m/%Y"),
+        "start_time": start_time.strftime("%H:%M"),
+        "end_time": end_time.strftime("%H:%M"),
+        "reservation_id": reservation_id,
+    }
+
+
+def render_reservation_email(
+    user_email: str,
+    user_name: str,
+    room_name: str,
+    library_name: str,
+    reservation_date: date,
+    start_time: time,
+    end_time: time,
+    reservation_id: int,
+    from_email: str,
+    from_name: str,
+    template: str = "reservation_confirmation"
+) -> RenderedEmail:
+    """Renderiza un email de reserva (confirmación, cancelación, recordatorio) listo para enviar."""
+    fields = format_reservation_fields(
+        user_name, room_name, library_name, reservation_date, start_time, end_time, reservation_id
+    )
+    return get_template(template).render(user_email, from_email, from_name, fields)
+
+
+def render_reservation_batch_email(
+    user_email: str,
+    user_name: str,
+    room_name: str,
+    library_name: str,
+    occurrences: Iterable[Tuple[date, time, time, int]],
+    from_email: str,
+    from_name: str
+) -> RenderedEmail:
+    """Renderiza el resumen de una reserva múltiple: un solo email con todas las fechas."""
+    lines = [
+        (
+            reservation_date.strftime("%d/%m/%Y"),
+            start_time.strftime("%H:%M"),
+            end_time.strftime("%H:%M"),
+            reservation_id
+        )
+        for reservation_date, start_time, end_time, reservation_id in occurrences
+    ]
+    fields = {
+        "user_name": user_name,
+        "room_name": room_name,
+        "library_name": library_name,
+        "count": len(lines),
+        "occurrences_text": "\n".join(
+            f"{day}  {start} - {end}  (#{reservation_id})" for day, start, end, reservation_id in lines
+        ),
+        "occurrences_html": "\n".join(
+            f'                <div class="detail-row"><span class="label">{escape(day)}</span> '
+            f'<span class="value">{escape(start)} - {escape(end)} (#{reservation_id})</span></div>'
+            for day, start, end, reservation_id in lines
+        ),
+    }
+    return get_template("reservation_batch_summary").render(user_email, from_email, from_name, fields)
+
+
+def parse_date(date_str: str) -> date:
+    """Parsea una fecha en formato ISO"""
+    return datetime.fromisoformat(date_str).date()
+
+
+def parse_time(time_str: str) -> time:
+    """Parsea una hora en formato HH:MM o HH:MM:SS"""
+    if 'T' in time_str:  # Si viene como datetime completo
+        return datetime.fromisoformat(time_str).time()
+    # Manejar formato HH:MM o HH:MM:SS
+    parts = time_str.split(':')
+    hour = int(parts[0])
+    minute = int(parts[1])
+    second = int(parts[2]) if len(parts) > 2 else 0
+    return time(hour, minute, second)
+
+
+def render_email_task(email_data: dict, from_email: str, from_name: str) -> RenderedEmail:
+    """
+    Renderiza una tarea de email serializada (outbox, RabbitMQ o cola en
+    memoria). El campo `template` elige la plantilla; por defecto es la
+    confirmación de una reserva.
+    
+    Raises:
+        KeyError, ValueError: Si la tarea tiene datos faltantes o inválidos
+    """
+    template = email_data.get('template', 'reservation_confirmation')
+    
+    if template == 'reservation_batch_summary':
+        return render_reservation_batch_email(
+            user_email=email_data['user_email'],
+            user_name=email_data['user_name'],
+            room_name=email_data['room_name'],
+            library_name=email_data['library_name'],
+            occurrences=[
+                (parse_date(day), parse_time(start), parse_time(end), int(reservation_id))
+                for day, start, end, reservation_id in email_data['occurrences']
+            ],
+            from_email=from_email,
+            from_name=from_name
+        )
+    
+    return render_reservation_email(
+        user_email=email_data['user_email'],
+        user_name=email_data['user_name'],
+        room_name=email_data['room_name'],
+        library_name=email_data['library_name'],
+        reservation_date=parse_date(email_data['reservation_date']),
+        start_time=parse_time(email_data['start_time']),
+        end_time=parse_time(email_data['end_time']),
+        reservation_id=email_data['reservation_id'],
+        from_email=from_email,
+        from_name=from_name,
+        template=template
+    )
+
+
+def send_rendered_email(message: RenderedEmail, settings: dict):
+    """
+    Envía un mensaje ya renderizado abriendo una conexión SMTP (síncrono).
+    
+    Raises:
+        Exception: Si falla el envío del email
+    """
+    try:
+        import smtplib
+        
+        with smtplib.SMTP(settings["host"], settings["port"]) as server:
+            server.starttls()
+            server.login(settings["username"], settings["password"])
+            server.sendmail(message.sender, message.recipients, message.data)
+            
+        email_smtp_send_total.inc("smtplib", "success")
+        logger.info(f"Email enviado exitosamente a {', '.join(message.recipients)}")
+        
+    except Exception as e:
+        rejected = isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+        email_smtp_send_total.inc("smtplib", "rejected" if rejected else "failure")
+        logger.error(f"Error al enviar email: {str(e)}")
+        # La causa se conserva para is_permanent_smtp_error
+        raise Exception(f"Error al enviar email: {str(e)}") from e
+
+
+def is_permanent_smtp_error(error: BaseException) -> bool:
+    """
+    Indica si el servidor SMTP rechazó el envío con un código 5xx (smtplib o aiosmtplib).
+    
+    Un rechazo permanente no cambia al reintentar. Se recorre la cadena de
+    causas: send_rendered_email envuelve el error original.
+    """
+    import smtplib
+    import aiosmtplib
+    
+    while error is not None:
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code >= 500
+        if isinstance(error, aiosmtplib.SMTPResponseException):
+            return error.code >= 500
+        error = error.__cause__
+    return False
+
+
 def send_reservation_confirmation_email(
     user_email: str,
     user_name: str,
@@ -47,137 +255,20 @@ def send_reservation_confirmation_email(
     """
     
     # Obtener configuración de SMTP desde variables de entorno
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    from_email = os.getenv("SMTP_FROM_EMAIL")
-    from_name = os.getenv("SMTP_FROM_NAME", "BiblioReservas")
+    settings = get_smtp_settings()
     
-    # Validar que existan las variables de entorno
-    if not all([smtp_host, smtp_username, smtp_password, from_email]):
-        logger.warning("Configuración SMTP incompleta. Email no enviado.")
-        raise Exception("Configuración SMTP no disponible")
-    
-    # Formatear fecha y hora para el email
-    formatted_date = reservation_date.strftime("%d/%m/%Y")
-    formatted_start = start_time.strftime("%H:%M")
-    formatted_end = end_time.strftime("%H:%M")
-    
-    # Crear el mensaje
-    message = MIMEMultipart("alternative")
-    message["Subject"] = "Confirmación de Reserva de Sala - BiblioReservas"
-    message["From"] = f"{from_name} <{from_email}>"
-    message["To"] = user_email
-    
-    # Contenido en texto plano
-    text_content = f"""
-Hola {user_name},
-
-Tu reserva ha sido confirmada exitosamente.
-
-DETALLES DE LA RESERVA:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-ID de Reserva: #{reservation_id}
-Biblioteca: {library_name}
-Sala: {room_name}
-Fecha: {formatted_date}
-Horario: {formatted_start} - {formatted_end}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-Por favor, llega puntualmente a tu reserva.
-
-Si necesitas cancelar tu reserva, puedes hacerlo desde la sección "Mis Reservas" en la plataforma.
-
-Gracias por usar BiblioReservas.
-
-Saludos,
-El equipo de BiblioReservas
-"""
+    message = render_reservation_email(
+        user_email=user_email,
+        user_name=user_name,
+        room_name=room_name,
+        library_name=library_name,
+        reservation_date=reservation_date,
+        start_time=start_time,
+        end_time=end_time,
+        reservation_id=reservation_id,
+        from_email=settings["from_email"],
+        from_name=settings["from_name"]
+    )
     
-    # Contenido en HTML
-    html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #2563eb; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-        .content {{ background-color: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; }}
-        .details-box {{ background-color: white; padding: 20px; margin: 20px 0; border-left: 4px solid #2563eb; border-radius: 4px; }}
-        .detail-row {{ padding: 8px 0; border-bottom: 1px solid #e5e7eb; }}
-        .detail-row:last-child {{ border-bottom: none; }}
-        .label {{ font-weight: bold; color: #374151; }}
-        .value {{ color: #1f2937; }}
-        .footer {{ text-align: center; padding: 20px; color: #6b7280; font-size: 12px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>✓ Reserva Confirmada</h1>
-        </div>
-        <div class="content">
-            <p>Hola <strong>{user_name}</strong>,</p>
-            <p>Tu reserva ha sido confirmada exitosamente.</p>
-            
-            <div class="details-box">
-                <h3 style="margin-top: 0; color: #2563eb;">Detalles de la Reserva</h3>
-                <div class="detail-row">
-                    <span class="label">ID de Reserva:</span>
-                    <span class="value">#{reservation_id}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="label">Biblioteca:</span>
-                    <span class="value">{library_name}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="label">Sala:</span>
-                    <span class="value">{room_name}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="label">Fecha:</span>
-                    <span class="value">{formatted_date}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="label">Horario:</span>
-                    <span class="value">{formatted_start} - {formatted_end}</span>
-                </div>
-            </div>
-            
-            <p>Por favor, llega puntualmente a tu reserva.</p>
-            <p>Si necesitas cancelar tu reserva, puedes hacerlo desde la sección <strong>"Mis Reservas"</strong> en la plataforma.</p>
-            
-            <p style="margin-top: 30px;">Gracias por usar BiblioReservas.</p>
-        </div>
-        <div class="footer">
-            <p>Este es un email automático, por favor no respondas a este mensaje.</p>
-            <p>&copy; 2025 BiblioReservas - Sistema de Reservas de Salas</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    # Adjuntar ambas versiones del mensaje
-    part1 = MIMEText(text_content, "plain")
-    part2 = MIMEText(html_content, "html")
-    message.attach(part1)
-    message.attach(part2)
-    
-    try:
-        # Enviar el email de forma síncrona (para simplificar)
-        import smtplib
-        
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.send_message(message)
-            
-        logger.info(f"Email enviado exitosamente a {user_email}")
-        
-    except Exception as e:
-        logger.error(f"Error al enviar email: {str(e)}")
-        raise Exception(f"Error al enviar email: {str(e)}")
+    # Enviar el email de forma síncrona (para simplificar)
+    send_rendered_email(message, settings)
@@ -0,0 +1,364 @@
+"""
+Plantillas de email precompiladas.
+
+Cada plantilla (asunto, texto plano y HTML) se compila una sola vez, al
+importar el módulo: el texto se divide en partes estáticas, ya codificadas en
+UTF-8, y los campos variables ({{ nombre }}). Renderizar solo escapa y codifica
+los campos, une los bytes y arma el mensaje MIME completo a partir de
+cabeceras y separadores también precalculados, sin crear objetos
+email.mime ni pasar por email.generator.
+
+El resultado (RenderedEmail) se envía tal cual con smtplib/aiosmtplib
+sendmail().
+
+Para agregar una plantilla basta con registrarla en TEMPLATES con
+register_template(); el layout HTML (cabecera, estilos y pie) es común a todas.
+"""
+
+import re
+from base64 import encodebytes
+from email.header import Header
+from email.utils import formataddr
+from functools import lru_cache
+from html import escape
+from typing import Dict, List, NamedTuple, Sequence
+
+_FIELD = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+CRLF = b"\r\n"
+
+
+class RenderedEmail(NamedTuple):
+    """Mensaje listo para enviar con sendmail()."""
+    sender: str
+    recipients: Sequence[str]
+    data: bytes
+
+
+class CompiledText:
+    """
+    Texto con campos {{ nombre }} dividido en partes estáticas y variables.
+
+    Con escape_html, los valores se escapan salvo los campos terminados en
+    _html, que ya vienen armados (y escapados) por quien renderiza.
+    """
+
+    __slots__ = ("static", "fields", "escaped")
+
+    def __init__(self, source: str, escape_html: bool = False):
+        self.static: List[bytes] = []
+        self.fields: List[str] = []
+        self.escaped: List[bool] = []
+
+        position = 0
+        for match in _FIELD.finditer(source):
+            name = match.group(1)
+            self.static.append(source[position:match.start()].encode("utf-8"))
+            self.fields.append(name)
+            self.escaped.append(escape_html and not name.endswith("_html"))
+            position = match.end()
+        self.static.append(source[position:].encode("utf-8"))
+
+    def render(self, values: Dict[str, object]) -> bytes:
+        """
+        Raises:
+            KeyError: Si falta algún campo
+        """
+        static = self.static
+        escaped = self.escaped
+        parts = [static[0]]
+        for index, name in enumerate(self.fields, 1):
+            value = str(values[name])
+            if escaped[index - 1]:
+                value = escape(value)
+            parts.append(value.encode("utf-8"))
+            parts.append(static[index])
+        return b"".join(parts)
+
+
+def _base64_body(data: bytes) -> bytes:
+    # Líneas de 76 caracteres terminadas en CRLF, como exige SMTP
+    return encodebytes(data).replace(b"\n", CRLF)
+
+
+@lru_cache(maxsize=64)
+def _encode_header(value: str) -> bytes:
+    try:
+        return value.encode("ascii")
+    except UnicodeEncodeError:
+        return Header(value, "utf-8").encode().encode("ascii")
+
+
+@lru_cache(maxsize=16)
+def _from_header(from_name: str, from_email: str) -> bytes:
+    return formataddr((from_name, from_email)).encode("ascii")
+
+
+class EmailTemplate:
+    """Plantilla compilada: asunto + versión en texto plano + versión HTML."""
+
+    def __init__(self, name: str, subject: str, text: str, html: str):
+        self.name = name
+        self.subject = CompiledText(subject)
+        self.text = CompiledText(text)
+        self.html = CompiledText(html, escape_html=True)
+
+        # El separador solo tiene que no aparecer en el cuerpo: como las
+        # partes van en base64, basta con que contenga caracteres fuera de
+        # ese alfabeto
+        boundary = f"==biblioreservas-{name}=="
+        self._content_type = (
+            b'Content-Type: multipart/alternative; boundary="' + boundary.encode("ascii") + b'"' + CRLF
+            + b"MIME-Version: 1.0" + CRLF
+        )
+        part_headers = CRLF.join((
+            b"MIME-Version: 1.0",
+            b"Content-Transfer-Encoding: base64",
+            b"",
+            b"",
+        ))
+        self._text_open = (
+            b"--" + boundary.encode("ascii") + CRLF
+            + b'Content-Type: text/plain; charset="utf-8"' + CRLF + part_headers
+        )
+        self._html_open = (
+            b"--" + boundary.encode("ascii") + CRLF
+            + b'Content-Type: text/html; charset="utf-8"' + CRLF + part_headers
+        )
+        self._close = b"--" + boundary.encode("ascii") + b"--" + CRLF
+        self._static_subject = None if self.subject.fields else _encode_header(subject)
+
+    def render(self, to: str, from_email: str, from_name: str, values: Dict[str, object]) -> RenderedEmail:
+        """
+        Renderiza el mensaje completo.
+
+        Raises:
+            KeyError: Si falta algún campo de la plantilla
+        """
+        subject = self._static_subject
+        if subject is None:
+            subject = _encode_header(self.subject.render(values).decode("utf-8"))
+
+        data = b"".join((
+            self._content_type,
+            b"Subject: ", subject, CRLF,
+            b"From: ", _from_header(from_name, from_email), CRLF,
+            b"To: ", _encode_header(to), CRLF,
+            CRLF,
+            self._text_open, _base64_body(self.text.render(values)), CRLF,
+            self._html_open, _base64_body(self.html.render(values)), CRLF,
+            self._close,
+        ))
+        return RenderedEmail(from_email, [to], data)
+
+
+# ============ LAYOUT ============
+
+_HTML_LAYOUT = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background-color: %(color)s; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+        .content { background-color: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; }
+        .details-box { background-color: white; padding: 20px; margin: 20px 0; border-left: 4px solid %(color)s; border-radius: 4px; }
+        .detail-row { padding: 8px 0; border-bottom: 1px solid #e5e7eb; }
+        .detail-row:last-child { border-bottom: none; }
+        .label { font-weight: bold; color: #374151; }
+        .value { color: #1f2937; }
+        .footer { text-align: center; padding: 20px; color: #6b7280; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>%(title)s</h1>
+        </div>
+        <div class="content">
+%(content)s
+        </div>
+        <div class="footer">
+            <p>Este es un email automático, por favor no respondas a este mensaje.</p>
+            <p>&copy; 2025 BiblioReservas - Sistema de Reservas de Salas</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+_RESERVATION_DETAILS_HTML = """
+            <div class="details-box">
+                <h3 style="margin-top: 0; color: %(color)s;">Detalles de la Reserva</h3>
+                <div class="detail-row">
+                    <span class="label">ID de Reserva:</span>
+                    <span class="value">#{{ reservation_id }}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="label">Biblioteca:</span>
+                    <span class="value">{{ library_name }}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="label">Sala:</span>
+                    <span class="value">{{ room_name }}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="label">Fecha:</span>
+                    <span class="value">{{ date }}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="label">Horario:</span>
+                    <span class="value">{{ start_time }} - {{ end_time }}</span>
+                </div>
+            </div>
+"""
+
+_RESERVATION_DETAILS_TEXT = """DETALLES DE LA RESERVA:
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ID de Reserva: #{{ reservation_id }}
+Biblioteca: {{ library_name }}
+Sala: {{ room_name }}
+Fecha: {{ date }}
+Horario: {{ start_time }} - {{ end_time }}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"""
+
+
+def html_layout(title: str, content: str, color: str = "#2563eb") -> str:
+    """Inserta el contenido en el layout común (cabecera, estilos y pie)."""
+    content = content.replace("%(details)s", _RESERVATION_DETAILS_HTML) % {"color": color}
+    return _HTML_LAYOUT % {"title": title, "content": content, "color": color}
+
+
+def text_body(content: str) -> str:
+    return content.replace("%(details)s", _RESERVATION_DETAILS_TEXT)
+
+
+# ============ PLANTILLAS ============
+
+TEMPLATES: Dict[str, EmailTemplate] = {}
+
+
+def register_template(name: str, subject: str, text: str, html: str) -> EmailTemplate:
+    """Compila y registra una plantilla."""
+    template = EmailTemplate(name, subject, text, html)
+    TEMPLATES[name] = template
+    return template
+
+
+def get_template(name: str) -> EmailTemplate:
+    """
+    Raises:
+        KeyError: Si la plantilla no existe
+    """
+    return TEMPLATES[name]
+
+
+register_template(
+    "reservation_confirmation",
+    subject="Confirmación de Reserva de Sala - BiblioReservas",
+    text=text_body("""
+Hola {{ user_name }},
+
+Tu reserva ha sido confirmada exitosamente.
+
+%(details)s
+
+Por favor, llega puntualmente a tu reserva.
+
+Si necesitas cancelar tu reserva, puedes hacerlo desde la sección "Mis Reservas" en la plataforma.
+
+Gracias por usar BiblioReservas.
+
+Saludos,
+El equipo de BiblioReservas
+"""),
+    html=html_layout("✓ Reserva Confirmada", """
+            <p>Hola <strong>{{ user_name }}</strong>,</p>
+            <p>Tu reserva ha sido confirmada exitosamente.</p>
+%(details)s
+            <p>Por favor, llega puntualmente a tu reserva.</p>
+            <p>Si necesitas cancelar tu reserva, puedes hacerlo desde la sección <strong>"Mis Reservas"</strong> en la plataforma.</p>
+
+            <p style="margin-top: 30px;">Gracias por usar BiblioReservas.</p>""")
+)
+
+register_template(
+    "reservation_cancellation",
+    subject="Reserva de Sala Cancelada - BiblioReservas",
+    text=text_body("""
+Hola {{ user_name }},
+
+Tu reserva fue cancelada.
+
+%(details)s
+
+Si no solicitaste esta cancelación, puedes volver a reservar la sala desde la plataforma.
+
+Saludos,
+El equipo de BiblioReservas
+"""),
+    html=html_layout("Reserva Cancelada", """
+            <p>Hola <strong>{{ user_name }}</strong>,</p>
+            <p>Tu reserva fue cancelada.</p>
+%(details)s
+            <p>Si no solicitaste esta cancelación, puedes volver a reservar la sala desde la plataforma.</p>""",
+        color="#dc2626")
+)
+
+register_template(
+    "reservation_reminder",
+    subject="Recordatorio de Reserva de Sala - BiblioReservas",
+    text=text_body("""
+Hola {{ user_name }},
+
+Te recordamos que tienes una reserva próximamente.
+
+%(details)s
+
+Por favor, llega puntualmente. Si ya no la necesitas, cancélala desde "Mis Reservas" para liberar la sala.
+
+Saludos,
+El equipo de BiblioReservas
+"""),
+    html=html_layout("Recordatorio de Reserva", """
+            <p>Hola <strong>{{ user_name }}</strong>,</p>
+            <p>Te recordamos que tienes una reserva próximamente.</p>
+%(details)s
+            <p>Por favor, llega puntualmente. Si ya no la necesitas, cancélala desde <strong>"Mis Reservas"</strong> para liberar la sala.</p>""",
+        color="#d97706")
+)
+
+register_template(
+    "reservation_batch_summary",
+    subject="Confirmación de Reservas de Sala ({{ count }}) - BiblioReservas",
+    text="""
+Hola {{ user_name }},
+
+Tus reservas han sido confirmadas exitosamente.
+
+Biblioteca: {{ library_name }}
+Sala: {{ room_name }}
+
+FECHAS RESERVADAS ({{ count }}):
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+{{ occurrences_text }}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Si necesitas cancelar alguna de tus reservas, puedes hacerlo desde la sección "Mis Reservas" en la plataforma.
+
+Saludos,
+El equipo de BiblioReservas
+""",
+    html=html_layout("✓ Reservas Confirmadas", """
+            <p>Hola <strong>{{ user_name }}</strong>,</p>
+            <p>Tus reservas han sido confirmadas exitosamente.</p>
+
+            <div class="details-box">
+                <h3 style="margin-top: 0; color: #2563eb;">{{ library_name }} - {{ room_name }}</h3>
+{{ occurrences_html }}
+            </div>
+
+            <p>Si necesitas cancelar alguna de tus reservas, puedes hacerlo desde la sección <strong>"Mis Reservas"</strong> en la plataforma.</p>""")
+)
@@ -9,20 +9,45 @@ Para ejecutar:
 
 El worker estará corriendo continuamente, procesando emails a medida
 que lleguen a la cola.
+
+Modos (EMAIL_WORKER_MODE):
+    sequential  Un mensaje a la vez, una conexión SMTP por email (por defecto)
+    concurrent  Hasta EMAIL_WORKER_PREFETCH mensajes en vuelo, enviados en
+                paralelo con aiosmtplib sobre un pool de SMTP_POOL_SIZE
+                conexiones autenticadas que se reutilizan; cada mensaje se
+                confirma (ACK) en cuanto termina su envío
+
+Reintentos: un envío fallido no se reencola de inmediato. El mensaje se
+publica en la cola de espera de su intento ({cola}.retry.N) con un TTL de
+backoff exponencial con jitter y RabbitMQ lo devuelve a la cola principal al
+expirar. Tras EMAIL_MAX_ATTEMPTS intentos, si el mensaje es inválido (JSON
+o campos) o si el servidor SMTP lo rechaza con un código 5xx, pasa a la DLQ
+({cola}.dlq). Ver scripts/dlq.py.
 """
 
 import pika
+import asyncio
 import json
 import sys
 import os
 import logging
-from datetime import datetime, date, time
+import random
+import threading
+from datetime import datetime
+from functools import partial
 
 # Añadir el directorio raíz al path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils.rabbitmq import get_rabbitmq_connection
-from utils.email_service import send_reservation_confirmation_email
+from utils.rabbitmq import (
+    get_rabbitmq_connection,
+    declare_email_topology,
+    retry_queue_name,
+    dead_letter_queue_name
+)
+from utils.email_service import (
+    get_smtp_settings, is_permanent_smtp_error, render_email_task, send_rendered_email
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -34,22 +59,115 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EMAIL_QUEUE_NAME = os.getenv("EMAIL_QUEUE_NAME", "email_notifications")
+EMAIL_WORKER_MODE = os.getenv("EMAIL_WORKER_MODE", "sequential")
+EMAIL_WORKER_PREFETCH = int(os.getenv("EMAIL_WORKER_PREFETCH", "50"))
+
+# Reintentos con backoff exponencial (segundos)
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_DELAY = float(os.getenv("EMAIL_RETRY_BASE_DELAY", "5"))
+EMAIL_RETRY_MAX_DELAY = float(os.getenv("EMAIL_RETRY_MAX_DELAY", "600"))
+
+# Header con la cantidad de intentos ya realizados
+ATTEMPTS_HEADER = "x-attempts"
+
+# Errores de datos: reintentar no sirve, el mensaje va directo a la DLQ
+PERMANENT_ERRORS = (KeyError, ValueError, TypeError)
 
-def parse_date(date_str: str) -> date:
-    """Parsea una fecha en formato ISO"""
-    return datetime.fromisoformat(date_str).date()
+
+def is_permanent_error(error: Exception) -> bool:
+    """Datos inválidos o rechazo SMTP 5xx: el mensaje va directo a la DLQ."""
+    return isinstance(error, PERMANENT_ERRORS) or is_permanent_smtp_error(error)
+
+
+def send_email_task(email_data: dict):
+    """
+    Envía el email descrito por una tarea de la cola.
+    
+    Raises:
+        KeyError, ValueError: Si la tarea tiene datos faltantes o inválidos
+        Exception: Si falla el envío del email
+    """
+    settings = get_smtp_settings()
+    send_rendered_email(build_email_task_message(email_data, settings), settings)
+
+
+def build_email_task_message(email_data: dict, smtp_settings: dict):
+    """
+    Renderiza el mensaje de una tarea de la cola, sin enviarlo.
+    
+    Raises:
+        KeyError, ValueError: Si la tarea tiene datos faltantes o inválidos
+    """
+    return render_email_task(email_data, smtp_settings['from_email'], smtp_settings['from_name'])
+
+
+def describe_task(email_data: dict) -> str:
+    """Reservas a las que corresponde una tarea, para los logs."""
+    if 'reservation_ids' in email_data:
+        return "reservations " + ", ".join(f"#{i}" for i in email_data['reservation_ids'])
+    return f"reservation #{email_data.get('reservation_id')}"
+
+
+def retry_delay(attempt: int) -> float:
+    """
+    Espera antes del reintento que sigue al intento `attempt` (1 = el primero).
+    
+    Backoff exponencial acotado, con jitter entre el 50% y el 100% para que
+    los mensajes que fallaron juntos no vuelvan todos a la vez.
+    """
+    delay = min(EMAIL_RETRY_BASE_DELAY * (2 ** (attempt - 1)), EMAIL_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
 
 
-def parse_time(time_str: str) -> time:
-    """Parsea una hora en formato HH:MM o HH:MM:SS"""
-    if 'T' in time_str:  # Si viene como datetime completo
-        return datetime.fromisoformat(time_str).time()
-    # Manejar formato HH:MM o HH:MM:SS
-    parts = time_str.split(':')
-    hour = int(parts[0])
-    minute = int(parts[1])
-    second = int(parts[2]) if len(parts) > 2 else 0
-    return time(hour, minute, second)
+def handle_failed_task(ch, method, properties, body, error: Exception):
+    """
+    Programa el reintento de un mensaje fallido o lo manda a la DLQ.
+    
+    El mensaje se republica antes de confirmar el original: si el worker
+    muere en el medio, RabbitMQ lo reentrega (al menos una vez).
+    """
+    headers = dict((properties.headers if properties else None) or {})
+    attempt = int(headers.get(ATTEMPTS_HEADER, 0)) + 1
+    headers[ATTEMPTS_HEADER] = attempt
+    headers["x-last-error"] = str(error)[:500]
+    
+    permanent = is_permanent_error(error)
+    if permanent or attempt >= EMAIL_MAX_ATTEMPTS:
+        headers["x-failed-at"] = datetime.utcnow().isoformat()
+        ch.basic_publish(
+            exchange='',
+            routing_key=dead_letter_queue_name(EMAIL_QUEUE_NAME),
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type='application/json',
+                headers=headers
+            )
+        )
+        if not permanent:
+            reason = f"{attempt} attempts"
+        elif is_permanent_smtp_error(error):
+            reason = "permanent SMTP rejection"
+        else:
+            reason = "invalid message"
+        logger.error(f"Email task moved to DLQ ({reason}): {str(error)}")
+    else:
+        delay = retry_delay(attempt)
+        ch.basic_publish(
+            exchange='',
+            routing_key=retry_queue_name(EMAIL_QUEUE_NAME, attempt),
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type='application/json',
+                headers=headers,
+                expiration=str(int(delay * 1000))
+            )
+        )
+        logger.warning(f"Email task failed (attempt {attempt}), retrying in {delay:.1f}s: {str(error)}")
+    
+    ch.basic_ack(delivery_tag=method.delivery_tag)
 
 
 def process_email_task(ch, method, properties, body):
@@ -63,26 +181,11 @@ def process_email_task(ch, method, properties, body):
         # Parsear el mensaje JSON
         email_data = json.loads(body)
         
-        logger.info(f"Processing email task for reservation #{email_data.get('reservation_id')}")
+        logger.info(f"Processing email task for {describe_task(email_data)}")
         
-        # Convertir strings a objetos date/time
-        reservation_date = parse_date(email_data['reservation_date'])
-        start_time = parse_time(email_data['start_time'])
-        end_time = parse_time(email_data['end_time'])
+        send_email_task(email_data)
         
-        # Enviar el email
-        send_reservation_confirmation_email(
-            user_email=email_data['user_email'],
-            user_name=email_data['user_name'],
-            room_name=email_data['room_name'],
-            library_name=email_data['library_name'],
-            reservation_date=reservation_date,
-            start_time=start_time,
-            end_time=end_time,
-            reservation_id=email_data['reservation_id']
-        )
-        
-        logger.info(f"Email sent successfully for reservation #{email_data['reservation_id']}")
+        logger.info(f"Email sent successfully for {describe_task(email_data)}")
         
         # Confirmar el mensaje (ACK)
         # Esto le dice a RabbitMQ que el mensaje fue procesado correctamente
@@ -91,9 +194,71 @@ def process_email_task(ch, method, properties, body):
     except Exception as e:
         logger.error(f"Error processing email task: {str(e)}")
         
-        # Rechazar el mensaje y reencolarlo
-        # Si el email falla, se puede reintentar
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        # Reintentar más tarde (o mandar a la DLQ), sin reencolar de inmediato
+        handle_failed_task(ch, method, properties, body, e)
+
+
+class ConcurrentEmailConsumer:
+    """
+    Consumer que envía varios emails en paralelo.
+    
+    pika no es thread-safe: el consumo y los ACK/NACK ocurren en el hilo de
+    la conexión, mientras que los envíos corren en un event loop asyncio en
+    un hilo aparte. Cada envío terminado agenda su ACK (o NACK) en el hilo de
+    la conexión con add_callback_threadsafe.
+    """
+    
+    def __init__(self, connection, channel, smtp_pool_factory=None):
+        from utils.smtp_pool import SMTPConnectionPool
+        
+        self._connection = connection
+        self._channel = channel
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="email-sender", daemon=True)
+        self._smtp_pool = (smtp_pool_factory or SMTPConnectionPool)()
+        self._pending = set()
+    
+    def start(self):
+        self._thread.start()
+    
+    async def _send(self, body: bytes):
+        email_data = json.loads(body)
+        message = build_email_task_message(email_data, self._smtp_pool.settings)
+        await self._smtp_pool.send(message)
+        return describe_task(email_data)
+    
+    def on_message(self, ch, method, properties, body):
+        future = asyncio.run_coroutine_threadsafe(self._send(body), self._loop)
+        self._pending.add(future)
+        future.add_done_callback(
+            lambda done: self._connection.add_callback_threadsafe(
+                partial(self._settle, ch, method, properties, body, done)
+            )
+        )
+    
+    def _settle(self, ch, method, properties, body, future):
+        # Se ejecuta en el hilo de la conexión
+        self._pending.discard(future)
+        error = future.exception()
+        try:
+            if error is None:
+                logger.info(f"Email sent successfully for {future.result()}")
+                ch.basic_ack(delivery_tag=method.delivery_tag)
+            else:
+                handle_failed_task(ch, method, properties, body, error)
+        except pika.exceptions.AMQPError as e:
+            # El canal se cerró: RabbitMQ reentregará el mensaje
+            logger.warning(f"Could not settle delivery {method.delivery_tag}: {str(e)}")
+    
+    def drain(self, timeout: float = 30):
+        """Espera a que terminen los envíos en curso y cierra el pool SMTP."""
+        deadline = datetime.now().timestamp() + timeout
+        while self._pending and datetime.now().timestamp() < deadline:
+            self._connection.process_data_events(time_limit=0.1)
+        
+        asyncio.run_coroutine_threadsafe(self._smtp_pool.close(), self._loop).result(timeout=timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
 
 
 def start_email_worker():
@@ -103,33 +268,47 @@ def start_email_worker():
     Este proceso se mantiene corriendo y procesa emails a medida que
     llegan a la cola de RabbitMQ.
     """
-    queue_name = os.getenv("EMAIL_QUEUE_NAME", "email_notifications")
+    queue_name = EMAIL_QUEUE_NAME
     
     logger.info("=" * 60)
     logger.info("📧 Email Worker - RabbitMQ Consumer")
     logger.info("=" * 60)
     logger.info(f"Queue: {queue_name}")
     logger.info(f"RabbitMQ Host: {os.getenv('RABBITMQ_HOST', 'localhost')}")
+    logger.info(f"Mode: {EMAIL_WORKER_MODE}")
+    logger.info(f"Max attempts: {EMAIL_MAX_ATTEMPTS}")
     logger.info("Waiting for email tasks...")
     logger.info("Press CTRL+C to exit")
     logger.info("=" * 60)
     
+    consumer = None
+    
     try:
         # Conectar a RabbitMQ
         connection = get_rabbitmq_connection()
         channel = connection.channel()
         
-        # Declarar la cola (debe coincidir con la del publisher)
-        channel.queue_declare(queue=queue_name, durable=True)
+        # Declarar la cola (debe coincidir con la del publisher), las colas
+        # de reintento y la DLQ
+        declare_email_topology(channel, queue_name, EMAIL_MAX_ATTEMPTS)
         
-        # Configurar prefetch: solo procesar 1 mensaje a la vez
-        # Esto asegura distribución equitativa entre workers
-        channel.basic_qos(prefetch_count=1)
+        if EMAIL_WORKER_MODE == "concurrent":
+            # Ventana de mensajes sin confirmar: los envíos en paralelo
+            # quedan limitados además por el tamaño del pool SMTP
+            channel.basic_qos(prefetch_count=EMAIL_WORKER_PREFETCH)
+            consumer = ConcurrentEmailConsumer(connection, channel)
+            consumer.start()
+            on_message = consumer.on_message
+        else:
+            # Configurar prefetch: solo procesar 1 mensaje a la vez
+            # Esto asegura distribución equitativa entre workers
+            channel.basic_qos(prefetch_count=1)
+            on_message = process_email_task
         
         # Configurar el consumer
         channel.basic_consume(
             queue=queue_name,
-            on_message_callback=process_email_task,
+            on_message_callback=on_message,
             auto_ack=False  # Confirmación manual después de procesar
         )
         
@@ -137,6 +316,10 @@ def start_email_worker():
         channel.start_consuming()
         
     except KeyboardInterrupt:
+        if consumer is not None:
+            # Dejar de recibir y confirmar lo que ya se está enviando
+            channel.stop_consuming()
+            consumer.drain()
         logger.info("\n\n🛑 Worker stopped by user")
         sys.exit(0)
     except Exception as e:
@@ -0,0 +1,302 @@
+"""
+Retenciones temporales de horarios (holds) mientras el usuario completa la reserva.
+
+Al abrir el formulario de reserva el frontend pide una retención de la sala y
+el horario elegidos (POST /api/holds). Mientras está activa, ese horario
+figura como ocupado en la disponibilidad y las reservas de otros usuarios que
+lo pisan se rechazan de inmediato, sin llegar a la transacción de escritura.
+Al confirmar, la retención se convierte en la reserva con un solo INSERT; si
+el usuario abandona el formulario, expira sola tras HOLD_TTL segundos.
+Mientras se confirma (take) la retención sigue bloqueando el horario y no
+vence; se quita recién cuando la reserva quedó guardada (finish) o vuelve a
+estar activa si la confirmación falla (restore).
+
+Las retenciones activas se guardan por (sala, fecha) para las consultas de
+solapamiento y en un heap ordenado por vencimiento: cada operación barre
+primero las vencidas sacándolas de la cima del heap, con un costo
+proporcional a las que vencieron y no al total. Las retenciones liberadas o
+confirmadas antes de vencer dejan su entrada en el heap y se descartan al
+llegar a la cima (borrado perezoso).
+
+Cada alta o baja de una retención (incluidos los vencimientos) se notifica a
+los listeners registrados con add_listener; el hub de disponibilidad en vivo
+(utils/availability_hub.py) las reenvía a los clientes suscritos. Las bajas
+de retenciones que se convirtieron en reserva se notifican como "converted":
+el horario pasa a reservado, no a libre.
+
+Como el índice de intervalos, viven en la memoria de cada worker: con varios
+workers solo se coordinan las peticiones que llegan al mismo proceso. La base
+de datos sigue impidiendo los solapamientos entre reservas confirmadas.
+"""
+
+import heapq
+import logging
+import os
+import secrets
+import threading
+import time as _time
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.metrics import registry, Gauge
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL = float(os.getenv("HOLD_TTL", "300"))
+HOLDS_MAX_PER_USER = int(os.getenv("HOLDS_MAX_PER_USER", "3"))
+
+BucketKey = Tuple[int, date]
+
+# listener(evento, retención); evento: "held", "released" o "converted"
+HoldListener = Callable[[str, "Hold"], None]
+
+slot_holds_active = registry.register(Gauge(
+    "slot_holds_active", "Retenciones de horario activas en este proceso"
+))
+
+
+class HoldConflict(Exception):
+    """El horario ya está retenido por otro usuario."""
+
+
+class HoldLimitExceeded(Exception):
+    """El usuario alcanzó HOLDS_MAX_PER_USER retenciones activas."""
+
+
+class Hold:
+    """Retención de una sala en un horario, válida hasta expires_at."""
+
+    __slots__ = ("id", "user_id", "room_id", "date", "start_time", "end_time", "expires_at", "expires_at_utc",
+                 "converting")
+
+    def __init__(self, hold_id: str, user_id: int, room_id: int, day: date, start_time: time, end_time: time,
+                 expires_at: float, expires_at_utc: datetime):
+        self.id = hold_id
+        self.user_id = user_id
+        self.room_id = room_id
+        self.date = day
+        self.start_time = start_time
+        self.end_time = end_time
+        # expires_at (reloj monotónico) decide el vencimiento; expires_at_utc es para el cliente
+        self.expires_at = expires_at
+        self.expires_at_utc = expires_at_utc
+        # True mientras se confirma: sigue bloqueando el horario y no vence
+        self.converting = False
+
+    def overlaps(self, start: time, end: time) -> bool:
+        return self.start_time < end and start < self.end_time
+
+
+class SlotHoldRegistry:
+    """
+    Retenciones activas del proceso.
+
+    Crear, liberar o tomar una retención es O(log n) más el barrido de las
+    vencidas; la consulta de solapamiento recorre solo las retenciones de la
+    sala en ese día.
+    """
+
+    def __init__(self, ttl: float = HOLD_TTL, max_per_user: int = HOLDS_MAX_PER_USER,
+                 clock: Callable[[], float] = _time.monotonic):
+        self._ttl = ttl
+        self._max_per_user = max_per_user
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._holds: Dict[str, Hold] = {}
+        self._by_bucket: Dict[BucketKey, Dict[str, Hold]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._listeners: List[HoldListener] = []
+
+    def add_listener(self, listener: HoldListener):
+        """Registra una función que recibe cada alta ("held") y baja ("released" o "converted")."""
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, hold: "Hold"):
+        for listener in self._listeners:
+            try:
+                listener(event, hold)
+            except Exception:
+                logger.exception("Hold listener failed")
+
+    # ============ MANTENIMIENTO ============
+
+    def _sweep(self, now: float):
+        # Solo se mira la cima del heap: las entradas de retenciones ya
+        # liberadas o confirmadas se descartan al llegar a ella
+        while self._expiry and self._expiry[0][0] <= now:
+            _, hold_id = heapq.heappop(self._expiry)
+            hold = self._holds.get(hold_id)
+            # Las que se están confirmando no vencen: restore vuelve a agendarlas
+            if hold is not None and hold.expires_at <= now and not hold.converting:
+                self._remove(hold)
+
+        # Si las entradas muertas superan a las vivas, se reconstruye el heap
+        if len(self._expiry) > 2 * len(self._holds) + 64:
+            self._expiry = [(hold.expires_at, hold.id) for hold in self._holds.values()]
+            heapq.heapify(self._expiry)
+
+    def _add(self, hold: Hold):
+        self._holds[hold.id] = hold
+        self._by_bucket.setdefault((hold.room_id, hold.date), {})[hold.id] = hold
+        heapq.heappush(self._expiry, (hold.expires_at, hold.id))
+        slot_holds_active.set(len(self._holds))
+        self._notify("held", hold)
+
+    def _remove(self, hold: Hold, event: str = "released"):
+        del self._holds[hold.id]
+        key = (hold.room_id, hold.date)
+        bucket = self._by_bucket[key]
+        del bucket[hold.id]
+        if not bucket:
+            del self._by_bucket[key]
+        slot_holds_active.set(len(self._holds))
+        self._notify(event, hold)
+
+    def _conflicting(self, room_id: int, day: date, start: time, end: time,
+                     user_id: Optional[int]) -> List[Hold]:
+        return [
+            hold for hold in self._by_bucket.get((room_id, day), {}).values()
+            if hold.overlaps(start, end) and hold.user_id != user_id
+        ]
+
+    # ============ OPERACIONES ============
+
+    def create(self, user_id: int, room_id: int, day: date, start: time, end: time) -> Hold:
+        """
+        Retiene [start, end) de la sala ese día para el usuario.
+
+        Las retenciones del mismo usuario que se solapan con la nueva se
+        reemplazan (el usuario cambió de horario en el formulario). Si la
+        nueva se rechaza, las existentes quedan intactas.
+
+        Raises:
+            HoldConflict: Si otro usuario tiene retenido un horario que se solapa
+            HoldLimitExceeded: Si el usuario ya tiene HOLDS_MAX_PER_USER retenciones
+        """
+        with self._lock:
+            now = self._clock()
+            self._sweep(now)
+
+            if self._conflicting(room_id, day, start, end, user_id) \
+                    or any(hold.converting for hold in self._conflicting(room_id, day, start, end, None)):
+                raise HoldConflict(room_id, day, start, end)
+
+            # Solo quedan las del propio usuario: se reemplazan si la nueva se acepta
+            replaced = self._conflicting(room_id, day, start, end, None)
+            held = sum(1 for hold in self._holds.values() if hold.user_id == user_id)
+            if held - len(replaced) >= self._max_per_user:
+                raise HoldLimitExceeded(user_id)
+
+            for hold in replaced:
+                self._remove(hold)
+
+            hold = Hold(
+                secrets.token_urlsafe(16), user_id, room_id, day, start, end,
+                now + self._ttl, datetime.utcnow() + timedelta(seconds=self._ttl)
+            )
+            self._add(hold)
+            return hold
+
+    def sweep(self):
+        """Descarta las retenciones vencidas (el hub lo llama periódicamente para notificarlas a tiempo)."""
+        with self._lock:
+            self._sweep(self._clock())
+
+    def get(self, hold_id: str) -> Optional[Hold]:
+        with self._lock:
+            self._sweep(self._clock())
+            return self._holds.get(hold_id)
+
+    def release(self, hold_id: str) -> bool:
+        """Libera una retención. Devuelve False si no existía, ya expiró o se está confirmando."""
+        with self._lock:
+            self._sweep(self._clock())
+            hold = self._holds.get(hold_id)
+            if hold is None or hold.converting:
+                return False
+            self._remove(hold)
+            return True
+
+    def take(self, hold_id: str) -> Optional[Hold]:
+        """
+        Marca la retención como en confirmación para convertirla en reserva.
+
+        La retención sigue bloqueando el horario hasta finish (reserva
+        guardada) o restore (la confirmación falló). Solo una petición puede
+        tomarla: un segundo intento de confirmar la misma retención recibe None.
+        """
+        with self._lock:
+            self._sweep(self._clock())
+            hold = self._holds.get(hold_id)
+            if hold is None or hold.converting:
+                return None
+            hold.converting = True
+            return hold
+
+    def finish(self, hold: Hold):
+        """Quita una retención tomada cuya reserva ya se guardó."""
+        with self._lock:
+            if self._holds.get(hold.id) is hold:
+                self._remove(hold, "converted")
+
+    def release_overlapping(self, user_id: int, room_id: int, day: date, start: time, end: time):
+        """Quita las retenciones del usuario que una reserva suya acaba de ocupar."""
+        with self._lock:
+            for hold in self._conflicting(room_id, day, start, end, None):
+                if hold.user_id == user_id:
+                    self._remove(hold, "converted")
+
+    def restore(self, hold: Hold):
+        """Vuelve a activar una retención tomada cuya confirmación falló (o la quita si ya venció)."""
+        with self._lock:
+            if self._holds.get(hold.id) is not hold:
+                return
+            hold.converting = False
+            now = self._clock()
+            if hold.expires_at <= now:
+                self._remove(hold)
+            else:
+                # Su entrada del heap pudo descartarse mientras se confirmaba
+                heapq.heappush(self._expiry, (hold.expires_at, hold.id))
+
+    def overlaps(self, room_id: int, day: date, start: time, end: time, user_id: Optional[int] = None) -> bool:
+        """Indica si [start, end) pisa una retención activa de un usuario distinto de user_id."""
+        with self._lock:
+            self._sweep(self._clock())
+            return bool(self._conflicting(room_id, day, start, end, user_id))
+
+    def held_intervals(self, day: date, room_id: Optional[int] = None,
+                       user_id: Optional[int] = None) -> List[Tuple[int, time, time]]:
+        """Retenciones activas del día como (room_id, start_time, end_time), sin las de user_id."""
+        with self._lock:
+            self._sweep(self._clock())
+            return [
+                (hold.room_id, hold.start_time, hold.end_time)
+                for (bucket_room, bucket_day), bucket in self._by_bucket.items()
+                if bucket_day == day and (room_id is None or bucket_room == room_id)
+                for hold in bucket.values()
+                if hold.user_id != user_id
+            ]
+
+    def held_rows(self, room_id: int, days: Iterable[date],
+                  user_id: Optional[int] = None) -> List[Tuple[date, time, time]]:
+        """Retenciones activas de la sala en esas fechas como (date, start_time, end_time)."""
+        with self._lock:
+            self._sweep(self._clock())
+            return [
+                (day, hold.start_time, hold.end_time)
+                for day in set(days)
+                for hold in self._by_bucket.get((room_id, day), {}).values()
+                if hold.user_id != user_id
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._holds.clear()
+            self._by_bucket.clear()
+            self._expiry.clear()
+            slot_holds_active.set(0)
+
+
+# Retenciones compartidas por todas las peticiones del proceso
+slot_holds = SlotHoldRegistry()
@@ -0,0 +1,355 @@
+"""
+Idempotency-Key para peticiones POST que el cliente puede reintentar.
+
+El cliente envía un identificador único por operación (p. ej. un UUID) en el
+header Idempotency-Key y lo repite en cada reintento. La primera petición con
+esa clave se ejecuta normalmente y su respuesta 201 se guarda durante
+IDEMPOTENCY_TTL segundos. Las siguientes:
+
+- si la original ya terminó, reciben la misma respuesta (header
+  Idempotent-Replayed: true) sin volver a ejecutar la operación: no se toca la
+  tabla de reservas ni se envía otro email;
+- si la original sigue en curso, esperan su resultado (hasta
+  IDEMPOTENCY_WAIT_TIMEOUT segundos) en lugar de competir con ella;
+- si el cuerpo es distinto al de la original, se rechazan (IdempotencyMismatch).
+
+Solo se guardan las respuestas exitosas: si la operación falla (409, 404,
+500...) la clave se libera y un reintento vuelve a ejecutarla.
+
+Mientras la operación está en curso, la clave se toma por IDEMPOTENCY_LEASE
+segundos y no por todo el TTL: si el worker muere sin liberarla, un
+reintento posterior al vencimiento la vuelve a tomar en lugar de recibir 409
+durante un día. Cada toma tiene su lease: una petición cuya clave ya fue
+tomada por otra no puede completarla ni liberarla.
+
+Backends (IDEMPOTENCY_BACKEND):
+    memory    Diccionario del proceso (por defecto). Cubre los reintentos que
+              llegan al mismo worker
+    database  Tabla idempotency_keys: compartida entre workers; la clave
+              primaria decide qué petición ejecuta la operación
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time as _time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Union
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database.models import IdempotencyKey
+from utils.metrics import registry, Counter
+
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "10"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# Duración de la toma de una clave en curso (por defecto, tres veces la espera máxima)
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", str(3 * IDEMPOTENCY_WAIT_TIMEOUT)))
+
+# Intervalo de consulta mientras otra petición con la misma clave está en curso (database)
+_POLL_INTERVAL = 0.05
+# Intervalo entre limpiezas de claves vencidas (database)
+_PURGE_INTERVAL = 300
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+idempotency_requests_total = registry.register(Counter(
+    "idempotency_requests_total", "Peticiones con Idempotency-Key por resultado", ("outcome",)
+))
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: bytes
+
+
+class IdempotencyMismatch(Exception):
+    """La clave ya se usó con otro cuerpo de petición."""
+
+
+class IdempotencyInProgress(Exception):
+    """La petición original sigue en curso después de IDEMPOTENCY_WAIT_TIMEOUT."""
+
+
+# Valor opaco que devuelve claim() a la petición que ejecuta la operación;
+# complete() y release() solo actúan si la clave sigue tomada con ese lease
+Lease = Any
+
+
+def request_fingerprint(data: BaseModel) -> str:
+    """Hash del cuerpo validado: detecta una clave reutilizada para otra operación."""
+    canonical = json.dumps(data.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ============ BACKENDS ============
+
+class _MemoryEntry:
+    __slots__ = ("fingerprint", "response", "done", "expires_at")
+
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.response: Optional[StoredResponse] = None
+        self.done = asyncio.Event()
+        self.expires_at = expires_at
+
+
+class MemoryIdempotencyStore:
+    """Claves en memoria del proceso, con TTL y un máximo de entradas (LRU)."""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_keys: int = IDEMPOTENCY_MAX_KEYS,
+                 wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT, lease: float = IDEMPOTENCY_LEASE,
+                 clock: Callable[[], float] = _time.monotonic):
+        self._ttl = ttl
+        self._max_keys = max_keys
+        self._wait_timeout = wait_timeout
+        self._lease = lease
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+
+    async def claim(self, key: str, fingerprint: str) -> Union[StoredResponse, Lease]:
+        """
+        Toma la clave para esta petición o devuelve la respuesta guardada.
+
+        Una clave en curso cuyo lease venció (el worker que la tomó murió o
+        quedó colgado) se toma de nuevo.
+
+        Returns:
+            La respuesta a repetir (StoredResponse) o, si esta petición debe
+            ejecutar la operación, el lease con el que luego llama a
+            complete o release
+
+        Raises:
+            IdempotencyMismatch: Si la clave se usó con otro cuerpo
+            IdempotencyInProgress: Si la original no termina a tiempo
+        """
+        deadline = self._clock() + self._wait_timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at <= now:
+                    del self._entries[key]
+                    # Quien esperaba una toma vencida vuelve a mirar y ve la nueva
+                    entry.done.set()
+                    entry = None
+                if entry is None:
+                    entry = self._entries[key] = _MemoryEntry(fingerprint, now + self._lease)
+                    self._evict()
+                    return entry
+                self._entries.move_to_end(key)
+
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyMismatch(key)
+            if entry.response is not None:
+                return entry.response
+
+            # En curso: esperar a que termine (o se libere) y volver a mirar
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                raise IdempotencyInProgress(key)
+            try:
+                await asyncio.wait_for(entry.done.wait(), remaining)
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgress(key)
+
+    def _evict(self):
+        # Nunca se descartan claves en curso: sus peticiones esperan el Event
+        while len(self._entries) > self._max_keys:
+            for key, entry in self._entries.items():
+                if entry.response is not None:
+                    del self._entries[key]
+                    break
+            else:
+                return
+
+    async def complete(self, key: str, lease: Lease, response: StoredResponse):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not lease:
+                # El lease venció y otra petición tomó la clave
+                return
+            entry.response = response
+            entry.expires_at = self._clock() + self._ttl
+        entry.done.set()
+
+    async def release(self, key: str, lease: Lease):
+        with self._lock:
+            if self._entries.get(key) is lease:
+                del self._entries[key]
+        lease.done.set()
+
+
+class DatabaseIdempotencyStore:
+    """Claves en la tabla idempotency_keys, compartidas por todos los workers."""
+
+    def __init__(self, session_factory=None, ttl: float = IDEMPOTENCY_TTL,
+                 wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT, lease: float = IDEMPOTENCY_LEASE):
+        if session_factory is None:
+            from database.connection import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self._session_factory = session_factory
+        self._ttl = ttl
+        self._wait_timeout = wait_timeout
+        self._lease = lease
+        self._last_purge = 0.0
+
+    async def claim(self, key: str, fingerprint: str) -> Union[StoredResponse, Lease]:
+        """
+        Igual que MemoryIdempotencyStore.claim; el INSERT de la clave decide quién ejecuta.
+
+        El lease es el created_at de la fila, en segundos enteros (MySQL no
+        guarda fracciones en DATETIME). Dos tomas de la misma clave están
+        separadas al menos por IDEMPOTENCY_LEASE, así que no se repite.
+        """
+        await self._purge_expired()
+        deadline = _time.monotonic() + self._wait_timeout
+
+        while True:
+            async with self._session_factory() as session:
+                now = datetime.utcnow()
+                lease = now.replace(microsecond=0)
+                session.add(IdempotencyKey(
+                    key=key,
+                    fingerprint=fingerprint,
+                    status="in_progress",
+                    created_at=lease,
+                    # El TTL completo se aplica al completar (complete)
+                    expires_at=now + timedelta(seconds=self._lease)
+                ))
+                try:
+                    await session.commit()
+                    return lease
+                except IntegrityError:
+                    await session.rollback()
+
+                row = (await session.execute(
+                    select(IdempotencyKey.fingerprint, IdempotencyKey.status, IdempotencyKey.status_code,
+                           IdempotencyKey.body, IdempotencyKey.expires_at)
+                    .where(IdempotencyKey.key == key)
+                )).first()
+
+                if row is not None and row.expires_at <= now:
+                    # Vencida (respuesta guardada o lease de una petición que no
+                    # terminó): se borra y se vuelve a intentar el INSERT
+                    await session.execute(
+                        delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+                    )
+                    await session.commit()
+                    continue
+
+            if row is not None:
+                if row.fingerprint != fingerprint:
+                    raise IdempotencyMismatch(key)
+                if row.status == "completed":
+                    return StoredResponse(row.status_code, row.body.encode("utf-8"))
+
+            # En curso en este u otro worker (o liberada entre el INSERT y el SELECT)
+            if _time.monotonic() >= deadline:
+                raise IdempotencyInProgress(key)
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    async def complete(self, key: str, lease: Lease, response: StoredResponse):
+        async with self._session_factory() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key, IdempotencyKey.status == "in_progress",
+                       IdempotencyKey.created_at == lease)
+                .values(
+                    status="completed",
+                    status_code=response.status_code,
+                    body=response.body.decode("utf-8"),
+                    expires_at=datetime.utcnow() + timedelta(seconds=self._ttl)
+                )
+            )
+            await session.commit()
+
+    async def release(self, key: str, lease: Lease):
+        async with self._session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status == "in_progress",
+                                             IdempotencyKey.created_at == lease)
+            )
+            await session.commit()
+
+    async def _purge_expired(self):
+        if _time.monotonic() - self._last_purge < _PURGE_INTERVAL:
+            return
+        self._last_purge = _time.monotonic()
+        async with self._session_factory() as session:
+            await session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+            await session.commit()
+
+
+_BACKENDS: Dict[str, Callable[[], object]] = {
+    "memory": MemoryIdempotencyStore,
+    "database": DatabaseIdempotencyStore,
+}
+
+
+def create_idempotency_store(backend: str = IDEMPOTENCY_BACKEND):
+    if backend not in _BACKENDS:
+        raise ValueError(f"Backend de idempotencia desconocido: {backend}")
+    return _BACKENDS[backend]()
+
+
+# Store compartido por todas las peticiones del proceso
+idempotency_store = create_idempotency_store()
+
+
+# ============ EJECUCIÓN ============
+
+async def run_idempotent(
+    key: str,
+    fingerprint: str,
+    handler: Callable[[], Awaitable[Response]],
+    store=None
+) -> Response:
+    """
+    Ejecuta `handler` una sola vez por clave y repite su respuesta en los reintentos.
+
+    Raises:
+        IdempotencyMismatch, IdempotencyInProgress: Ver claim()
+    """
+    store = store or idempotency_store
+    try:
+        claimed = await store.claim(key, fingerprint)
+    except IdempotencyMismatch:
+        idempotency_requests_total.inc("mismatch")
+        raise
+    except IdempotencyInProgress:
+        idempotency_requests_total.inc("in_progress")
+        raise
+
+    if isinstance(claimed, StoredResponse):
+        idempotency_requests_total.inc("replayed")
+        return Response(
+            content=claimed.body,
+            status_code=claimed.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"}
+        )
+
+    lease = claimed
+    idempotency_requests_total.inc("executed")
+    try:
+        response = await handler()
+    except BaseException:
+        # Cancelación incluida: la clave no puede quedar tomada hasta que venza el lease
+        await asyncio.shield(store.release(key, lease))
+        raise
+
+    if 200 <= response.status_code < 300:
+        await store.complete(key, lease, StoredResponse(response.status_code, bytes(response.body)))
+    else:
+        await store.release(key, lease)
+    return response
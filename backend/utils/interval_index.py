@@ -0,0 +1,126 @@
+"""
+Índice en memoria de intervalos reservados por sala y fecha.
+
+Permite responder "¿este horario se solapa con una reserva existente?" sin
+ir a la base de datos. Cada par (room_id, date) se carga de forma perezosa la
+primera vez que se consulta y luego se mantiene actualizado con las reservas
+que se confirman en este proceso.
+
+Como el índice vive en cada worker, las reservas creadas por otros procesos
+no se ven inmediatamente: cada bucket expira tras INTERVAL_INDEX_TTL segundos
+y se recarga. La base de datos sigue siendo la fuente de verdad; el índice
+solo sirve para rechazar rápido los conflictos evidentes.
+"""
+
+import os
+import threading
+import time as _time
+from bisect import bisect_left
+from datetime import date, time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Reservation
+
+Interval = Tuple[time, time]
+BucketKey = Tuple[int, date]
+
+INTERVAL_INDEX_TTL = float(os.getenv("INTERVAL_INDEX_TTL", "30"))
+
+
+class _Bucket:
+    """Intervalos de una sala en un día, ordenados por hora de inicio."""
+
+    __slots__ = ("starts", "ends", "max_ends", "loaded_at")
+
+    def __init__(self, intervals: Iterable[Interval], loaded_at: float):
+        ordered = sorted(intervals)
+        self.starts: List[time] = [start for start, _ in ordered]
+        self.ends: List[time] = [end for _, end in ordered]
+        self.max_ends: List[time] = []
+        self.loaded_at = loaded_at
+        self._rebuild_max_ends(0)
+
+    def _rebuild_max_ends(self, from_index: int):
+        # max_ends[i] = mayor hora de fin entre los intervalos 0..i. Con esto
+        # la consulta sigue siendo correcta aunque haya datos históricos
+        # solapados en la tabla.
+        del self.max_ends[from_index:]
+        current = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[from_index:]:
+            current = end if current is None or end > current else current
+            self.max_ends.append(current)
+
+    def overlaps(self, start: time, end: time) -> bool:
+        # Solo pueden solaparse los intervalos que empiezan antes de `end`;
+        # entre ellos basta con mirar la mayor hora de fin.
+        candidates = bisect_left(self.starts, end)
+        return candidates > 0 and self.max_ends[candidates - 1] > start
+
+    def add(self, start: time, end: time):
+        index = bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self._rebuild_max_ends(index)
+
+
+class ReservationIntervalIndex:
+    """
+    Índice de intervalos por (sala, fecha) con carga perezosa.
+
+    La consulta de solapamiento es O(log n) sobre el bucket ya cargado.
+    """
+
+    def __init__(self, ttl: float = INTERVAL_INDEX_TTL, clock: Callable[[], float] = _time.monotonic):
+        self._ttl = ttl
+        self._clock = clock
+        self._buckets: Dict[BucketKey, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    async def _get_bucket(self, db: AsyncSession, room_id: int, day: date) -> _Bucket:
+        key = (room_id, day)
+        now = self._clock()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None and now - bucket.loaded_at < self._ttl:
+                return bucket
+
+        rows = (await db.execute(
+            select(Reservation.start_time, Reservation.end_time)
+            .where(Reservation.room_id == room_id, Reservation.date == day)
+        )).all()
+        bucket = _Bucket(((start, end) for start, end in rows), now)
+
+        with self._lock:
+            self._buckets[key] = bucket
+        return bucket
+
+    async def overlaps(self, db: AsyncSession, room_id: int, day: date, start: time, end: time) -> bool:
+        """Indica si [start, end) se solapa con alguna reserva de la sala ese día."""
+        bucket = await self._get_bucket(db, room_id, day)
+        with self._lock:
+            return bucket.overlaps(start, end)
+
+    def add(self, room_id: int, day: date, start: time, end: time):
+        """Registra una reserva ya confirmada (commit) en la base de datos."""
+        with self._lock:
+            bucket = self._buckets.get((room_id, day))
+            if bucket is not None:
+                bucket.add(start, end)
+
+    def invalidate(self, room_id: Optional[int] = None, day: Optional[date] = None):
+        """Descarta buckets para forzar su recarga desde la base de datos."""
+        with self._lock:
+            if room_id is None and day is None:
+                self._buckets.clear()
+                return
+            for key in [k for k in self._buckets if (room_id is None or k[0] == room_id)
+                        and (day is None or k[1] == day)]:
+                del self._buckets[key]
+
+
+# Índice compartido por todas las peticiones del proceso
+reservation_index = ReservationIntervalIndex()
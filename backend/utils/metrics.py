@@ -0,0 +1,339 @@
+"""
+Métricas de la API en formato de texto de Prometheus (GET /metrics).
+
+Sin dependencias externas: contadores, gauges e histogramas con etiquetas,
+guardados en memoria del proceso (cada worker de uvicorn expone los suyos).
+Registrar una observación es tomar un lock y sumar sobre una lista, por lo
+que el costo por petición es de unos pocos microsegundos.
+
+Métricas:
+- http_requests_total / http_request_duration_seconds por método, ruta
+  (la plantilla, p. ej. /api/users/{user_id}/reservations) y código de estado
+- http_requests_in_flight
+- http_request_db_queries / http_request_db_seconds: sentencias SQL y tiempo
+  en la base de datos de cada petición (eventos de SQLAlchemy)
+- email_queue_publish_total: publicaciones en RabbitMQ y en la cola en
+  memoria (utils/email_dispatcher.py), por resultado
+- email_smtp_send_total: envíos SMTP por resultado
+- reservation_email_seconds: tiempo de entregar el email de una reserva nueva
+  a la cola en memoria (con el outbox, el email es parte de la transacción)
+
+Las respuestas text/event-stream (disponibilidad en vivo) se miden hasta el
+envío de los headers: la conexión que queda abierta no cuenta como petición
+en curso ni alarga la latencia; las cuenta availability_stream_subscribers.
+
+Se desactiva con METRICS_ENABLED=false (sin middleware ni eventos de SQLAlchemy).
+"""
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Límites (en segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+# Sentencias SQL por petición
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# Starlette agrega "; charset=utf-8" a los tipos text/*
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Valor que solo aumenta. Las etiquetas se pasan en el orden de labelnames."""
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Valor que sube y baja."""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Distribución de observaciones en buckets acumulativos (le = límite superior)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [conteos por bucket (no acumulados) + Inf, suma, cantidad]
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - began, *labels)
+
+    def count(self, *labels: str) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+
+        lines = self._header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for limit, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(limit)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route", "status")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso"
+))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Sentencias SQL por petición", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Tiempo en la base de datos por petición", ("method", "route")
+))
+email_queue_publish_total = registry.register(Counter(
+    "email_queue_publish_total", "Tareas de email entregadas a una cola", ("queue", "outcome")
+))
+email_smtp_send_total = registry.register(Counter(
+    "email_smtp_send_total", "Envíos SMTP", ("client", "outcome")
+))
+reservation_email_seconds = registry.register(Histogram(
+    "reservation_email_seconds", "Tiempo de encolar el email de una reserva nueva", ("route", "path")
+))
+
+
+# ============ TIEMPO EN BASE DE DATOS POR PETICIÓN ============
+
+class RequestDatabaseStats:
+    """Sentencias SQL y tiempo acumulado de la petición en curso."""
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Igual que utils/query_counter.py: el contexto se propaga al greenlet del
+# engine asíncrono y a los hilos de las rutas síncronas
+_current_request: contextvars.ContextVar = contextvars.ContextVar("request_db_stats", default=None)
+_QUERY_STARTED = "metrics_query_started"
+_listener_lock = threading.Lock()
+_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    started = conn.info.get(_QUERY_STARTED)
+    if stats is not None and started:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - started.pop()
+
+
+def _handle_error(exception_context):
+    stats = _current_request.get()
+    connection = exception_context.connection
+    started = connection.info.get(_QUERY_STARTED) if connection is not None else None
+    if stats is not None and started:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - started.pop()
+
+
+def install_db_listeners():
+    global _listeners_installed
+    with _listener_lock:
+        if not _listeners_installed:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+            _listeners_installed = True
+
+
+# ============ MIDDLEWARE ============
+
+def _is_event_stream(headers) -> bool:
+    for name, value in headers:
+        if name.lower() == b"content-type":
+            return value.split(b";", 1)[0].strip().lower() == b"text/event-stream"
+    return False
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP.
+
+    La ruta se etiqueta con su plantilla (no con la URL concreta) para que la
+    cantidad de series no crezca con los IDs; las URLs sin ruta quedan como
+    "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+        install_db_listeners()
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            else:
+                route = getattr(endpoint, "__name__", "unmatched")
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        # Fin de la petición para las métricas; en un stream, el envío de los headers
+        finished_at = None
+
+        async def send_with_status(message):
+            nonlocal status_code, finished_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if _is_event_stream(message.get("headers", ())):
+                    # La conexión de Server-Sent Events queda abierta mientras
+                    # dure la suscripción: se mide hasta los headers y deja de
+                    # contar como en curso (availability_stream_subscribers)
+                    finished_at = time.perf_counter()
+                    http_requests_in_flight.dec()
+            await send(message)
+
+        stats = RequestDatabaseStats()
+        token = _current_request.set(stats)
+        http_requests_in_flight.inc()
+        began = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if finished_at is None:
+                finished_at = time.perf_counter()
+                http_requests_in_flight.dec()
+            elapsed = finished_at - began
+            _current_request.reset(token)
+
+            method = scope["method"]
+            route = self._route_label(scope)
+            status = str(status_code)
+            http_requests_total.inc(method, route, status)
+            http_request_duration_seconds.observe(elapsed, method, route, status)
+            http_request_db_queries.observe(stats.queries, method, route)
+            http_request_db_seconds.observe(stats.seconds, method, route)
+
+
+def render_metrics() -> str:
+    return registry.render()
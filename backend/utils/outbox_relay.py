@@ -0,0 +1,213 @@
+"""
+Relay del outbox transaccional de emails.
+
+Este script debe ejecutarse como un proceso independiente. Lee en lotes las
+filas pendientes de la tabla email_outbox (escritas en la misma transacción
+que cada reserva), las publica en el backend de cola configurado y las marca
+como enviadas.
+
+La entrega es "al menos una vez": si el proceso muere después de publicar y
+antes de confirmar el lote, esas filas se vuelven a publicar.
+
+Para ejecutar:
+    python utils/outbox_relay.py
+
+Backends (OUTBOX_BACKEND):
+    rabbitmq  Publica en EMAIL_QUEUE_NAME con el publisher persistente (por defecto)
+    smtp      Envía el email directamente, sin cola intermedia
+"""
+
+import json
+import os
+import signal
+import sys
+import time
+import logging
+from datetime import datetime
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+
+from database.connection import SessionLocal
+from database.models import EmailOutbox
+
+load_dotenv()
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "30"))
+
+
+class BackendUnavailable(Exception):
+    """El backend no está disponible: el lote se reintenta más tarde sin contar intentos."""
+
+
+def rabbitmq_backend():
+    """Publica cada tarea en la cola de emails de RabbitMQ."""
+    from utils.rabbitmq import get_email_publisher
+
+    publisher = get_email_publisher()
+    queue_name = os.getenv("EMAIL_QUEUE_NAME", "email_notifications")
+
+    def publish(task_type: str, payload: str):
+        try:
+            publisher.publish(queue_name, payload.encode("utf-8"))
+        except Exception as e:
+            # Publicar no depende del contenido: cualquier fallo es de conexión
+            raise BackendUnavailable(str(e)) from e
+
+    return publish
+
+
+def smtp_backend():
+    """Envía cada tarea directamente por SMTP (sin RabbitMQ)."""
+    from utils.email_worker import send_email_task
+
+    def publish(task_type: str, payload: str):
+        # Los errores de datos (JSON o campos inválidos) cuentan como intento
+        # fallido de la fila; los de SMTP detienen el lote
+        email_data = json.loads(payload)
+        try:
+            send_email_task(email_data)
+        except (KeyError, ValueError):
+            raise
+        except Exception as e:
+            raise BackendUnavailable(str(e)) from e
+
+    return publish
+
+
+OUTBOX_BACKENDS = {
+    "rabbitmq": rabbitmq_backend,
+    "smtp": smtp_backend,
+}
+
+
+def relay_batch(db, publish, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Publica un lote de filas pendientes y lo confirma en una transacción.
+
+    En PostgreSQL las filas se bloquean con SKIP LOCKED, por lo que se pueden
+    ejecutar varios relays en paralelo sin publicar dos veces la misma fila.
+    Si el backend no está disponible, el lote se corta y las filas ya
+    publicadas se marcan igualmente como enviadas.
+
+    Returns:
+        int: Cantidad de filas publicadas en el lote
+
+    Raises:
+        BackendUnavailable: Si el backend dejó de responder durante el lote
+    """
+    query = (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending")
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+    )
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    rows = db.execute(query).scalars().all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    sent_ids = []
+    unavailable = None
+    for row in rows:
+        try:
+            publish(row.task_type, row.payload)
+            sent_ids.append(row.id)
+        except BackendUnavailable as e:
+            unavailable = e
+            break
+        except Exception as e:
+            row.attempts += 1
+            row.last_error = str(e)[:1000]
+            if row.attempts >= OUTBOX_MAX_ATTEMPTS:
+                row.status = "failed"
+                logger.error(f"Outbox row #{row.id} failed after {row.attempts} attempts: {e}")
+            else:
+                logger.warning(f"Outbox row #{row.id} publish failed (attempt {row.attempts}): {e}")
+
+    if sent_ids:
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(sent_ids))
+            .values(status="sent", sent_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+    if sent_ids:
+        logger.info(f"Outbox batch: {len(sent_ids)} of {len(rows)} published")
+    if unavailable is not None:
+        raise unavailable
+    return len(sent_ids)
+
+
+def start_outbox_relay():
+    """
+    Inicia el relay: drena el outbox en lotes hasta que se detenga el proceso.
+    """
+    backend_name = os.getenv("OUTBOX_BACKEND", "rabbitmq")
+    if backend_name not in OUTBOX_BACKENDS:
+        logger.error(f"❌ Backend de outbox desconocido: {backend_name}")
+        sys.exit(1)
+    publish = OUTBOX_BACKENDS[backend_name]()
+
+    logger.info("=" * 60)
+    logger.info("📤 Email Outbox Relay")
+    logger.info("=" * 60)
+    logger.info(f"Backend: {backend_name}")
+    logger.info(f"Batch size: {OUTBOX_BATCH_SIZE}")
+    logger.info("Press CTRL+C to exit")
+    logger.info("=" * 60)
+
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, stop)
+
+    backoff = OUTBOX_POLL_INTERVAL
+
+    try:
+        while running:
+            db = SessionLocal()
+            try:
+                published = relay_batch(db, publish)
+                backoff = OUTBOX_POLL_INTERVAL
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Outbox relay error, retrying in {backoff:.1f}s: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, OUTBOX_MAX_BACKOFF)
+                continue
+            finally:
+                db.close()
+
+            # Lote incompleto: no hay más pendientes por ahora
+            if published < OUTBOX_BATCH_SIZE:
+                time.sleep(OUTBOX_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+    logger.info("\n\n🛑 Outbox relay stopped")
+
+
+if __name__ == "__main__":
+    start_outbox_relay()
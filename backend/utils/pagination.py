@@ -0,0 +1,41 @@
+"""
+Cursores opacos para paginación keyset (por clave, no por OFFSET).
+
+El cursor codifica la clave de orden de la última fila devuelta; la página
+siguiente empieza inmediatamente después de esa clave, por lo que el costo de
+cada página no depende de cuántas filas haya antes.
+"""
+
+import base64
+import json
+from datetime import date, time
+from typing import NamedTuple
+
+
+class InvalidCursor(ValueError):
+    """El cursor no se puede decodificar."""
+
+
+class ReservationCursor(NamedTuple):
+    """Clave de orden de una reserva: (date, start_time, id)."""
+    date: date
+    start_time: time
+    id: int
+
+
+def encode_cursor(cursor: ReservationCursor) -> str:
+    raw = json.dumps([cursor.date.isoformat(), cursor.start_time.isoformat(), cursor.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(value: str) -> ReservationCursor:
+    """
+    Raises:
+        InvalidCursor: Si el cursor está mal formado
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        day, start, reservation_id = json.loads(raw)
+        return ReservationCursor(date.fromisoformat(day), time.fromisoformat(start), int(reservation_id))
+    except Exception as e:
+        raise InvalidCursor(str(e)) from e
@@ -0,0 +1,91 @@
+"""
+Conteo de sentencias SQL, para detectar N+1 y consultas de más.
+
+Los contadores se asocian al contexto actual (contextvars): con peticiones
+concurrentes, cada una cuenta solo sus propias sentencias, también a través
+del engine asíncrono.
+
+Uso:
+    with count_queries() as counter:
+        client.get("/api/users/1/reservations")
+    assert counter.count == 1, counter.statements
+
+    # o directamente
+    with assert_max_queries(1):
+        client.get("/api/users/1/reservations")
+
+Con TestClient, la petición se ejecuta en otro hilo: usar un cliente
+asíncrono en el mismo contexto (httpx.AsyncClient con ASGITransport) o
+ejecutar la ruta directamente.
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_active_counters: contextvars.ContextVar = contextvars.ContextVar("active_query_counters", default=())
+_listener_lock = threading.Lock()
+_listener_installed = False
+
+
+class QueryCounter:
+    """Sentencias ejecutadas mientras el contador está activo."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+class TooManyQueries(AssertionError):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in _active_counters.get():
+        counter.statements.append(statement)
+
+
+def _install_listener():
+    global _listener_installed
+    with _listener_lock:
+        if not _listener_installed:
+            # A nivel de la clase Engine: cubre el engine síncrono, el
+            # asíncrono (su sync_engine) y los que creen los scripts
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            _listener_installed = True
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Cuenta las sentencias SQL ejecutadas dentro del bloque."""
+    _install_listener()
+    counter = QueryCounter()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_count: int, label: Optional[str] = None) -> Iterator[QueryCounter]:
+    """
+    Falla si el bloque ejecuta más de `max_count` sentencias SQL.
+
+    Raises:
+        TooManyQueries: Con la lista de sentencias ejecutadas
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > max_count:
+        listing = "\n".join(f"  {i}. {statement}" for i, statement in enumerate(counter.statements, 1))
+        raise TooManyQueries(
+            f"{label or 'Bloque'}: {counter.count} consultas (máximo {max_count})\n{listing}"
+        )
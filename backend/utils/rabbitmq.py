@@ -7,18 +7,27 @@ se publica un mensaje en RabbitMQ y un worker independiente lo procesa.
 """
 
 import pika
+from pika.exceptions import AMQPError
 import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import logging
 
+from utils.metrics import email_queue_publish_total
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Backoff de reconexión del publisher (segundos)
+PUBLISHER_RECONNECT_MIN_DELAY = float(os.getenv("RABBITMQ_RECONNECT_MIN_DELAY", "0.5"))
+PUBLISHER_RECONNECT_MAX_DELAY = float(os.getenv("RABBITMQ_RECONNECT_MAX_DELAY", "30"))
 
-def get_rabbitmq_connection():
+
+def get_rabbitmq_parameters():
     """
-    Crea y retorna una conexión a RabbitMQ.
+    Parámetros de conexión a RabbitMQ.
     
     Intenta usar RABBITMQ_URL primero (para CloudAMQP u otros servicios),
     si no existe, usa los parámetros individuales.
@@ -40,7 +49,134 @@ def get_rabbitmq_connection():
             )
         )
     
-    return pika.BlockingConnection(parameters)
+    return parameters
+
+
+def get_rabbitmq_connection():
+    """Crea y retorna una conexión a RabbitMQ."""
+    return pika.BlockingConnection(get_rabbitmq_parameters())
+
+
+class EmailTaskPublisher:
+    """
+    Publisher de RabbitMQ de larga vida, uno por proceso.
+    
+    Mantiene abierta una conexión y un canal con publisher confirms, declara
+    cada cola una sola vez y se reconecta automáticamente. Mientras RabbitMQ
+    no está disponible, los intentos de reconexión se espacian con backoff
+    exponencial y las publicaciones fallan de inmediato en lugar de esperar
+    un handshake completo en cada petición.
+    
+    pika.BlockingConnection no es thread-safe: todas las operaciones se
+    serializan con un lock.
+    """
+    
+    def __init__(self, parameters_factory=get_rabbitmq_parameters):
+        self._parameters_factory = parameters_factory
+        self._lock = threading.Lock()
+        self._connection = None
+        self._channel = None
+        self._declared_queues = set()
+        self._reconnect_delay = PUBLISHER_RECONNECT_MIN_DELAY
+        self._next_attempt_at = 0.0
+    
+    def _reset(self):
+        """Descarta la conexión actual (sin esperar a cerrarla limpiamente)."""
+        connection = self._connection
+        self._connection = None
+        self._channel = None
+        self._declared_queues.clear()
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:
+                pass
+    
+    def _ensure_channel(self):
+        if self._channel is not None and self._channel.is_open and self._connection.is_open:
+            # Atender heartbeats pendientes sin bloquear
+            self._connection.process_data_events(time_limit=0)
+            return self._channel
+        
+        self._reset()
+        now = time.monotonic()
+        if now < self._next_attempt_at:
+            raise ConnectionError("RabbitMQ no disponible (esperando para reconectar)")
+        
+        try:
+            self._connection = pika.BlockingConnection(self._parameters_factory())
+            self._channel = self._connection.channel()
+            # Publisher confirms: basic_publish espera el ack del broker
+            self._channel.confirm_delivery()
+        except Exception:
+            self._reset()
+            self._next_attempt_at = now + self._reconnect_delay
+            self._reconnect_delay = min(self._reconnect_delay * 2, PUBLISHER_RECONNECT_MAX_DELAY)
+            raise
+        
+        self._reconnect_delay = PUBLISHER_RECONNECT_MIN_DELAY
+        logger.info("RabbitMQ publisher connected")
+        return self._channel
+    
+    def _declare_queue(self, channel, queue_name: str):
+        if queue_name not in self._declared_queues:
+            # durable=True asegura que la cola sobreviva reinicios del servidor
+            channel.queue_declare(queue=queue_name, durable=True)
+            self._declared_queues.add(queue_name)
+    
+    def publish(self, queue_name: str, body: bytes, properties: pika.BasicProperties = None):
+        """
+        Publica un mensaje persistente y espera la confirmación del broker.
+        
+        Si la conexión se cayó desde la última publicación se reintenta una
+        vez con una conexión nueva.
+        
+        Raises:
+            Exception: Si el mensaje no pudo publicarse o el broker lo rechazó
+        """
+        properties = properties or pika.BasicProperties(
+            delivery_mode=2,  # Mensaje persistente
+            content_type='application/json'
+        )
+        
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    channel = self._ensure_channel()
+                    self._declare_queue(channel, queue_name)
+                    channel.basic_publish(
+                        exchange='',
+                        routing_key=queue_name,
+                        body=body,
+                        properties=properties,
+                        mandatory=True
+                    )
+                    email_queue_publish_total.inc("rabbitmq", "success")
+                    return
+                except AMQPError as e:
+                    self._reset()
+                    if attempt == 2:
+                        email_queue_publish_total.inc("rabbitmq", "failure")
+                        raise
+                    logger.warning(f"RabbitMQ publish failed ({e.__class__.__name__}), reconnecting")
+    
+    def close(self):
+        with self._lock:
+            self._reset()
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_email_publisher() -> EmailTaskPublisher:
+    """Publisher compartido por el proceso (se crea en el primer uso)."""
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = EmailTaskPublisher()
+    return _publisher
 
 
 def publish_email_task(email_data: dict):
@@ -68,31 +204,11 @@ def publish_email_task(email_data: dict):
     queue_name = os.getenv("EMAIL_QUEUE_NAME", "email_notifications")
     
     try:
-        # Conectar a RabbitMQ
-        connection = get_rabbitmq_connection()
-        channel = connection.channel()
-        
-        # Declarar la cola (se crea si no existe)
-        # durable=True asegura que la cola sobreviva reinicios del servidor
-        channel.queue_declare(queue=queue_name, durable=True)
-        
-        # Serializar los datos a JSON
+        # Serializar los datos a JSON y publicar con la conexión persistente
         message = json.dumps(email_data)
-        
-        # Publicar el mensaje
-        # delivery_mode=2 hace que el mensaje sea persistente
-        channel.basic_publish(
-            exchange='',
-            routing_key=queue_name,
-            body=message,
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # Mensaje persistente
-                content_type='application/json'
-            )
-        )
+        get_email_publisher().publish(queue_name, message.encode("utf-8"))
         
         logger.info(f"Email task published to queue: {queue_name}")
-        connection.close()
         return True
         
     except Exception as e:
@@ -100,9 +216,45 @@ def publish_email_task(email_data: dict):
         return False
 
 
+def retry_queue_name(queue_name: str, attempt: int) -> str:
+    """Cola de espera para el reintento que sigue al intento `attempt`."""
+    return f"{queue_name}.retry.{attempt}"
+
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    """Cola con los mensajes que agotaron sus intentos o son inválidos."""
+    return f"{queue_name}.dlq"
+
+
+def declare_email_topology(channel, queue_name: str, max_attempts: int):
+    """
+    Declara la cola de emails, sus colas de reintento y la DLQ.
+    
+    Las colas de reintento no tienen consumidores: cada mensaje se publica
+    con un TTL propio (expiration) y, al expirar, RabbitMQ lo reenvía a la
+    cola principal por el dead-letter exchange por defecto. Hay una cola por
+    intento para que los mensajes de cada cola tengan TTLs parecidos (RabbitMQ
+    solo expira los mensajes que están al frente de la cola).
+    """
+    channel.queue_declare(queue=queue_name, durable=True)
+    for attempt in range(1, max_attempts):
+        channel.queue_declare(
+            queue=retry_queue_name(queue_name, attempt),
+            durable=True,
+            arguments={
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue_name,
+            }
+        )
+    channel.queue_declare(queue=dead_letter_queue_name(queue_name), durable=True)
+
+
 def check_rabbitmq_connection():
     """
-    Verifica si RabbitMQ está disponible y accesible.
+    Verifica si RabbitMQ está disponible y accesible (diagnóstico).
+    
+    Abre y cierra una conexión nueva: no usar en el camino de las peticiones,
+    publish_email_task ya informa si la publicación falló.
     
     Returns:
         bool: True si la conexión es exitosa, False si falla
@@ -0,0 +1,24 @@
+"""
+Respuestas JSON serializadas una sola vez.
+
+Cuando una ruta devuelve objetos o dicts, FastAPI los valida de nuevo contra
+el response_model, los pasa por jsonable_encoder y recién entonces por
+json.dumps. Las rutas con respuestas grandes o muy frecuentes arman el
+contenido ya con la forma del esquema (claves con alias, en camelCase) y lo
+devuelven en una FastJSONResponse, que lo serializa directamente con
+pydantic_core.to_json (implementado en Rust; fechas y horas en ISO 8601,
+igual que los esquemas).
+
+El response_model se mantiene en el decorador para la documentación OpenAPI,
+pero no se aplica a estas respuestas: el contenido debe respetar el esquema.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
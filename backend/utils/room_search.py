@@ -0,0 +1,209 @@
+"""
+Índice en memoria para buscar salas (GET /api/rooms con filtros).
+
+Se construye junto con el catálogo en caché (utils/rooms_cache.py) y se
+reconstruye cuando este se invalida. Cada sala recibe una posición según su
+orden por capacidad (y por id ante empates), y todos los conjuntos de salas
+son enteros de Python usados como mapas de bits sobre esas posiciones, igual
+que las franjas de utils/availability.py:
+
+- Texto: índice invertido de n-gramas (1 a 3 caracteres) del nombre y de la
+  biblioteca, normalizados (minúsculas, sin tildes). Un término de hasta 3
+  caracteres es una sola búsqueda en el diccionario; uno más largo es el AND
+  de sus trigramas, y los candidatos se verifican con una búsqueda de
+  subcadena (dos trigramas pueden aparecer por separado en el nombre).
+- Biblioteca: mapa de bits por nombre de biblioteca normalizado.
+- Capacidad: como las posiciones siguen el orden por capacidad, un rango de
+  capacidades es un rango contiguo de bits, ubicado con bisect.
+
+Combinar filtros es un AND de enteros. La respuesta se arma concatenando el
+JSON ya serializado de cada sala.
+"""
+
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+NGRAM_SIZE = 3
+
+# Órdenes admitidos; el prefijo "-" invierte el orden
+SORT_KEYS = ("id", "name", "-name", "capacity", "-capacity", "library")
+
+
+class SearchResult(NamedTuple):
+    body: bytes
+    total: int
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin tildes ni diéresis: 'Sala Ñandú' -> 'sala nandu'."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _ngrams(text: str) -> frozenset:
+    return frozenset(
+        text[start:start + size]
+        for size in range(1, NGRAM_SIZE + 1)
+        for start in range(len(text) - size + 1)
+    )
+
+
+def _mask(positions: List[int]) -> int:
+    """Mapa de bits con las posiciones indicadas."""
+    bits = bytearray(b"0" * (max(positions) + 1))
+    for position in positions:
+        bits[position] = 0x31  # "1"
+    return int(bits[::-1], 2)
+
+
+def _positions(mask: int) -> List[int]:
+    """Posiciones de los bits a 1, de menor a mayor."""
+    # bin() invertido: el carácter i es el bit i. str.find recorre en C los
+    # ceros, así que el costo en Python es por resultado y no por sala
+    bits = bin(mask)[:1:-1]
+    positions = []
+    position = bits.find("1")
+    while position != -1:
+        positions.append(position)
+        position = bits.find("1", position + 1)
+    return positions
+
+
+class RoomSearchIndex:
+    """
+    Índice inmutable sobre una lista de salas.
+
+    rooms son tuplas (id, name, library_name, capacity) y fragments el JSON
+    de cada sala (RoomResponse) en el mismo orden.
+    """
+
+    def __init__(self, rooms: Sequence[Tuple[int, str, str, int]], fragments: Sequence[bytes]):
+        order = sorted(range(len(rooms)), key=lambda i: (rooms[i][3], rooms[i][0]))
+        self._rooms = [rooms[i] for i in order]
+        self._fragments = [fragments[i] for i in order]
+        self._capacities = [room[3] for room in self._rooms]
+        self._all = (1 << len(self._rooms)) - 1
+
+        libraries: Dict[str, str] = {}
+        self._texts: List[Tuple[str, str]] = []
+        postings: Dict[str, List[int]] = {}
+        library_postings: Dict[str, List[int]] = {}
+        for position, (_, name, library_name, _) in enumerate(self._rooms):
+            library_text = libraries.get(library_name)
+            if library_text is None:
+                library_text = libraries[library_name] = normalize(library_name)
+            texts = (normalize(name), library_text)
+            self._texts.append(texts)
+            for gram in _ngrams(texts[0]):
+                postings.setdefault(gram, []).append(position)
+            library_postings.setdefault(library_text, []).append(position)
+
+        # Cada lista de posiciones se convierte en un mapa de bits de una vez
+        # (sumar bit a bit un entero grande es cuadrático)
+        self._grams: Dict[str, int] = {gram: _mask(positions) for gram, positions in postings.items()}
+        self._libraries: Dict[str, int] = {
+            text: _mask(positions) for text, positions in library_postings.items()
+        }
+        # Los n-gramas de la biblioteca se agregan una vez por biblioteca, no por sala
+        for text, library_mask in self._libraries.items():
+            for gram in _ngrams(text):
+                self._grams[gram] = self._grams.get(gram, 0) | library_mask
+
+        # Rango de cada posición en los órdenes que no son el de capacidad
+        self._ranks = {
+            "id": self._rank(lambda i: self._rooms[i][0]),
+            "name": self._rank(lambda i: (self._texts[i][0], self._rooms[i][0])),
+            "library": self._rank(lambda i: (self._texts[i][1], self._texts[i][0], self._rooms[i][0])),
+        }
+
+    def _rank(self, key) -> List[int]:
+        ranks = [0] * len(self._rooms)
+        for rank, position in enumerate(sorted(range(len(self._rooms)), key=key)):
+            ranks[position] = rank
+        return ranks
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    # ============ FILTROS ============
+
+    def _term_mask(self, term: str) -> int:
+        if len(term) <= NGRAM_SIZE:
+            return self._grams.get(term, 0)
+
+        mask = self._all
+        for start in range(len(term) - NGRAM_SIZE + 1):
+            mask &= self._grams.get(term[start:start + NGRAM_SIZE], 0)
+            if not mask:
+                return 0
+
+        # Verificar los candidatos: los trigramas pueden estar en otro orden
+        for position in _positions(mask):
+            name, library_name = self._texts[position]
+            if term not in name and term not in library_name:
+                mask ^= 1 << position
+        return mask
+
+    def _capacity_mask(self, min_capacity: Optional[int], max_capacity: Optional[int]) -> int:
+        low = 0 if min_capacity is None else bisect_left(self._capacities, min_capacity)
+        high = len(self._capacities) if max_capacity is None else bisect_right(self._capacities, max_capacity)
+        if high <= low:
+            return 0
+        return ((1 << (high - low)) - 1) << low
+
+    def match(
+        self,
+        query: Optional[str] = None,
+        library: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+        max_capacity: Optional[int] = None
+    ) -> int:
+        """Mapa de bits de las salas que cumplen todos los filtros."""
+        mask = self._capacity_mask(min_capacity, max_capacity)
+        if library is not None and mask:
+            mask &= self._libraries.get(normalize(library.strip()), 0)
+        if query:
+            # Cada palabra debe aparecer (como subcadena) en el nombre o la biblioteca
+            for term in normalize(query).split():
+                if not mask:
+                    break
+                mask &= self._term_mask(term)
+        return mask
+
+    # ============ RESULTADOS ============
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        library: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+        max_capacity: Optional[int] = None,
+        sort: str = "id",
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> SearchResult:
+        """
+        Salas que cumplen los filtros, ordenadas y paginadas, como JSON (List[RoomResponse]).
+
+        Returns:
+            SearchResult: Cuerpo de la respuesta y total de salas que cumplen los filtros
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Orden desconocido: {sort}")
+
+        positions = _positions(self.match(query, library, min_capacity, max_capacity))
+        total = len(positions)
+
+        # Las posiciones ya están en orden de capacidad
+        field = sort.lstrip("-")
+        if field != "capacity":
+            ranks = self._ranks[field]
+            positions.sort(key=ranks.__getitem__)
+        if sort.startswith("-"):
+            positions.reverse()
+
+        end = None if limit is None else offset + limit
+        page = positions[offset:end]
+        fragments = self._fragments
+        return SearchResult(b"[" + b",".join([fragments[position] for position in page]) + b"]", total)
@@ -0,0 +1,179 @@
+"""
+Caché en memoria del catálogo de salas (GET /api/rooms).
+
+Guarda la lista de salas ya serializada a JSON junto con un ETag fuerte
+(hash del contenido). Mientras el catálogo no cambia, cada petición es una
+búsqueda en memoria y la copia de los bytes; si el cliente envía
+If-None-Match con el mismo ETag se responde 304 sin cuerpo.
+
+Junto con el catálogo se construye el índice de búsqueda de salas
+(utils/room_search.py), que comparte su invalidación.
+
+La caché se invalida cuando una sesión de este proceso confirma (commit)
+cambios sobre Room, incluidos los UPDATE/DELETE masivos. Las escrituras de
+otros procesos (scripts, otros workers) se ven a lo sumo ROOMS_CACHE_TTL
+segundos después: como el ETag depende solo del contenido, recargar un
+catálogo sin cambios no invalida los ETags que tienen los clientes.
+
+La caché abre su propia sesión de lectura solo cuando tiene que recargar:
+un acierto (y un 304) no toma ninguna conexión del pool. Con réplicas de
+lectura (database/replicas.py) la recarga lee de una réplica, salvo la que
+sigue a una invalidación local durante READ_YOUR_WRITES_WINDOW segundos, que
+se hace en la primaria: una réplica atrasada dejaría en caché el catálogo
+anterior hasta el próximo vencimiento del TTL.
+"""
+
+import hashlib
+import os
+import threading
+import time as _time
+from typing import AsyncContextManager, Callable, NamedTuple, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.connection import AsyncSessionLocal
+from database.models import Room
+from database.replicas import READ_YOUR_WRITES_WINDOW, replica_router
+from schemas import RoomResponse
+from utils.room_search import RoomSearchIndex
+
+ROOMS_CACHE_TTL = float(os.getenv("ROOMS_CACHE_TTL", "60"))
+
+_room_adapter = TypeAdapter(RoomResponse)
+
+# Clave en Session.info que marca cambios pendientes sobre Room
+_ROOMS_CHANGED = "rooms_catalog_changed"
+
+
+class CatalogEntry(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+    loaded_at: float
+    search: RoomSearchIndex
+
+
+class RoomsCatalogCache:
+    """Catálogo serializado y versionado; la versión aumenta en cada invalidación."""
+
+    def __init__(
+        self,
+        ttl: float = ROOMS_CACHE_TTL,
+        clock: Callable[[], float] = _time.monotonic,
+        read_session: Callable[[], AsyncContextManager[AsyncSession]] = replica_router.session,
+        primary_session: Callable[[], AsyncContextManager[AsyncSession]] = AsyncSessionLocal
+    ):
+        self._ttl = ttl
+        self._clock = clock
+        self._read_session = read_session
+        self._primary_session = primary_session
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entry: Optional[CatalogEntry] = None
+        self._invalidated_at: Optional[float] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    async def get(self) -> CatalogEntry:
+        """Devuelve el catálogo en caché o lo carga desde la base de datos (solo entonces abre una sesión)."""
+        entry = self._entry
+        if entry is not None and entry.version == self._version and self._clock() - entry.loaded_at < self._ttl:
+            return entry
+
+        version = self._version
+        invalidated_at = self._invalidated_at
+        if invalidated_at is not None and self._clock() - invalidated_at < READ_YOUR_WRITES_WINDOW:
+            session = self._primary_session()
+        else:
+            session = self._read_session()
+        async with session as db:
+            rooms = (await db.execute(select(Room).order_by(Room.id))).scalars().all()
+        # JSON de cada sala por separado: el catálogo completo y los
+        # resultados de búsqueda se arman concatenándolos
+        fragments = [
+            _room_adapter.dump_json(_room_adapter.validate_python(room, from_attributes=True), by_alias=True)
+            for room in rooms
+        ]
+        body = b"[" + b",".join(fragments) + b"]"
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        if entry is not None and entry.etag == etag:
+            # Recarga por TTL sin cambios: el índice de búsqueda sigue siendo válido
+            search = entry.search
+        else:
+            search = RoomSearchIndex(
+                [(room.id, room.name, room.library_name, room.capacity) for room in rooms],
+                fragments
+            )
+        entry = CatalogEntry(
+            body=body,
+            etag=etag,
+            version=version,
+            loaded_at=self._clock(),
+            search=search
+        )
+
+        with self._lock:
+            # Si hubo una invalidación durante la carga, no guardar datos viejos
+            if version == self._version:
+                self._entry = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._entry = None
+            self._invalidated_at = self._clock()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110), con soporte para listas y '*'."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+# Caché compartida por todas las peticiones del proceso
+rooms_catalog = RoomsCatalogCache()
+
+
+def _is_room(instance) -> bool:
+    return isinstance(instance, Room)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_room_changes(session, flush_context):
+    if any(_is_room(obj) for obj in session.new) \
+            or any(_is_room(obj) for obj in session.dirty if session.is_modified(obj)) \
+            or any(_is_room(obj) for obj in session.deleted):
+        session.info[_ROOMS_CHANGED] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_room_changes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        if any(mapper.class_ is Room for mapper in orm_execute_state.all_mappers):
+            orm_execute_state.session.info[_ROOMS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(_ROOMS_CHANGED, False):
+        rooms_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_ROOMS_CHANGED, None)
@@ -0,0 +1,166 @@
+"""
+Pool de conexiones SMTP asíncronas (aiosmtplib).
+
+Cada conexión hace connect + STARTTLS + LOGIN una sola vez y se reutiliza para
+muchos mensajes, en lugar de abrir una conexión nueva por email. El pool
+limita los envíos simultáneos a su tamaño (SMTP_POOL_SIZE) y recicla cada
+conexión tras SMTP_MAX_MESSAGES_PER_CONNECTION mensajes, ya que muchos
+servidores cortan las sesiones largas.
+
+Debe usarse siempre desde el mismo event loop.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+
+import aiosmtplib
+
+from utils.email_service import get_smtp_settings
+from utils.email_templates import RenderedEmail
+from utils.metrics import email_smtp_send_total
+
+logger = logging.getLogger(__name__)
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "5"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Errores tras los cuales la conexión ya no sirve y hay que abrir otra
+_CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+class _PooledConnection:
+    __slots__ = ("client", "sent")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.sent = 0
+
+
+class SMTPConnectionPool:
+    """
+    Conexiones SMTP autenticadas y reutilizables.
+
+    send() toma una conexión libre (o abre una nueva si hay cupo), envía el
+    mensaje y la devuelve al pool. Si la conexión se cayó mientras estaba
+    libre, se reabre y se reintenta el envío una vez.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[dict] = None,
+        size: int = SMTP_POOL_SIZE,
+        max_messages_per_connection: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        timeout: float = SMTP_TIMEOUT
+    ):
+        self._settings = settings or get_smtp_settings()
+        self._size = size
+        self._max_messages = max_messages_per_connection
+        self._timeout = timeout
+        self._idle: List[_PooledConnection] = []
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+
+    @property
+    def settings(self) -> dict:
+        return self._settings
+
+    async def _connect(self) -> _PooledConnection:
+        client = aiosmtplib.SMTP(
+            hostname=self._settings["host"],
+            port=self._settings["port"],
+            username=self._settings["username"],
+            password=self._settings["password"],
+            start_tls=True,
+            timeout=self._timeout
+        )
+        # connect() hace también STARTTLS y LOGIN
+        await client.connect()
+        return _PooledConnection(client)
+
+    async def _discard(self, connection: _PooledConnection, graceful: bool = False):
+        try:
+            if graceful:
+                await connection.client.quit()
+            else:
+                connection.client.close()
+        except Exception:
+            connection.client.close()
+
+    async def _acquire(self) -> _PooledConnection:
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.client.is_connected:
+                return connection
+        return await self._connect()
+
+    async def _open(self, connect: Callable[[], Awaitable[_PooledConnection]]) -> _PooledConnection:
+        # Un fallo al conectar (o en STARTTLS/LOGIN) también es un envío fallido
+        try:
+            return await connect()
+        except BaseException:
+            email_smtp_send_total.inc("pool", "failure")
+            raise
+
+    async def _release(self, connection: _PooledConnection):
+        if self._closed or connection.sent >= self._max_messages:
+            await self._discard(connection, graceful=True)
+        else:
+            self._idle.append(connection)
+
+    async def send(self, message: RenderedEmail):
+        """
+        Envía un mensaje usando una conexión del pool.
+
+        Raises:
+            aiosmtplib.SMTPException: Si el servidor rechaza el mensaje o no
+                se puede establecer la conexión
+        """
+        if self._closed:
+            raise RuntimeError("El pool SMTP está cerrado")
+
+        async with self._slots:
+            connection = await self._open(self._acquire)
+            for attempt in (1, 2):
+                try:
+                    await connection.client.sendmail(message.sender, message.recipients, message.data)
+                    break
+                except _CONNECTION_ERRORS:
+                    await self._discard(connection)
+                    if attempt == 2:
+                        email_smtp_send_total.inc("pool", "failure")
+                        raise
+                    logger.info("SMTP connection lost, reconnecting")
+                    connection = await self._open(self._connect)
+                except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                    # Rechazo del servidor (p. ej. destinatario inválido): la
+                    # sesión sigue siendo válida. Los 5xx no se reintentan
+                    # (utils/email_service.is_permanent_smtp_error)
+                    await self._release(connection)
+                    email_smtp_send_total.inc("pool", "rejected")
+                    raise
+                except BaseException:
+                    await self._discard(connection)
+                    email_smtp_send_total.inc("pool", "failure")
+                    raise
+
+            connection.sent += 1
+            email_smtp_send_total.inc("pool", "success")
+            await self._release(connection)
+
+    async def close(self):
+        """Cierra todas las conexiones libres; las que están en uso se cierran al liberarse."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        await asyncio.gather(
+            *(self._discard(connection, graceful=True) for connection in idle),
+            return_exceptions=True
+        )